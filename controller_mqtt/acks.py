@@ -0,0 +1,140 @@
+# controller_mqtt/acks.py
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class AckCollector:
+    """
+    Correlaciona los eventos 'command_ack' que publican los servidores con los
+    comandos enviados, por (command_id, device_id).
+
+    Los callbacks de suscripción de awscrt llegan desde otro hilo: usar
+    `feed_threadsafe`, que reenvía el mensaje al loop del collector.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self._pending: Dict[tuple, asyncio.Future] = {}
+        self._sent_at: Dict[tuple, float] = {}
+        self._events: Dict[tuple, asyncio.Future] = {}
+        self.unmatched = 0
+
+    def _get_loop(self):
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        return self.loop
+
+    def expect(self, command_id: str, device_id: str) -> asyncio.Future:
+        """Registra un ack esperado; el futuro se resuelve con el mensaje de ack."""
+        key = (command_id, device_id)
+        future = self._pending.get(key)
+        if future is None or future.done():
+            future = self._get_loop().create_future()
+            self._pending[key] = future
+        self._sent_at[key] = time.perf_counter()
+        return future
+
+    def forget(self, command_id: str, device_id: str):
+        self._pending.pop((command_id, device_id), None)
+        self._sent_at.pop((command_id, device_id), None)
+
+    def expect_event(self, event: str, device_id: str, command_id: Optional[str] = None) -> asyncio.Future:
+        """
+        Futuro para el próximo evento `event` (p. ej. 'boot') publicado por el
+        dispositivo. Con `command_id` sólo cuenta el evento que lo lleva, de modo
+        que un 'boot' del reinicio programado no confirma una actualización.
+        """
+        key = (event, device_id, command_id)
+        future = self._events.get(key)
+        if future is None or future.done():
+            future = self._get_loop().create_future()
+            self._events[key] = future
+        return future
+
+    def feed(self, topic: str, payload) -> bool:
+        """Procesa un mensaje del tópico de acks. Devuelve True si correspondía a algo pendiente."""
+        try:
+            message = json.loads(payload)
+        except (TypeError, ValueError):
+            return False
+        if not isinstance(message, dict):
+            return False
+        if message.get("event") != "command_ack":
+            key = (message.get("event"), message.get("device_id"), message.get("command_id"))
+            waiter = self._events.pop(key, None)
+            if waiter is None or waiter.done():
+                return False
+            waiter.set_result(message)
+            return True
+
+        key = (message.get("command_id"), message.get("device_id") or message.get("server_id"))
+        future = self._pending.get(key)
+        if future is None or future.done():
+            self.unmatched += 1
+            return False
+        message["latency_ms"] = (time.perf_counter() - self._sent_at[key]) * 1000
+        future.set_result(message)
+        return True
+
+    def feed_threadsafe(self, topic: str, payload, **_kwargs):
+        """Firma compatible con el callback de mqtt_connection.subscribe de awscrt."""
+        self._get_loop().call_soon_threadsafe(self.feed, topic, payload)
+
+
+async def send_with_acks(publish: Callable[[str], Awaitable[Dict[str, Any]]],
+                         collector: AckCollector,
+                         command_id: str,
+                         devices: List[str],
+                         timeout: float = 60.0,
+                         retries: int = 1,
+                         max_in_flight: int = 20,
+                         wait_event: Optional[str] = None,
+                         event_timeout: float = 600.0) -> List[Dict[str, Any]]:
+    """
+    Publica el comando a cada dispositivo con `publish(device_id)` y espera su
+    ack. Si no llega antes de `timeout`, reintenta hasta `retries` veces con el
+    mismo command_id. Devuelve un resultado por dispositivo con el estado del
+    PUBACK, del ack, los intentos y la latencia de ida y vuelta.
+
+    Con `wait_event` (p. ej. 'boot' tras una actualización) un dispositivo sólo
+    cuenta como confirmado cuando además publica ese evento, con el mismo
+    command_id, antes de `event_timeout`.
+    """
+    window = asyncio.Semaphore(max_in_flight)
+
+    async def one(device_id):
+        result = {"device": device_id, "acked": False, "confirmed": False, "attempts": 0,
+                  "error": None, "latency_ms": None, "ack_latency_ms": None}
+        try:
+            for _ in range(retries + 1):
+                result["attempts"] += 1
+                ack = collector.expect(command_id, device_id)
+                async with window:
+                    publish_result = await publish(device_id)
+                result["acked"] = result["acked"] or publish_result.get("acked", False)
+                result["latency_ms"] = publish_result.get("latency_ms")
+                if not publish_result.get("acked"):
+                    result["error"] = publish_result.get("error") or "sin PUBACK"
+                    continue
+                try:
+                    message = await asyncio.wait_for(asyncio.shield(ack), timeout)
+                except asyncio.TimeoutError:
+                    result["error"] = f"sin ack en {timeout:.0f} s"
+                    continue
+                result.update(error=None, ack_latency_ms=message["latency_ms"])
+                if wait_event:
+                    try:
+                        await asyncio.wait_for(collector.expect_event(wait_event, device_id, command_id), event_timeout)
+                    except asyncio.TimeoutError:
+                        result["error"] = f"sin evento '{wait_event}' en {event_timeout:.0f} s"
+                        return result
+                result["confirmed"] = True
+                return result
+            return result
+        finally:
+            collector.forget(command_id, device_id)
+
+    return list(await asyncio.gather(*(one(device_id) for device_id in devices)))
@@ -1,79 +1,144 @@
 # controller_mqtt/actions.py
 
-import asyncio
+import os
 import json
 import base64
+from contextlib import contextmanager
+from typing import List, Union
 from rich import print
+from rich.table import Table
 import requests
-from .config import AWSIoTConfig
-from .commander import IoTCommander
+from .session import CommanderSession
 from . import commands
+from . import encoding
 
-def handle_server_reboot(device: str):
+DEFAULT_REPO = "Precision-Agricola/bio_sensors_4g"
+# "base64": {"data": base64(JSON)}, lo que entiende cualquier firmware.
+# "compact": trama binaria en un token Base64 (ver encoding.py), requiere firmware con utils/command_frame.py.
+COMMAND_ENCODING = os.getenv("BIOIOT_COMMAND_ENCODING", "base64")
+
+
+def release_asset_url(repo: str, version: str, target: str) -> str:
+    return f"https://github.com/{repo}/releases/download/{version}/{target}.zip"
+
+
+def _wrap_command(command_dict: dict, command_encoding: str = None) -> Union[dict, str]:
+    """
+    JSON compacto -> Base64 -> {"data": ...}, el formato que espera la Pico; o,
+    con la codificación "compact", el token Base64 de la trama binaria.
+    """
+    if (command_encoding or COMMAND_ENCODING) == "compact":
+        return encoding.encode_command_token(command_dict)
+    command_json_str = json.dumps(command_dict, separators=(',', ':'))
+    base64_str = base64.b64encode(command_json_str.encode('utf-8')).decode('utf-8')
+    return {"data": base64_str}
+
+
+@contextmanager
+def _session_scope(session: CommanderSession = None):
+    """Usa la sesión del operador si existe; si no, abre una sólo para este comando."""
+    if session is not None:
+        yield session
+        return
+    own_session = CommanderSession()
+    try:
+        yield own_session
+    finally:
+        own_session.close()
+
+
+def print_publish_results(results: list, title: str = "Resultado del envío"):
     """
-    Construye, conecta y envía el comando de reinicio del servidor usando Base64.
+    Tabla por dispositivo: PUBACK recibido o error y latencia; si se esperaron
+    acks, también la confirmación del servidor, intentos y latencia de ida y vuelta.
+    """
+    with_acks = any("confirmed" in r for r in results)
+    table = Table(title=title)
+    table.add_column("Dispositivo", style="cyan")
+    table.add_column("Estado")
+    table.add_column("PUBACK (ms)", justify="right")
+    if with_acks:
+        table.add_column("Ack servidor (ms)", justify="right")
+        table.add_column("Intentos", justify="right")
+    table.add_column("Error", style="red")
+
+    ok_key = "confirmed" if with_acks else "acked"
+    for r in sorted(results, key=lambda r: (r[ok_key], r["device"])):
+        if r[ok_key]:
+            status = "[green]CONFIRMADO[/green]" if with_acks else "[green]ACK[/green]"
+        else:
+            status = "[yellow]SIN ACK[/yellow]" if r["acked"] else "[red]FALLÓ[/red]"
+        row = [r["device"], status, f"{r['latency_ms']:.0f}" if r.get("latency_ms") is not None else "-"]
+        if with_acks:
+            row += [f"{r['ack_latency_ms']:.0f}" if r.get("ack_latency_ms") is not None else "-", str(r["attempts"])]
+        table.add_row(*row, r.get("error") or "")
+    print(table)
+    ok = sum(1 for r in results if r[ok_key])
+    print(f"{ok}/{len(results)} dispositivos confirmaron el comando.")
+
+
+def handle_server_reboot(device: Union[str, List[str]], session: CommanderSession = None,
+                         ack_timeout: float = 0, retries: int = 1):
+    """
+    Construye y envía el comando de reinicio del servidor usando Base64.
+    Con una lista de dispositivos el envío es concurrente y se muestra una tabla.
+    Con `ack_timeout` > 0 espera el 'command_ack' de cada servidor y reintenta
+    hasta `retries` veces a los que no respondan.
     """
-    commander = None
     try:
-        command_dict = commands.create_server_reboot_command()
-        command_json_str = json.dumps(command_dict, separators=(',', ':'))
-        base64_bytes = base64.b64encode(command_json_str.encode('utf-8'))
-        base64_str = base64_bytes.decode('utf-8')
-        wrapper_payload = {"data": base64_str}
-
-        print("🛰️  Realizando conexión con AWS IoT Core...")
-        config = AWSIoTConfig()
-        commander = IoTCommander(config)
-        
-        asyncio.run(commander.connect())
-        asyncio.run(commander.send_command(wrapper_payload, target_devices=device))
-        
-        print(f"[bold green]✅ Comando 'reboot_server' (envuelto en Base64) enviado exitosamente al dispositivo {device}.[/bold green]")
+        command = commands.create_server_reboot_command()
+        wrapper_payload = _wrap_command(command)
+        devices = device if isinstance(device, list) else [device]
+        with _session_scope(session) as active:
+            if ack_timeout:
+                results = active.send_with_acks(wrapper_payload, command["command_id"], devices,
+                                                timeout=ack_timeout, retries=retries)
+            else:
+                results = active.send(wrapper_payload, target_devices=device)
+
+        if isinstance(device, list) or ack_timeout:
+            print_publish_results(results, "Reinicio de servidores")
+        elif results and not results[0]["acked"]:
+            print(f"[bold red]❌ El dispositivo {device} no confirmó el comando: {results[0]['error']}[/bold red]")
+        else:
+            print(f"[bold green]✅ Comando 'reboot_server' (envuelto en Base64) enviado exitosamente al dispositivo {device}.[/bold green]")
+        return results
 
     except Exception as e:
         print(f"[bold red]❌ ERROR durante la acción de reinicio:[/bold red] {e}")
-    finally:
-        if commander and commander.mqtt_connection:
-            print("🔌 Desconectando de AWS IoT Core...")
-            asyncio.run(commander.disconnect())
 
 
-def handle_update(device: str, target: str, asset_url: str):
+def resolve_asset_url(asset_url: str) -> str:
+    """Sigue la redirección de GitHub para obtener el enlace de descarga directo."""
+    print(f"🔎 Resolviendo URL del asset: {asset_url}")
+    response = requests.head(asset_url, allow_redirects=True, timeout=10)
+    response.raise_for_status()  # Lanza un error si la URL da 404, etc.
+    print(f"✅ URL directa obtenida: {response.url}")
+    return response.url
+
+
+def handle_update(device: str, target: str, asset_url: str, session: CommanderSession = None):
     """
     Resuelve la URL del asset para obtener el enlace de descarga directo y
     luego envía el comando de actualización a la Pico.
     """
-    commander = None
     try:
         # 1. Resolver la URL para seguir la redirección
-        print(f"🔎 Resolviendo URL del asset: {asset_url}")
-        response = requests.head(asset_url, allow_redirects=True, timeout=10)
-        response.raise_for_status()  # Lanza un error si la URL da 404, etc.
-        final_download_url = response.url
-        print(f"✅ URL directa obtenida: {final_download_url}")
-        
-        # 2. Construir el comando MQTT con la URL final
-        command_dict = commands.create_update_command(target, final_download_url)
-
-        # 3. Codificar en Base64 y envolver
-        command_json_str = json.dumps(command_dict, separators=(',', ':'))
-        base64_bytes = base64.b64encode(command_json_str.encode('utf-8'))
-        base64_str = base64_bytes.decode('utf-8')
-        wrapper_payload = {"data": base64_str}
-
-        # 4. Conectar y enviar el comando
+        final_download_url = resolve_asset_url(asset_url)
+
+        # 2. Construir el comando MQTT con la URL final, en Base64 y envuelto
+        wrapper_payload = _wrap_command(commands.create_update_command(target, final_download_url))
+
+        # 3. Enviar el comando por la sesión (nueva o reutilizada)
         print(f"🛰️  Enviando comando de actualización para '{target}' a {device}...")
-        config = AWSIoTConfig()
-        commander = IoTCommander(config)
-        asyncio.run(commander.connect())
-        asyncio.run(commander.send_command(wrapper_payload, target_devices=device))
-        print(f"[bold green]✅ Comando enviado exitosamente.[/bold green]")
+        with _session_scope(session) as active:
+            results = active.send(wrapper_payload, target_devices=device)
+        if results and not results[0]["acked"]:
+            print(f"[bold red]❌ El dispositivo {device} no confirmó el comando: {results[0]['error']}[/bold red]")
+        else:
+            print(f"[bold green]✅ Comando enviado exitosamente.[/bold green]")
 
     except requests.exceptions.RequestException:
         print(f"[bold red]❌ ERROR: No se pudo resolver la URL del asset. Verifica la red o que la versión '{asset_url.split('/')[-2]}' exista.[/bold red]")
     except Exception as e:
         print(f"[bold red]❌ ERROR durante la acción de actualización:[/bold red] {e}")
-    finally:
-        if commander:
-            print("🔌 Desconectando de AWS IoT Core...")
-            asyncio.run(commander.disconnect())
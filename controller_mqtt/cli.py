@@ -1,7 +1,12 @@
+import sys
 import typer
+from pathlib import Path
+from typing import List
 from rich import print
 from controller_mqtt import actions
 from controller_mqtt import commands
+from controller_mqtt import rollout as fleet_rollout
+from controller_mqtt.session import CommanderSession, run_interactive
 import json
 
 app = typer.Typer(help="CLI para enviar comandos a dispositivos Bio-IoT.")
@@ -11,6 +16,17 @@ server_app = typer.Typer()
 app.add_typer(client_app, name="client", help="Comandos para gestionar el cliente (ESP32).")
 app.add_typer(server_app, name="server", help="Comandos para gestionar el servidor (Pico W).")
 
+@app.callback()
+def main(
+    encoding: str = typer.Option(actions.COMMAND_ENCODING, "--encoding", "-e",
+                                 help="'base64' (envoltorio JSON) o 'compact' (trama binaria, firmware reciente)."),
+):
+    """Opciones comunes a todos los comandos."""
+    if encoding not in ("base64", "compact"):
+        print("[bold red]❌ --encoding debe ser 'base64' o 'compact'.[/bold red]")
+        raise typer.Exit(1)
+    actions.COMMAND_ENCODING = encoding
+
 @client_app.command("update", help="Envía una orden de actualización de firmware al cliente.")
 def client_update(
     device: str = typer.Option(..., "--device", "-d", help="ID del dispositivo servidor."),
@@ -20,7 +36,7 @@ def client_update(
     """Prepara y envía el comando de actualización del cliente."""
     print(f"🤖 Iniciando acción 'update' para el cliente del dispositivo [bold cyan]{device}[/bold cyan]...")
     
-    firmware_url = f"https://github.com/{repo}/releases/download/{version}/client.zip"
+    firmware_url = actions.release_asset_url(repo, version, "client")
     print(f"🔗 URL del asset a resolver: {firmware_url}")
     
     actions.handle_update(device, "client", firmware_url)
@@ -34,18 +50,21 @@ def server_update(
     """Prepara y envía el comando de actualización del servidor."""
     print(f"🤖 Iniciando acción 'update' para el servidor [bold cyan]{device}[/bold cyan]...")
     
-    firmware_url = f"https://github.com/{repo}/releases/download/{version}/server.zip"
+    firmware_url = actions.release_asset_url(repo, version, "server")
     print(f"🔗 URL del asset a resolver: {firmware_url}")
 
     actions.handle_update(device, "server", firmware_url)
 
-@server_app.command("reboot", help="Envía un comando de reinicio al servidor.")
+@server_app.command("reboot", help="Envía un comando de reinicio al servidor (repite -d para varios).")
 def server_reboot(
-    device:str = typer.Option(..., "--device", "-d", help='ID del server, similar a SERVER_AA12BB'),
+    device: List[str] = typer.Option(..., "--device", "-d", help='ID del server, similar a SERVER_AA12BB'),
+    ack_timeout: float = typer.Option(60, "--ack-timeout", help="Segundos a esperar el ack de cada servidor (0 = no esperar)."),
+    retries: int = typer.Option(1, "--retries", help="Reintentos para los servidores que no confirmen."),
 ):
     """Prepara y envía el comando de reinicio del servidor."""
-    print(f"🔄 Iniciando acción 'reboot server' para el dispositivo [bold red]{device}[/bold red]...")
-    actions.handle_server_reboot(device=device)
+    print(f"🔄 Iniciando acción 'reboot server' para [bold red]{', '.join(device)}[/bold red]...")
+    actions.handle_server_reboot(device=device[0] if len(device) == 1 else list(device),
+                                 ack_timeout=ack_timeout, retries=retries)
     
 @client_app.command("set-params", help="Envía nuevos parámetros de operación al cliente.")
 def set_params(
@@ -70,5 +89,81 @@ def set_params(
     print(f"Comando 'set-params' con los siguientes datos (implementación pendiente): {params_to_update}")
 
 
+@app.command("session", help="Abre una sola conexión y acepta muchos comandos (interactivo o desde un script).")
+def session(
+    script: Path = typer.Option(None, "--script", "-s", help="Archivo con un comando por línea ('-' para stdin)."),
+):
+    """Sesión persistente: el handshake mTLS se paga una sola vez."""
+    if script is None and not sys.stdin.isatty():
+        script = Path("-")
+
+    try:
+        with CommanderSession() as active:
+            if script is None:
+                run_interactive(active)
+            elif str(script) == "-":
+                run_interactive(active, lines=iter(sys.stdin))
+            else:
+                with open(script) as f:
+                    run_interactive(active, lines=iter(f))
+    except Exception as e:
+        print(f"[bold red]❌ ERROR en la sesión:[/bold red] {e}")
+        raise typer.Exit(1)
+
+
+@app.command("rollout", help="Actualiza una flota por olas (canario -> porcentaje -> resto) con pausa automática.")
+def rollout(
+    target: str = typer.Option(..., "--target", "-t", help="'client' o 'server'."),
+    version: str = typer.Option(..., "--version", "-v", help="La etiqueta de la release de GitHub."),
+    device: List[str] = typer.Option([], "--device", "-d", help="ID del dispositivo (repetible)."),
+    devices_file: Path = typer.Option(None, "--devices-file", help="Archivo con un dispositivo por línea."),
+    group: str = typer.Option(None, "--group", "-g", help=f"Grupo definido en {fleet_rollout.DEVICE_GROUPS_FILE}."),
+    repo: str = typer.Option(actions.DEFAULT_REPO, "--repo", help="El repositorio de GitHub."),
+    canary: int = typer.Option(1, "--canary", help="Dispositivos en la primera ola."),
+    percent: float = typer.Option(25.0, "--percent", help="Porcentaje de la flota en la segunda ola."),
+    concurrency: int = typer.Option(5, "--concurrency", help="Actualizaciones simultáneas como máximo."),
+    max_failure_rate: float = typer.Option(0.2, "--max-failure-rate", help="Proporción de fallos por ola que pausa el despliegue."),
+    ack_timeout: float = typer.Option(60, "--ack-timeout", help="Segundos a esperar el ack de cada dispositivo."),
+    retries: int = typer.Option(1, "--retries", help="Reintentos para los que no confirmen."),
+    yes: bool = typer.Option(False, "--yes", "-y", help="No preguntar al pausar: abortar directamente."),
+):
+    """Resuelve el asset una vez y lo despliega por olas en una sola sesión."""
+    if target not in ("client", "server"):
+        print("[bold red]❌ --target debe ser 'client' o 'server'.[/bold red]")
+        raise typer.Exit(1)
+    try:
+        devices = fleet_rollout.load_devices(device, devices_file, group)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[bold red]❌ No se pudo leer la lista de dispositivos:[/bold red] {e}")
+        raise typer.Exit(1)
+    if not devices:
+        print("[bold yellow]Advertencia: No se especificaron dispositivos.[/bold yellow]")
+        raise typer.Exit()
+
+    try:
+        download_url = actions.resolve_asset_url(actions.release_asset_url(repo, version, target))
+    except Exception as e:
+        print(f"[bold red]❌ ERROR: No se pudo resolver el asset de la versión '{version}':[/bold red] {e}")
+        raise typer.Exit(1)
+
+    def on_pause(pause):
+        return not yes and typer.confirm(f"¿Continuar con los {len(pause['remaining'])} dispositivos restantes?")
+
+    # Las actualizaciones se confirman con el ack: la del servidor todavía no
+    # reinicia (OTAManager) ni su evento 'boot' lleva el command_id, así que
+    # esperar ese evento sólo agotaría el plazo o aceptaría el reinicio programado.
+    try:
+        with CommanderSession() as active:
+            summary = fleet_rollout.run_rollout(
+                active, target, download_url, devices, canary=canary, percent=percent,
+                max_in_flight=concurrency, max_failure_rate=max_failure_rate, ack_timeout=ack_timeout,
+                retries=retries, on_pause=on_pause)
+    except Exception as e:
+        print(f"[bold red]❌ ERROR durante el despliegue:[/bold red] {e}")
+        raise typer.Exit(1)
+    if summary["status"] != "completed":
+        raise typer.Exit(1)
+
+
 if __name__ == "__main__":
     app()
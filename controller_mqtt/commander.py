@@ -2,24 +2,44 @@
 
 import asyncio
 import json
+import os
+import time
 from typing import List, Union, Dict, Any
 from awscrt import io, mqtt
 from awsiot import mqtt_connection_builder
 from .config import AWSIoTConfig
+from .acks import AckCollector, send_with_acks
 
 class IoTCommander:
 
-    def __init__(self, config: AWSIoTConfig):
+    # Publicaciones esperando PUBACK a la vez cuando se envía a una flota
+    MAX_IN_FLIGHT = int(os.getenv("AWS_IOT_MAX_IN_FLIGHT", "20"))
+    PUBLISH_TIMEOUT = float(os.getenv("AWS_IOT_PUBLISH_TIMEOUT", "15"))
+
+    def __init__(self, config: AWSIoTConfig, max_in_flight: int = None, publish_timeout: float = None,
+                 mqtt_connection=None):
+        """`mqtt_connection` permite usar otra conexión (p. ej. LocalBroker en pruebas)."""
         self.config = config
+        self.max_in_flight = max_in_flight or self.MAX_IN_FLIGHT
+        self.publish_timeout = publish_timeout or self.PUBLISH_TIMEOUT
+        self.ack_collector = None
+        self._injected_connection = mqtt_connection
         self.mqtt_connection = None
         self.event_loop_group = None
         self.host_resolver = None
         self.client_bootstrap = None
+        self.connected = False
 
-    async def connect(self):
+    async def connect(self) -> bool:
         if self.mqtt_connection:
             print("Ya se creó mqtt_connection. Intentando conectar de nuevo...")
 
+        if self._injected_connection is not None:
+            self.mqtt_connection = self._injected_connection
+            await asyncio.wrap_future(self.mqtt_connection.connect())
+            self.connected = True
+            return True
+
         print(f"Iniciando conexión a {self.config.endpoint}...")
         self.event_loop_group = io.EventLoopGroup(1)
         self.host_resolver = io.DefaultHostResolver(self.event_loop_group)
@@ -36,50 +56,120 @@ class IoTCommander:
         )
 
         try:
-            self.mqtt_connection.connect().result()
+            await asyncio.wrap_future(self.mqtt_connection.connect())
+            self.connected = True
             print("¡Conectado exitosamente!")
         except Exception as e:
             print(f"❌ Error en conexión MQTT: {e}")
-            return
+        return self.connected
 
-    async def _publish_command(self, topic: str, command_payload: Dict[str, Any], qos: mqtt.QoS):
+    async def _publish_command(self, topic: str, command_payload: Union[Dict[str, Any], str], qos: mqtt.QoS,
+                               device: str = None, verbose: bool = True) -> Dict[str, Any]:
+        """Publica y espera el PUBACK sin bloquear el loop. Devuelve el resultado del envío."""
+        result = {"device": device or topic, "topic": topic, "acked": False, "error": None, "latency_ms": None}
         if not self.mqtt_connection:
             print("Error: No hay conexión activa.")
-            return
+            result["error"] = "sin conexión"
+            return result
+
+        start = time.perf_counter()
         try:
-            message_json = json.dumps(command_payload)
-            print(f"Publicando en '{topic}': {message_json}")
+            # Las tramas compactas ya vienen como texto y se publican tal cual
+            message_json = command_payload if isinstance(command_payload, str) else json.dumps(command_payload)
+            if verbose:
+                print(f"Publicando en '{topic}': {message_json}")
             pub_ack_future, _ = self.mqtt_connection.publish(
                 topic=topic,
                 payload=message_json,
                 qos=qos
             )
-            pub_ack_future.result()  # <--- corregido aquí
-            print("¡Comando publicado!")
+            await asyncio.wait_for(asyncio.wrap_future(pub_ack_future), self.publish_timeout)
+            result["acked"] = True
+            if verbose:
+                print("¡Comando publicado!")
+        except asyncio.TimeoutError:
+            result["error"] = f"sin PUBACK en {self.publish_timeout:.0f} s"
         except Exception as e:
-            print(f"❌ Error publicando mensaje: {e}")
-
+            result["error"] = str(e) or type(e).__name__
+            if verbose:
+                print(f"❌ Error publicando mensaje: {e}")
+        result["latency_ms"] = (time.perf_counter() - start) * 1000
+        return result
 
     async def send_command(self,
                            command_payload: Dict[str, Any],
                            target_devices: Union[str, List[str]] = "all",
-                           qos: mqtt.QoS = mqtt.QoS.AT_LEAST_ONCE):
+                           qos: mqtt.QoS = mqtt.QoS.AT_LEAST_ONCE,
+                           max_in_flight: int = None) -> List[Dict[str, Any]]:
+        """
+        Envía el comando y devuelve un resultado por destino. Con una lista de
+        dispositivos publica en paralelo, con como máximo `max_in_flight`
+        publicaciones esperando su PUBACK a la vez.
+        """
         if isinstance(target_devices, str):
             topic = self.config.get_topic_for_all_devices() if target_devices == "all" else self.config.get_topic_for_device(target_devices)
-            await self._publish_command(topic, command_payload, qos)
+            return [await self._publish_command(topic, command_payload, qos, device=target_devices)]
         elif isinstance(target_devices, list):
-            print(f"Enviando comando a {len(target_devices)} dispositivos...")
-            for device_id in target_devices:
-                topic = self.config.get_topic_for_device(device_id)
-                await self._publish_command(topic, command_payload, qos)
+            window = asyncio.Semaphore(max_in_flight or self.max_in_flight)
+            print(f"Enviando comando a {len(target_devices)} dispositivos "
+                  f"(máx. {max_in_flight or self.max_in_flight} en vuelo)...")
+
+            async def publish(device_id):
+                async with window:
+                    topic = self.config.get_topic_for_device(device_id)
+                    return await self._publish_command(topic, command_payload, qos, device=device_id, verbose=False)
+
+            return list(await asyncio.gather(*(publish(device_id) for device_id in target_devices)))
         else:
             print(f"Error: Tipo de 'target_devices' no válido: {type(target_devices)}.")
+            return []
+
+    async def subscribe_acks(self) -> AckCollector:
+        """Se suscribe una sola vez al tópico de acks y devuelve el collector de la conexión."""
+        if self.ack_collector is None:
+            collector = AckCollector(asyncio.get_running_loop())
+            subscribe_future, _ = self.mqtt_connection.subscribe(
+                topic=self.config.ack_topic,
+                qos=mqtt.QoS.AT_LEAST_ONCE,
+                callback=collector.feed_threadsafe
+            )
+            await asyncio.wrap_future(subscribe_future)
+            print(f"Escuchando acks en '{self.config.ack_topic}'")
+            self.ack_collector = collector
+        return self.ack_collector
+
+    async def send_command_with_acks(self,
+                                     command_payload: Dict[str, Any],
+                                     command_id: str,
+                                     target_devices: List[str],
+                                     timeout: float = 60.0,
+                                     retries: int = 1,
+                                     max_in_flight: int = None,
+                                     wait_event: str = None,
+                                     event_timeout: float = 600.0) -> List[Dict[str, Any]]:
+        """
+        Como send_command, pero además espera el 'command_ack' de cada servidor
+        y reintenta a los que no respondan antes de `timeout`.
+        """
+        collector = await self.subscribe_acks()
+        verbose = len(target_devices) == 1
+
+        async def publish(device_id):
+            topic = self.config.get_topic_for_device(device_id)
+            return await self._publish_command(topic, command_payload, mqtt.QoS.AT_LEAST_ONCE,
+                                               device=device_id, verbose=verbose)
+
+        return await send_with_acks(publish, collector, command_id, target_devices,
+                                    timeout=timeout, retries=retries,
+                                    max_in_flight=max_in_flight or self.max_in_flight,
+                                    wait_event=wait_event, event_timeout=event_timeout)
 
     async def disconnect(self):
         if self.mqtt_connection:
             try:
                 print("Desconectando...")
-                self.mqtt_connection.disconnect().result()
+                await asyncio.wrap_future(self.mqtt_connection.disconnect())
+                self.connected = False
                 print("Desconectado.")
             except Exception as e:
                 print(f"Error al desconectar: {e}")
@@ -1,10 +1,15 @@
 # controller_mqtt/commands.py
 
 import time
+import uuid
 from typing import Dict, Any
 
+def new_command_id() -> str:
+    return uuid.uuid4().hex[:12]
+
 def _base_command(command_type: str, sender: str = "controller_mqtt_cli") -> Dict[str, Any]:
     return {
+        "command_id": new_command_id(),  # el servidor lo devuelve en su 'command_ack'
         "timestamp": int(time.time()),
         "sender": sender,
         "command_type": command_type,
@@ -20,6 +20,8 @@ class AWSIoTConfig:
         # Lee las variables cargadas
         self.endpoint = os.getenv("AWS_IOT_ENDPOINT")
         self.client_id = os.getenv("DEFAULT_CLIENT_ID", "controller-cli-default")
+        # Tópico donde los servidores publican sus eventos (incluidos los 'command_ack')
+        self.ack_topic = os.getenv("AWS_IOT_ACK_TOPIC", "BIO-GEN-01-F5Z/sensors")
 
         # Valida que las variables esenciales existan
         if not self.endpoint:
@@ -0,0 +1,99 @@
+# controller_mqtt/encoding.py
+
+import base64
+import json
+import struct
+from typing import Any, Dict
+
+# Trama compacta v1 (big-endian), la decodifica server/utils/command_frame.py:
+#   magic "B1" | versión (1) | tipo (1) | command_id (6) | timestamp (4) | cuerpo | CRC-16 (2)
+# Cuerpo según el tipo:
+#   reset / fetch_update: vacío / URL en UTF-8
+#   update: destino (1 byte: 0 client, 1 server) + URL en UTF-8
+#   params: JSON compacto de los parámetros
+# Se publica como un único token Base64 sin el envoltorio {"data": ...}: el
+# módem entrega los mensajes al Pico como texto en +QMTRECV, así que no pueden
+# llevar bytes crudos, comillas, comas ni saltos de línea.
+MAGIC = b"B1"
+VERSION = 1
+HEADER = struct.Struct(">2sBB6sI")
+COMMAND_TYPES = {"reset": 1, "params": 2, "update": 3, "fetch_update": 4}
+TARGETS = {"client": 0, "server": 1}
+_TYPE_NAMES = {code: name for name, code in COMMAND_TYPES.items()}
+_TARGET_NAMES = {code: name for name, code in TARGETS.items()}
+
+
+def crc16(data: bytes, crc: int = 0xFFFF) -> int:
+    """CRC-16/CCITT-FALSE; la misma implementación corre en la Pico."""
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+            crc &= 0xFFFF
+    return crc
+
+
+def encode_command(command: Dict[str, Any]) -> bytes:
+    """Comando (dict de commands.py) -> trama binaria. ValueError si no es representable."""
+    command_type = command["command_type"]
+    if command_type not in COMMAND_TYPES:
+        raise ValueError(f"Tipo de comando sin codificación compacta: {command_type}")
+    try:
+        command_id = bytes.fromhex(command["command_id"])
+    except (KeyError, ValueError):
+        raise ValueError("La codificación compacta requiere un command_id de 12 dígitos hex")
+    if len(command_id) != 6:
+        raise ValueError("La codificación compacta requiere un command_id de 12 dígitos hex")
+
+    payload = command.get("payload") or {}
+    if command_type == "update":
+        body = bytes([TARGETS[payload["target"]]]) + payload["url"].encode("utf-8")
+    elif command_type == "fetch_update":
+        body = payload["details_url"].encode("utf-8")
+    elif command_type == "params":
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    else:
+        body = b""
+
+    frame = HEADER.pack(MAGIC, VERSION, COMMAND_TYPES[command_type], command_id,
+                        int(command["timestamp"])) + body
+    return frame + struct.pack(">H", crc16(frame))
+
+
+def decode_command(frame: bytes) -> Dict[str, Any]:
+    """Trama binaria -> comando. ValueError si la trama es inválida."""
+    if len(frame) < HEADER.size + 2:
+        raise ValueError("Trama demasiado corta")
+    if struct.unpack(">H", frame[-2:])[0] != crc16(frame[:-2]):
+        raise ValueError("CRC inválido")
+    magic, version, type_code, command_id, timestamp = HEADER.unpack_from(frame)
+    if magic != MAGIC or version != VERSION or type_code not in _TYPE_NAMES:
+        raise ValueError("Cabecera desconocida")
+
+    command_type = _TYPE_NAMES[type_code]
+    body = frame[HEADER.size:-2]
+    if command_type == "update":
+        payload = {"target": _TARGET_NAMES[body[0]], "url": body[1:].decode("utf-8")}
+    elif command_type == "fetch_update":
+        payload = {"details_url": body.decode("utf-8")}
+    elif command_type == "params":
+        payload = json.loads(body)
+    else:
+        payload = {}
+    return {"command_id": command_id.hex(), "timestamp": timestamp,
+            "command_type": command_type, "payload": payload}
+
+
+def encode_command_token(command: Dict[str, Any]) -> str:
+    """Trama compacta en Base64: lo que se publica tal cual en el tópico."""
+    return base64.b64encode(encode_command(command)).decode("ascii")
+
+
+def decode_message(payload) -> Dict[str, Any]:
+    """Decodifica un mensaje en cualquiera de los dos formatos (envoltorio JSON o token compacto)."""
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    payload = payload.strip()
+    if payload.startswith(b"{"):
+        return json.loads(base64.b64decode(json.loads(payload)["data"]))
+    return decode_command(base64.b64decode(payload))
@@ -0,0 +1,120 @@
+# controller_mqtt/local_broker.py
+
+import json
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+from .encoding import decode_message
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """Comodines MQTT: '+' un nivel, '#' el resto."""
+    pattern_parts, topic_parts = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+def _done(value=None) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class LocalBroker:
+    """
+    Broker MQTT en memoria para pruebas sin AWS. `connection()` devuelve un
+    objeto con la misma interfaz que usa IoTCommander de la conexión de awscrt
+    (connect/publish/subscribe/disconnect devolviendo futuros).
+    """
+
+    def __init__(self):
+        self._subscriptions: List[Tuple[str, Callable]] = []
+        self._lock = threading.Lock()
+        self.published: List[Tuple[str, bytes]] = []
+
+    def subscribe(self, pattern: str, callback: Callable):
+        with self._lock:
+            self._subscriptions.append((pattern, callback))
+
+    def publish(self, topic: str, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        with self._lock:
+            self.published.append((topic, payload))
+            callbacks = [cb for pattern, cb in self._subscriptions if topic_matches(pattern, topic)]
+        for callback in callbacks:
+            callback(topic=topic, payload=payload)
+
+    def connection(self) -> "LocalConnection":
+        return LocalConnection(self)
+
+
+class LocalConnection:
+    def __init__(self, broker: LocalBroker):
+        self.broker = broker
+        self._packet_id = 0
+
+    def connect(self) -> Future:
+        return _done({"session_present": False})
+
+    def disconnect(self) -> Future:
+        return _done()
+
+    def publish(self, topic: str, payload, qos=None):
+        self._packet_id += 1
+        self.broker.publish(topic, payload)
+        return _done({"packet_id": self._packet_id}), self._packet_id
+
+    def subscribe(self, topic: str, qos=None, callback: Callable = None):
+        self.broker.subscribe(topic, callback)
+        self._packet_id += 1
+        return _done({"packet_id": self._packet_id, "topic": topic, "qos": qos}), self._packet_id
+
+
+class SimulatedServer:
+    """
+    Imita a la Pico: escucha bioiot/control/<id> y bioiot/control/all,
+    decodifica el mensaje (envoltorio Base64 o trama compacta) y publica el 'command_ack' en el tópico
+    de acks. `drop_acks` descarta los primeros N acks; `delay` los retrasa.
+    Con `reboot_delay`, tras un 'reset' o 'update' publica el evento 'boot'.
+    """
+
+    def __init__(self, broker: LocalBroker, device_id: str, ack_topic: str,
+                 delay: float = 0.0, drop_acks: int = 0, fail: bool = False,
+                 reboot_delay: float = None):
+        self.broker = broker
+        self.device_id = device_id
+        self.ack_topic = ack_topic
+        self.delay = delay
+        self.drop_acks = drop_acks
+        self.fail = fail
+        self.reboot_delay = reboot_delay
+        self.received: List[Dict] = []
+        broker.subscribe(f"bioiot/control/{device_id}", self._on_message)
+        broker.subscribe("bioiot/control/all", self._on_message)
+
+    def _on_message(self, topic, payload):
+        command = decode_message(payload)
+        self.received.append(command)
+        if self.fail:
+            return
+        if self.drop_acks > 0:
+            self.drop_acks -= 1
+            return
+        ack = {"device_id": self.device_id, "server_id": self.device_id, "system_status": "ok",
+               "event": "command_ack", "command_type": command.get("command_type"),
+               "command_id": command.get("command_id")}
+        send = lambda: self.broker.publish(self.ack_topic, json.dumps(ack))
+        if self.delay:
+            threading.Timer(self.delay, send).start()
+        else:
+            send()
+        if self.reboot_delay is not None and command.get("command_type") in ("reset", "update"):
+            boot = {"device_id": self.device_id, "system_status": "ok", "event": "boot",
+                    "command_id": command.get("command_id")}
+            threading.Timer(self.delay + self.reboot_delay,
+                            lambda: self.broker.publish(self.ack_topic, json.dumps(boot))).start()
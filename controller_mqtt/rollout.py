@@ -0,0 +1,89 @@
+# controller_mqtt/rollout.py
+
+import json
+import math
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+from rich import print
+from . import commands
+from .actions import _wrap_command, print_publish_results
+from .session import CommanderSession
+
+DEVICE_GROUPS_FILE = os.getenv("DEVICE_GROUPS_FILE", "device_groups.json")
+
+
+def load_devices(devices: Iterable[str] = (), devices_file: Optional[str] = None,
+                 group: Optional[str] = None, groups_file: str = DEVICE_GROUPS_FILE) -> List[str]:
+    """
+    Junta los dispositivos de la línea de comandos, de un archivo (uno por
+    línea, '#' para comentarios) y de un grupo de `groups_file`
+    ({"grupo": ["SERVER_1", ...]}), sin repetidos y en el orden dado.
+    """
+    found = list(devices)
+    if devices_file:
+        with open(devices_file) as f:
+            found += [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    if group:
+        with open(groups_file) as f:
+            groups = json.load(f)
+        if group not in groups:
+            raise KeyError(f"El grupo '{group}' no existe en {groups_file}")
+        found += groups[group]
+    return list(dict.fromkeys(found))
+
+
+def plan_waves(devices: List[str], canary: int = 1, percent: float = 25.0) -> List[List[str]]:
+    """
+    Divide la flota en olas: `canary` dispositivos, luego hasta `percent` % de
+    la flota y por último el resto. Las olas vacías se omiten.
+    """
+    canary = max(0, min(canary, len(devices)))
+    second = canary + max(1, math.ceil(len(devices) * percent / 100.0))
+    waves = [devices[:canary], devices[canary:second], devices[second:]]
+    return [wave for wave in waves if wave]
+
+
+def run_rollout(session: CommanderSession, target: str, download_url: str, devices: List[str],
+                canary: int = 1, percent: float = 25.0, max_in_flight: int = 5,
+                max_failure_rate: float = 0.2, ack_timeout: float = 60.0, retries: int = 1,
+                wait_boot: bool = False, boot_timeout: float = 600.0,
+                on_pause: Optional[Callable[[Dict], bool]] = None) -> Dict:
+    """
+    Actualiza la flota por olas con un único comando (misma URL ya resuelta y
+    mismo command_id) y como mucho `max_in_flight` envíos simultáneos.
+
+    Tras cada ola, si la proporción de dispositivos sin confirmar supera
+    `max_failure_rate` el despliegue se pausa: sigue sólo si `on_pause(resumen)`
+    devuelve True; sin `on_pause` se aborta. Con `wait_boot` un dispositivo
+    confirma cuando, además del ack, publica tras reiniciar un evento 'boot'
+    con el command_id de la actualización; sin él basta el ack.
+    """
+    command = commands.create_update_command(target, download_url)
+    payload = _wrap_command(command)
+    waves = plan_waves(devices, canary, percent)
+    summary = {"status": "completed", "command_id": command["command_id"], "waves": len(waves),
+               "results": [], "pending": []}
+
+    for number, wave in enumerate(waves, start=1):
+        print(f"🌊 Ola {number}/{len(waves)}: {len(wave)} dispositivos")
+        results = session.send_with_acks(payload, command["command_id"], wave,
+                                         timeout=ack_timeout, retries=retries, max_in_flight=max_in_flight,
+                                         wait_event="boot" if wait_boot else None, event_timeout=boot_timeout)
+        print_publish_results(results, f"Ola {number}/{len(waves)} ({target})")
+        summary["results"] += results
+
+        failed = [r["device"] for r in results if not r["confirmed"]]
+        failure_rate = len(failed) / len(wave)
+        remaining = [d for later in waves[number:] for d in later]
+        if failure_rate > max_failure_rate and remaining:
+            print(f"[bold yellow]⏸️  {failure_rate:.0%} de fallos en la ola {number} "
+                  f"(máximo {max_failure_rate:.0%}): {', '.join(failed)}[/bold yellow]")
+            pause = {"wave": number, "failure_rate": failure_rate, "failed": failed, "remaining": remaining}
+            if on_pause is None or not on_pause(pause):
+                print(f"[bold red]🛑 Despliegue abortado; {len(remaining)} dispositivos sin actualizar.[/bold red]")
+                summary.update(status="aborted", pending=remaining)
+                break
+
+    confirmed = sum(1 for r in summary["results"] if r["confirmed"])
+    print(f"Despliegue {summary['status']}: {confirmed}/{len(devices)} dispositivos confirmados.")
+    return summary
@@ -0,0 +1,138 @@
+# controller_mqtt/session.py
+
+import asyncio
+import shlex
+from typing import Any, Dict, List, Optional, Union
+from rich import print
+from .config import AWSIoTConfig
+from .commander import IoTCommander
+
+
+class CommanderSession:
+    """
+    Mantiene una sola conexión MQTT (y un solo event loop) abierta durante
+    toda la sesión del operador, para pagar el handshake mTLS una vez y no
+    en cada comando.
+
+        with CommanderSession() as session:
+            session.send(payload, "SERVER_AA12BB")
+            session.send(otro_payload, ["SERVER_1", "SERVER_2"])
+    """
+
+    def __init__(self, config: Optional[AWSIoTConfig] = None, commander: Optional[IoTCommander] = None):
+        self.config = config
+        self.commander = commander
+        self.loop = asyncio.new_event_loop()
+        self.commands_sent = 0
+
+    @property
+    def connected(self) -> bool:
+        return bool(self.commander and self.commander.connected)
+
+    def run(self, coro):
+        """Ejecuta una corrutina en el loop de la sesión (siempre el mismo)."""
+        return self.loop.run_until_complete(coro)
+
+    def open(self) -> bool:
+        """Conecta si todavía no hay conexión; las llamadas siguientes la reutilizan."""
+        if self.connected:
+            return True
+        if self.commander is None:
+            self.config = self.config or AWSIoTConfig()
+            self.commander = IoTCommander(self.config)
+        print("🛰️  Realizando conexión con AWS IoT Core...")
+        if not self.run(self.commander.connect()):
+            raise ConnectionError("No se pudo conectar a AWS IoT Core")
+        return True
+
+    def send(self, command_payload: Dict[str, Any], target_devices: Union[str, List[str]] = "all"):
+        self.open()
+        result = self.run(self.commander.send_command(command_payload, target_devices=target_devices))
+        self.commands_sent += 1
+        return result
+
+    def send_with_acks(self, command_payload: Dict[str, Any], command_id: str, target_devices: List[str],
+                       timeout: float = 60.0, retries: int = 1, **kwargs):
+        """
+        Envía y espera el 'command_ack' de cada dispositivo, reintentando los que no
+        respondan. `kwargs` pasa max_in_flight / wait_event / event_timeout al commander.
+        """
+        self.open()
+        result = self.run(self.commander.send_command_with_acks(
+            command_payload, command_id, target_devices, timeout=timeout, retries=retries, **kwargs))
+        self.commands_sent += 1
+        return result
+
+    def close(self):
+        try:
+            if self.connected:
+                print("🔌 Desconectando de AWS IoT Core...")
+                self.run(self.commander.disconnect())
+        finally:
+            if not self.loop.is_closed():
+                self.loop.close()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+SESSION_HELP = """Comandos disponibles:
+  reboot <dispositivo> [dispositivo...]         Reinicia uno o varios servidores
+  update <client|server> <dispositivo> <versión> [repo]
+  status                                        Estado de la conexión
+  help                                          Muestra esta ayuda
+  exit | quit                                   Cierra la sesión"""
+
+
+def run_interactive(session: CommanderSession, lines=None, prompt: str = "bio-iot> "):
+    """
+    Bucle de comandos sobre una sesión abierta. Con `lines` (p. ej. sys.stdin
+    en modo daemon/script) lee de ahí en vez de pedir input al operador.
+    """
+    from . import actions
+
+    def next_line():
+        if lines is None:
+            return input(prompt)
+        line = next(lines, None)
+        if line is None:
+            raise EOFError
+        return line
+
+    print(SESSION_HELP)
+    while True:
+        try:
+            line = next_line().strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            break
+        if not line or line.startswith("#"):
+            continue
+
+        try:
+            args = shlex.split(line)
+        except ValueError as e:
+            print(f"[bold red]❌ Comando inválido:[/bold red] {e}")
+            continue
+        name, args = args[0].lower(), args[1:]
+
+        if name in ("exit", "quit"):
+            break
+        elif name == "help":
+            print(SESSION_HELP)
+        elif name == "status":
+            state = "conectado" if session.connected else "desconectado"
+            print(f"Sesión {state}, {session.commands_sent} comandos enviados.")
+        elif name == "reboot" and args:
+            actions.handle_server_reboot(args[0] if len(args) == 1 else args, session=session)
+        elif name == "update" and len(args) in (3, 4) and args[0] in ("client", "server"):
+            target, device, version = args[:3]
+            repo = args[3] if len(args) == 4 else actions.DEFAULT_REPO
+            actions.handle_update(device, target, actions.release_asset_url(repo, version, target),
+                                  session=session)
+        else:
+            print(f"[bold yellow]Comando no reconocido: {line}[/bold yellow] (escribe 'help')")
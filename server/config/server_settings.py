@@ -1,2 +1,27 @@
 INITIAL_DELAY_S = 15
 REBOOT_HOURS = 24
+
+# Store-and-forward backlog for readings that could not be published
+BACKLOG_DIR = "backlog"
+BACKLOG_SEGMENT_BYTES = 8 * 1024
+BACKLOG_MAX_BYTES = 96 * 1024
+BACKLOG_BATCH = 10
+BACKLOG_RETRY_S = 60
+
+# Readings arriving within the window are published together as one JSON array
+BATCH_WINDOW_S = 3
+BATCH_MAX_BYTES = 2048
+BATCH_MAX_READINGS = 10
+
+# Largest JSON command reassembled from MQTT messages
+MQTT_FRAME_MAX_BYTES = 2048
+
+# Client readings waiting to be published; the oldest are dropped beyond this
+UART_QUEUE_SIZE = 32
+UART_MAX_LINE = 1024
+# Receive buffer of the client UART (9600 baud, ~960 B/s), at the cost of that
+# much RAM. Publishes await the modem, but when the AWS session is down the
+# reconnect steps (AT+QMTCONN?, network registration, AT+QMTOPEN...) are still
+# synchronous AT commands that block the loop for up to their timeouts. This
+# covers ~4 s of client data per blocking step; a longer stall loses bytes.
+UART_RXBUF = 4096
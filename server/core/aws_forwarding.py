@@ -2,48 +2,112 @@
 
 import uasyncio as asyncio
 import json
-from pico_lte.core import PicoLTE
 from machine import Pin
 from utils.logger import log_message
 from config.device_info import DEVICE_ID
+from core.modem import picoLTE, arbiter, PRIORITY_PUBLISH
+from utils.flash_queue import FlashQueue
+from utils.batcher import PayloadBatcher, join_records
+from config.server_settings import (BACKLOG_DIR, BACKLOG_SEGMENT_BYTES, BACKLOG_MAX_BYTES,
+                                    BACKLOG_BATCH, BACKLOG_RETRY_S,
+                                    BATCH_WINDOW_S, BATCH_MAX_BYTES, BATCH_MAX_READINGS)
 
 led = Pin("LED", Pin.OUT)
 
-try:
-    picoLTE = PicoLTE()
-    aws_enabled = True
-    log_message("AWS IoT Core connection initialized")
-except Exception as e:
-    aws_enabled = False
-    log_message(f"Error initializing AWS IoT: {e}")
+aws_enabled = picoLTE is not None
 
-async def send_to_aws(data):
+# Readings that failed to publish; drained by drain_backlog() once AWS answers again
+backlog = FlashQueue(BACKLOG_DIR, BACKLOG_SEGMENT_BYTES, BACKLOG_MAX_BYTES)
+link_up = asyncio.Event()
+
+async def publish_payload(payload):
     if not aws_enabled:
         log_message("AWS IoT Core not initialized, skipping upload")
         return False
-    
-    try:
-        payload_json = {}
-
-        for k, v in data.items():
-            payload_json[k] = v
 
-        payload_json["server_id"] = DEVICE_ID # Server ID & client ID in payload
-
-        payload = json.dumps(payload_json)
+    try:
         retry_count = 3
 
         for attempt in range(1, retry_count + 1):
-            result = picoLTE.aws.publish_message(payload)
+            result = await arbiter.call(picoLTE.aws.publish_message_async, payload, priority=PRIORITY_PUBLISH)
             if result["status"] == 0:
                 log_message("Data sent successfully to AWS IoT Core")
                 led.toggle()
+                link_up.set()
                 return True
             else:
                 log_message(f"Attempt {attempt}: Error sending data to AWS IoT Core")
                 await asyncio.sleep(1)
 
+        link_up.clear()
         return False
+    except Exception as e:
+        log_message(f"ERROR AWS: {e}")
+        link_up.clear()
+        return False
+
+def _with_server_id(data):
+    payload_json = {}
+
+    for k, v in data.items():
+        payload_json[k] = v
+
+    payload_json["server_id"] = DEVICE_ID # Server ID & client ID in payload
+    return json.dumps(payload_json)
+
+async def send_to_aws(data):
+    """Publishes one message right away (events, acks)."""
+    try:
+        payload = _with_server_id(data)
     except Exception as e:
         log_message(f"ERROR AWS: {e}")
         return False
+    return await publish_payload(payload)
+
+def _store_records(records):
+    try:
+        for record in records:
+            backlog.append(record)
+        log_message(f"{len(records)} reading(s) stored in backlog ({backlog.size()} bytes, {backlog.evicted} evicted)")
+    except Exception as e:
+        log_message(f"ERROR backlog: {e}")
+
+# Client readings arriving within BATCH_WINDOW_S go out as one JSON-array publish
+batcher = PayloadBatcher(publish_payload, _store_records, window_s=BATCH_WINDOW_S,
+                         max_bytes=BATCH_MAX_BYTES, max_records=BATCH_MAX_READINGS)
+
+async def queue_reading(data):
+    """Queues a client reading for the next batch; failed batches end up in the backlog."""
+    try:
+        await batcher.add(_with_server_id(data))
+    except Exception as e:
+        log_message(f"ERROR AWS: {e}")
+
+async def drain_backlog():
+    """Re-sends stored readings in batches whenever a publish has succeeded (or every BACKLOG_RETRY_S)."""
+    while True:
+        try:
+            await asyncio.wait_for(link_up.wait(), BACKLOG_RETRY_S)
+        except asyncio.TimeoutError:
+            pass
+        if backlog.is_empty():
+            await asyncio.sleep(BACKLOG_RETRY_S)
+            continue
+
+        try:
+            batch = backlog.peek(max_records=BACKLOG_BATCH, max_bytes=BATCH_MAX_BYTES)
+            records = []
+            for record, _ in batch:
+                try:
+                    json.loads(record)
+                    records.append(record)
+                except ValueError:
+                    log_message("Dropping unreadable backlog record")
+            if not records or await publish_payload(join_records(records)):
+                backlog.commit(batch[-1][1])
+                log_message(f"Backlog: {len(records)} reading(s) re-sent")
+            else:
+                await asyncio.sleep(BACKLOG_RETRY_S)
+        except Exception as e:
+            log_message(f"ERROR backlog drain: {e}")
+            await asyncio.sleep(BACKLOG_RETRY_S)
@@ -0,0 +1,127 @@
+# server/core/modem.py
+#
+# One PicoLTE (one ATCom on UART0, one power-up) shared by every task, and an
+# arbiter that runs AT transactions one at a time. Without it aws_forwarding,
+# mqtt_listener and the OTA flow each built their own PicoLTE, and an OTA
+# download or AT+QFDWL stream could be interleaved with a publish or a poll.
+
+import uasyncio as asyncio
+from utils.logger import log_message
+
+PRIORITY_PUBLISH = 0  # readings and acks going to AWS
+PRIORITY_COMMAND = 1  # handling a received command (OTA, subscribe)
+PRIORITY_POLL = 2     # AT+QMTRECV? polling
+
+
+class _Job:
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.done = asyncio.Event()
+        self.result = None
+        self.error = None
+
+
+class _Exclusive:
+    """Holds the modem across several awaits (multi-step flows like OTA)."""
+
+    def __init__(self, arbiter, priority):
+        self.arbiter = arbiter
+        self.priority = priority
+        self.released = asyncio.Event()
+        self.granted = asyncio.Event()
+
+    async def __aenter__(self):
+        self.arbiter._put(self.priority, self)
+        try:
+            await self.granted.wait()
+        except BaseException:
+            # Cancelled while queued: don't leave the worker waiting on us
+            self.released.set()
+            raise
+        return self.arbiter.modem
+
+    async def __aexit__(self, *exc):
+        self.released.set()
+        return False
+
+
+class ModemArbiter:
+    """
+    Serializes modem access. `await arbiter.call(fn, *args, priority=...)`
+    queues `fn` (sync, or returning an awaitable) and returns its result or
+    raises its exception. Pending jobs run by priority, FIFO within one
+    priority, so publishes overtake queued polls.
+    """
+
+    def __init__(self, modem=None, levels=3):
+        self.modem = modem
+        self._queues = [[] for _ in range(levels)]
+        self._wakeup = asyncio.Event()
+        self._worker = None
+        self.jobs_run = 0
+
+    def pending(self):
+        return sum(len(q) for q in self._queues)
+
+    def _put(self, priority, job):
+        self._queues[priority].append(job)
+        self._wakeup.set()
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    def _next(self):
+        for queue in self._queues:
+            if queue:
+                return queue.pop(0)
+        return None
+
+    async def call(self, fn, *args, priority=PRIORITY_POLL, **kwargs):
+        job = _Job(fn, args, kwargs)
+        self._put(priority, job)
+        await job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def exclusive(self, priority=PRIORITY_COMMAND):
+        """`async with arbiter.exclusive(): ...` -> nothing else touches the modem inside."""
+        return _Exclusive(self, priority)
+
+    async def _run(self):
+        while True:
+            job = self._next()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if isinstance(job, _Exclusive):
+                job.granted.set()
+                await job.released.wait()
+            else:
+                try:
+                    result = job.fn(*job.args, **job.kwargs)
+                    if hasattr(result, "send") and hasattr(result, "throw"):
+                        result = await result
+                    job.result = result
+                except Exception as e:
+                    job.error = e
+                job.done.set()
+            self.jobs_run += 1
+            # Let the woken caller run before the next transaction
+            await asyncio.sleep(0)
+
+
+try:
+    from pico_lte.core import PicoLTE
+    picoLTE = PicoLTE()
+    # Push received MQTT messages as +QMTRECV URCs (read by the URC router in mqtt_listener)
+    picoLTE.mqtt.set_message_recieve_mode_config(message_recieve_mode=0)
+    log_message("Modem initialized (shared PicoLTE)")
+except Exception as e:
+    picoLTE = None
+    log_message(f"Error initializing modem: {e}")
+
+arbiter = ModemArbiter(picoLTE)
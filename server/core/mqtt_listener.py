@@ -1,9 +1,6 @@
 # server/core/mqtt_listener.py
 
 import uasyncio as asyncio
-import ujson
-import ubinascii
-from pico_lte.core import PicoLTE
 from utils.logger import log_message
 from pico_lte.utils.status import Status
 from core.ota_manager import OTAManager
@@ -11,14 +8,22 @@ from mqtt_commands.params import ParamsCommand
 from mqtt_commands.reset import ResetCommand
 from mqtt_commands.udpate import UpdateCommand 
 from config.device_info import DEVICE_ID
+from config.server_settings import MQTT_FRAME_MAX_BYTES
+from core.aws_forwarding import send_to_aws
+from utils.payloads import build_command_ack_payload
+from utils.command_frame import decode_compact, decode_wrapper
+from utils.json_framer import JsonFramer
+from core.modem import picoLTE, arbiter, PRIORITY_COMMAND, PRIORITY_POLL
+from pico_lte.utils.urc import MQTT_RECEIVE, MQTT_STATE
 
 SUB_TOPICS = [
     (f"bioiot/control/{DEVICE_ID}", 1),
     ("bioiot/control/all", 1)
 ]
 
-picoLTE = PicoLTE()
-ota_manager = OTAManager(picoLTE)
+ota_manager = OTAManager(picoLTE, arbiter)
+# Reassembles JSON commands split across messages; capped at MQTT_FRAME_MAX_BYTES
+framer = JsonFramer(MQTT_FRAME_MAX_BYTES)
 
 COMMAND_HANDLERS = {
     "reset": ResetCommand(),
@@ -26,64 +31,90 @@ COMMAND_HANDLERS = {
     "update": UpdateCommand(ota_manager=ota_manager),
 }
 
+async def dispatch_command(command_data, topic):
+    command_type = command_data.get("command_type")
+    handler = COMMAND_HANDLERS.get(command_type)
+    if handler:
+        # Ack before handling: some handlers (reset) never return
+        await send_to_aws(build_command_ack_payload(
+            command_type, command_data.get("command_id")))
+        handler.handle(command_data, topic)
+    else:
+        log_message(f"ℹ️ Comando no reconocido: {command_type}")
+
+async def process_messages(messages):
+    """Decodes and dispatches received MQTT messages; partial JSON stays in the framer."""
+    topic = ""
+    wrappers = []
+    for msg in messages:
+        topic = msg.get("topic", "")
+        raw_message = msg.get("message", "")
+        if not raw_message:
+            continue
+        # Compact binary frames arrive whole as one base64 token
+        command_data = decode_compact(raw_message)
+        if command_data:
+            log_message(f"MQTT [Compacto]: {command_data}")
+            await dispatch_command(command_data, topic)
+        else:
+            overflows = framer.overflows
+            wrappers.extend(framer.feed(raw_message))
+            if framer.overflows != overflows:
+                log_message(f"⚠️ Mensaje MQTT demasiado grande descartado ({framer.overflows} en total)")
+
+    for json_str_wrapper in wrappers:
+        try:
+            command_data = decode_wrapper(json_str_wrapper)
+            if command_data:
+                log_message(f"MQTT [Decodificado]: {command_data}")
+                await dispatch_command(command_data, topic)
+
+        except Exception as e:
+            log_message(f"❌ Error procesando/decodificando: {e}")
+
+async def subscribe():
+    log_message("Subscribing to AWS IoT Core...")
+    result = await arbiter.call(picoLTE.aws.subscribe_topics, topics=SUB_TOPICS, priority=PRIORITY_COMMAND)
+    return result.get("status") == Status.SUCCESS
+
 async def listen_for_commands():
     log_message(f"📡 Registrando DEVICE_ID: {DEVICE_ID}")
-    
+
+    # The modem pushes each message as a +QMTRECV URC (recv/mode 0, set in core.modem):
+    # the router hands them over as soon as they arrive, no AT+QMTRECV? polling
+    urcs = picoLTE.atcom.subscribe_urc((MQTT_RECEIVE, MQTT_STATE))
+    picoLTE.atcom.start_urc_router()
+
     log_message("Conectando a la red celular...")
-    picoLTE.network.register_network()
-    picoLTE.network.get_pdp_ready()
-    
-    log_message("Subscribing to AWS IoT Core...")
-    result = picoLTE.aws.subscribe_topics(topics=SUB_TOPICS)
+    await arbiter.call(picoLTE.network.register_network, priority=PRIORITY_COMMAND)
+    await arbiter.call(picoLTE.network.get_pdp_ready, priority=PRIORITY_COMMAND)
 
-    if result.get("status") != Status.SUCCESS:
+    if not await subscribe():
         log_message("❌ Suscripción MQTT fallida.")
         return
 
     log_message("✅ Suscripción MQTT exitosa. Escuchando mensajes...")
-    
-    message_buffer = ""
+
+    try:
+        # Messages the modem stored before push mode was active
+        result = await arbiter.call(picoLTE.aws.read_messages, priority=PRIORITY_POLL)
+        await process_messages(result.get("messages", []))
+    except Exception as e:
+        log_message(f"❌ Error leyendo mensajes MQTT: {e}")
+
     while True:
         try:
-            result = picoLTE.aws.read_messages()
-            messages = result.get("messages", [])
-
-            for msg in messages:
-                raw_message = msg.get("message", "")
-                if raw_message:
-                    message_buffer += raw_message
-            
-            while '{' in message_buffer and '}' in message_buffer:
-                start_index = message_buffer.find('{')
-                end_index = message_buffer.find('}')
-                
-                if end_index > start_index:
-                    json_str_wrapper = message_buffer[start_index : end_index + 1]
-                    message_buffer = message_buffer[end_index + 1 :]
-                    
-                    try:
-                        wrapper_data = ujson.loads(json_str_wrapper)
-                        base64_payload = wrapper_data.get("data")
-                        
-                        if base64_payload:
-                            original_json_str = ubinascii.a2b_base64(base64_payload).decode('utf-8')
-                            log_message(f"MQTT [Decodificado]: {original_json_str}")
-                            
-                            command_data = ujson.loads(original_json_str)
-                            command_type = command_data.get("command_type")
-                            
-                            handler = COMMAND_HANDLERS.get(command_type)
-                            if handler:
-                                handler.handle(command_data, msg.get("topic", ""))
-                            else:
-                                log_message(f"ℹ️ Comando no reconocido: {command_type}")
-
-                    except Exception as e:
-                        log_message(f"❌ Error procesando/decodificando: {e}")
-                else:
-                    message_buffer = ""
-
-            await asyncio.sleep(2)
+            line = await urcs.get()
+            if line.startswith(MQTT_STATE):
+                # +QMTSTAT: the broker closed the session, subscriptions are gone
+                log_message(f"⚠️ MQTT desconectado ({line}). Resuscribiendo...")
+                framer.reset()
+                while not await subscribe():
+                    await asyncio.sleep(5)
+                continue
+
+            messages = picoLTE.mqtt.extract_messages([line], f"{MQTT_RECEIVE} 0,")
+            await process_messages(messages)
         except Exception as e:
             log_message(f"❌ Error leyendo mensajes MQTT: {e}")
             await asyncio.sleep(5)
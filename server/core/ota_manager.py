@@ -12,10 +12,14 @@ from pico_lte.core import PicoLTE
 from pico_lte.utils.status import Status
 from utils.logger import log_message
 from core.uart_manager import send_uart_command_async
+from core.modem import ModemArbiter, PRIORITY_COMMAND
 
 class OTAManager:
-    def __init__(self, picoLTE: PicoLTE):
+    def __init__(self, picoLTE: PicoLTE, arbiter: ModemArbiter):
         self.picoLTE = picoLTE
+        # Todo acceso al módem pasa por el árbitro: la descarga y el AT+QFDWL
+        # no pueden mezclarse con publicaciones ni con el sondeo de MQTT.
+        self.arbiter = arbiter
         self.update_in_progress = False
         log_message("OTA Manager inicializado.")
 
@@ -46,7 +50,8 @@ class OTAManager:
                 await uasyncio.sleep(5)
 
             log_message("OTA [3/3]: Limpiando archivos...")
-            self.picoLTE.file.delete_file_from_modem(firmware_filename)
+            await self.arbiter.call(self.picoLTE.file.delete_file_from_modem, firmware_filename,
+                                    priority=PRIORITY_COMMAND)
             log_message("OTA [3/3]: Limpieza completada.")
             log_message(f"OTA: [ÉXITO] Proceso para '{target}' finalizado.")
 
@@ -56,7 +61,10 @@ class OTAManager:
             self.update_in_progress = False
 
     async def _download_file_to_modem(self, url: str, filename: str) -> bool:
-        # Esta función no requiere cambios.
+        async with self.arbiter.exclusive(PRIORITY_COMMAND):
+            return await self._download_file_to_modem_locked(url, filename)
+
+    async def _download_file_to_modem_locked(self, url: str, filename: str) -> bool:
         ufs_path = f"UFS:{filename}"
         log_message(f"HTTP: Usando método de descarga directa para {filename}")
         
@@ -69,7 +77,8 @@ class OTAManager:
             self.picoLTE.http.set_server_url(url)
             self.picoLTE.http.get(timeout=60)
             
-            get_urc = self.picoLTE.atcom.get_urc_response("+QHTTPGET: 0,", timeout=120)
+            # Async: las demás tareas (UART, watchdog) siguen corriendo mientras llega el URC
+            get_urc = await self.picoLTE.atcom.get_urc_response_async("+QHTTPGET: 0,", timeout=120)
             if get_urc["status"] != Status.SUCCESS:
                 log_message(f"HTTP: Falló la petición GET inicial. {get_urc.get('response')}")
                 return False
@@ -129,11 +138,12 @@ class OTAManager:
             
             log_message(f"OTA: Cliente conectado desde {addr}")
 
-            file_size = self._check_modem_file(filename)
-            if not file_size:
-                raise Exception(f"El archivo {filename} no se encontró en el módem.")
+            async with self.arbiter.exclusive(PRIORITY_COMMAND):
+                file_size = self._check_modem_file(filename)
+                if not file_size:
+                    raise Exception(f"El archivo {filename} no se encontró en el módem.")
 
-            success = self._stream_file_to_client(client_socket, file_size, filename)
+                success = self._stream_file_to_client(client_socket, file_size, filename)
             
         except socket.timeout:
             log_message("OTA: Error - Timeout esperando la conexión del cliente.")
@@ -2,9 +2,11 @@
 
 from machine import reset, UART, Pin
 from utils.logger import log_message
+from config.server_settings import UART_RXBUF
 import ujson
 
-uart = UART(1, baudrate=9600, tx=Pin(8), rx=Pin(9))
+# Same settings as uart_listener: constructing UART(1) again re-inits it
+uart = UART(1, baudrate=9600, tx=Pin(8), rx=Pin(9), rxbuf=UART_RXBUF)
 
 
 def send_uart_command(command_type: str, payload: dict = {}):
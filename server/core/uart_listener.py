@@ -4,29 +4,38 @@ import machine
 import ujson
 import uasyncio as asyncio
 from utils.logger import log_message
-from core.aws_forwarding import send_to_aws
+from utils.uart_lines import LinePump
+from core.aws_forwarding import queue_reading
+from config.server_settings import UART_QUEUE_SIZE, UART_MAX_LINE, UART_RXBUF
 
-uart = machine.UART(1, baudrate=9600, tx=machine.Pin(8), rx=machine.Pin(9))
+uart = machine.UART(1, baudrate=9600, tx=machine.Pin(8), rx=machine.Pin(9), rxbuf=UART_RXBUF)
+pump = None
+
+async def publish_readings():
+    reported_drops = 0
+    while True:
+        line = await pump.get()
+        try:
+            data = ujson.loads(line.decode())
+            log_message(f"UART data received: {data}")
+            await queue_reading(data)
+        except Exception as e:
+            log_message(f"Decode error: {e}")
+
+        if pump.dropped() != reported_drops:
+            reported_drops = pump.dropped()
+            log_message(f"UART queue overflow: {pump.stats()}")
 
 async def uart_listener():
+    global pump
     log_message("UART listener active.")
-    buffer = b""
+    # readline() wakes on received bytes; publishing runs in its own task
+    pump = LinePump(asyncio.StreamReader(uart), UART_QUEUE_SIZE, UART_MAX_LINE)
+    asyncio.create_task(publish_readings())
 
     while True:
         try:
-            chunk = uart.read()
-            if chunk:
-                buffer += chunk
-                while b"\n" in buffer:
-                    line, buffer = buffer.split(b"\n", 1)
-                    try:
-                        data = ujson.loads(line.decode().strip())
-                        log_message(f"UART data received: {data}")
-                        if not await send_to_aws(data):
-                            log_message("Backup pending (send_to_aws failed).")
-                    except Exception as e:
-                        log_message(f"Decode error: {e}")
+            await pump.run()
         except Exception as e:
             log_message(f"UART read error: {e}")
-
-        await asyncio.sleep(0.05)
+            await asyncio.sleep(1)
@@ -4,10 +4,16 @@ Module for including functions of AWS IoT operations of PicoLTE module.
 
 import time
 
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
 from pico_lte.common import config
 from pico_lte.utils.manager import StateManager, Step
 from pico_lte.utils.status import Status
 from pico_lte.utils.helpers import get_parameter
+from pico_lte.utils.urc import MQTT_STATE
 
 
 class AWS:
@@ -16,6 +22,7 @@ class AWS:
     """
 
     cache = config["cache"]
+    PUBLISH_FUNCTION = "aws.publish_message"
 
     def __init__(self, base, auth, network, ssl, mqtt, http):
         """
@@ -33,10 +40,20 @@ class AWS:
         self.mqtt = mqtt
         self.http = http
 
+        self.session_up = False
+        self._publish_manager = None
+        self._publish_key = None
+        # +QMTSTAT lines, routed by ATCom whenever it reads the modem
+        self._broker_state = mqtt.atcom.subscribe_urc(MQTT_STATE, maxsize=4)
+
     def publish_message(self, payload, host=None, port=None, topic=None):
         """
         Function for publishing a message to AWS IoT by using MQTT.
 
+        While the broker session is known to be up (the last publish succeeded
+        and no +QMTSTAT arrived since) the message goes straight to AT+QMTPUB.
+        Otherwise, or if that fails, the full connection chain runs.
+
         Parameters
         ----------
         payload : str
@@ -53,6 +70,49 @@ class AWS:
         dict
             Result that includes "status" and "response" keys
         """
+        host, port, topic = self._publish_params(host, port, topic)
+
+        if self.is_session_up():
+            result = self.mqtt.publish_message(payload=payload, topic=topic)
+            if result["status"] == Status.SUCCESS:
+                return result
+            self.session_up = False
+
+        sm = self._start_publish_chain(host, port, topic, payload, self.mqtt.publish_message)
+        while True:
+            result = sm.run()
+            if self._publish_chain_done(result):
+                return result
+            time.sleep(result["interval"])
+
+    async def publish_message_async(self, payload, host=None, port=None, topic=None):
+        """
+        Async version of publish_message for the event loop.
+
+        Both the fast path and the publish step of the chain await the modem
+        (see MQTT.publish_message_async), so other tasks, like the one reading
+        the client UART, keep running during a publish. The reconnect steps
+        before it are still synchronous AT commands; the chain only yields
+        between them.
+
+        Parameters and return value are those of publish_message.
+        """
+        host, port, topic = self._publish_params(host, port, topic)
+
+        if self.is_session_up():
+            result = await self.mqtt.publish_message_async(payload=payload, topic=topic)
+            if result["status"] == Status.SUCCESS:
+                return result
+            self.session_up = False
+
+        sm = self._start_publish_chain(host, port, topic, payload, self.mqtt.publish_message_async)
+        while True:
+            result = await sm.run_async()
+            if self._publish_chain_done(result):
+                return result
+            await asyncio.sleep(result["interval"])
+
+    def _publish_params(self, host, port, topic):
         if host is None:
             host = get_parameter(["aws", "mqtts", "host"])
 
@@ -61,6 +121,50 @@ class AWS:
 
         if topic is None:
             topic = get_parameter(["aws", "mqtts", "pub_topic"])
+        return host, port, topic
+
+    def _start_publish_chain(self, host, port, topic, payload, publish):
+        """`publish` is MQTT.publish_message or its async version."""
+        # Session unknown or lost: run from check_connected, not from the cached publish step
+        self.cache.set_state(self.PUBLISH_FUNCTION, None)
+
+        sm = self._get_publish_manager(host, port, topic)
+        step = sm.get_step("publish_message")
+        step.function = publish
+        step.update_function_params(payload=payload)
+        sm.restart()
+        return sm
+
+    def _publish_chain_done(self, result):
+        """True once the publish chain succeeded or failed; tracks the session state."""
+        if result["status"] == Status.SUCCESS:
+            self.session_up = True
+            return True
+        elif result["status"] == Status.ERROR:
+            self.session_up = False
+            return True
+        return False
+
+    def is_session_up(self):
+        """
+        Function for checking if the last publish left a usable broker session.
+        Any +QMTSTAT (connection closed by the broker or the network) received
+        since then means it did not.
+
+        Returns
+        -------
+        bool
+            True when the message can be published without checks
+        """
+        while self._broker_state.get_nowait() is not None:
+            self.session_up = False
+        return self.session_up
+
+    def _get_publish_manager(self, host, port, topic):
+        """Builds the publish state machine once per host, port and topic."""
+        key = (host, port, topic)
+        if self._publish_manager is not None and self._publish_key == key:
+            return self._publish_manager
 
         # Check if client is connected to the broker
         step_check_mqtt_connected = Step(
@@ -149,14 +253,11 @@ class AWS:
             name="publish_message",
             success="success",
             fail="failure",
-            function_params={"payload": payload, "topic": topic},
+            function_params={"payload": None, "topic": topic},
             cachable=True,
         )
 
-        # Add cache if it is not already existed
-        function_name = "aws.publish_message"
-
-        sm = StateManager(first_step=step_check_mqtt_connected, function_name=function_name)
+        sm = StateManager(first_step=step_check_mqtt_connected, function_name=self.PUBLISH_FUNCTION)
 
         sm.add_step(step_check_mqtt_connected)
         sm.add_step(step_check_mqtt_opened)
@@ -171,14 +272,9 @@ class AWS:
         sm.add_step(step_connect_mqtt_broker)
         sm.add_step(step_publish_message)
 
-        while True:
-            result = sm.run()
-
-            if result["status"] == Status.SUCCESS:
-                return result
-            elif result["status"] == Status.ERROR:
-                return result
-            time.sleep(result["interval"])
+        self._publish_manager = sm
+        self._publish_key = key
+        return sm
 
     def subscribe_topics(self, host=None, port=None, topics=None):
         """
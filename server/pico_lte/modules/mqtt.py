@@ -215,7 +215,7 @@ class MQTT:
         dict
             Result that includes "status" and "response" keys
         """
-        command = f'AT+QMTCFG="message_recieve_mode",{cid},{message_recieve_mode}'
+        command = f'AT+QMTCFG="recv/mode",{cid},{message_recieve_mode}'
         return self.atcom.send_at_comm(command)
 
     def open_connection(self, host=None, port=None, cid=0):
@@ -499,6 +499,31 @@ class MQTT:
             return result
         return {"response": "Missing parameter", "status": Status.ERROR}
 
+    async def publish_message_async(
+        self, payload, topic=None, qos=None, retain=0, message_id=1, cid=0
+    ):
+        """
+        Async version of publish_message: waits for the prompt and the result
+        with send_at_comm_async, so other tasks keep running meanwhile.
+
+        Parameters and return value are those of publish_message.
+        """
+        if topic is None:
+            topic = get_parameter(["mqtts", "pub_topic"])
+
+        if qos is None:
+            qos = get_parameter(["mqtts", "pub_qos"], 1)
+
+        if payload and topic:
+            command = f'AT+QMTPUB={cid},{message_id},{qos},{retain},"{topic}"'
+            result = await self.atcom.send_at_comm_async(command, ">", urc=True)
+
+            if result["status"] == Status.SUCCESS:
+                self.atcom.send_at_comm_once(payload, line_end=False)  # Send message
+                result = await self.atcom.send_at_comm_async(self.CTRL_Z)  # Send end char --> CTRL+Z
+            return result
+        return {"response": "Missing parameter", "status": Status.ERROR}
+
     def read_messages(self, cid=0):
         """
         Function for receiving MQTT messages.
@@ -6,6 +6,93 @@ import time
 from machine import UART, Pin
 from pico_lte.common import debug
 from pico_lte.utils.status import Status
+from pico_lte.utils.tokenizer import LineTokenizer
+from pico_lte.utils.urc import UrcQueue
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+
+class ResponseMatcher:
+    """
+    Class for evaluating modem response lines one at a time, with the same rules
+    as ATCom.get_response (or ATCom.get_urc_response when urc is True).
+
+    Parameters
+    ----------
+    desired_responses: str or list, default: None
+        Desired responses from modem
+    fault_responses: str or list, default: None
+        Fault responses from modem
+    urc: bool, default: False
+        If True, match the first desired/fault line without waiting for OK
+    """
+
+    def __init__(self, desired_responses=None, fault_responses=None, urc=False):
+        if isinstance(desired_responses, str):
+            desired_responses = [desired_responses]
+        if isinstance(fault_responses, str):
+            fault_responses = [fault_responses]
+        self.desired = desired_responses
+        self.fault = fault_responses
+        self.urc = urc
+        self.lines = []
+        self.scanned = 0  # lines before this one had no desired/fault match
+        self.result = None
+        if urc and not desired_responses and not fault_responses:
+            self.result = {"status": Status.SUCCESS, "response": "No desired or fault responses"}
+
+    def wants(self, line):
+        """Returns True if the line is one of the desired/fault responses."""
+        return bool(
+            (self.desired and any(desired in line for desired in self.desired))
+            or (self.fault and any(fault in line for fault in self.fault))
+        )
+
+    def _scan(self, line):
+        if self.desired and any(desired in line for desired in self.desired):
+            debug.debug("Desired:", line)
+            return Status.SUCCESS
+        if self.fault and any(fault in line for fault in self.fault):
+            debug.debug("Fault:", line)
+            return Status.ERROR
+        return None
+
+    def feed(self, line):
+        """
+        Function for adding a complete line
+
+        Returns
+        -------
+        dict or None
+            Result that includes "status" and "response" keys once the response is complete
+        """
+        if self.result is not None:
+            return self.result
+        self.lines.append(line)
+        status = None
+
+        if self.urc:
+            status = self._scan(line)
+        elif line == "OK":
+            if not self.desired:
+                status = Status.SUCCESS
+            elif len(self.lines) < 2:  # we haven't got an informative response here
+                status = Status.ERROR
+            else:
+                for focus_line in self.lines[self.scanned : -1]:  # only lines not scanned yet
+                    status = self._scan(focus_line)
+                    if status is not None:
+                        break
+                self.scanned = len(self.lines) - 1
+        elif "+CME ERROR:" in line or line == "ERROR":
+            status = Status.ERROR
+
+        if status is not None:
+            self.result = {"status": status, "response": self.lines[:]}
+        return self.result
 
 
 class ATCom:
@@ -13,6 +100,11 @@ class ATCom:
 
     def __init__(self, uart_number=0, tx_pin=Pin(0), rx_pin=Pin(1), baudrate=115200, timeout=10000, rxbuf=2048):
         self.modem_com = UART(uart_number, tx=tx_pin, rx=rx_pin, baudrate=baudrate, timeout=timeout, rxbuf=rxbuf)
+        self.stream = None  # async reader over modem_com, created on first use
+        self.lines = LineTokenizer(rxbuf)  # bytes received but not yet evaluated
+        self.urc_queues = []  # (prefixes, UrcQueue) filled by the URC router
+        self._router = None
+        self._waiting = None  # (matcher, event) of the async command waiting on the router
 
     def send_at_comm_once(self, command, line_end=True):
         """
@@ -52,59 +144,7 @@ class ATCom:
         dict
             Result that includes "status" and "response" keys
         """
-        response = ""
-        processed = []
-
-        if desired_responses:
-            if isinstance(desired_responses, str):  # if desired response is string
-                desired_responses = [desired_responses]  # make it list
-        if fault_responses:
-            if isinstance(fault_responses, str):  # if desired response is string
-                fault_responses = [fault_responses]  # make it list
-
-        timer = time.time()
-        while True:
-            time.sleep(0.1)  # wait for new chars
-
-            if time.time() - timer < timeout:
-                while self.modem_com.any():
-                    try:
-                        response += self.modem_com.read(self.modem_com.any()).decode("utf-8")
-                        debug.debug("Response:", [response])
-                    except:
-                        pass
-            else:
-                return {"status": Status.TIMEOUT, "response": "timeout"}
-
-            if response != "":
-                responses = response.split("\r\n")
-                processed.extend([x for x in responses if x != ""])
-                debug.debug("Processed:", processed)
-                response = ""
-
-            head = 0
-            for index, value in enumerate(processed):
-                processed_part = processed[head : index + 1]
-
-                if value == "OK":
-                    if not desired_responses:  # if we don't look for specific responses
-                        return {"status": Status.SUCCESS, "response": processed_part}
-                    else:
-                        if index - head < 1:  # we haven't got an informative response here
-                            return {"status": Status.ERROR, "response": processed_part}
-
-                        for focus_line in processed[head:index]:  # scan lines before 'OK'
-                            if desired_responses:
-                                if any(desired in focus_line for desired in desired_responses):
-                                    debug.debug("Desired:", focus_line)
-                                    return {"status": Status.SUCCESS, "response": processed_part}
-                            if fault_responses:
-                                if any(fault in focus_line for fault in fault_responses):
-                                    debug.debug("Fault:", focus_line)
-                                    return {"status": Status.ERROR, "response": processed_part}
-
-                elif "+CME ERROR:" in value or value == "ERROR":  # error
-                    return {"status": Status.ERROR, "response": processed_part}
+        return self._wait_response(ResponseMatcher(desired_responses, fault_responses), timeout)
 
     def get_urc_response(self, desired_responses=None, fault_responses=None, timeout=5):
         """
@@ -124,50 +164,21 @@ class ATCom:
         dict
             Result that includes "status" and "response" keys
         """
-        response = ""
-        processed = []
-
-        if desired_responses:
-            if isinstance(desired_responses, str):  # if desired response is string
-                desired_responses = [desired_responses]  # make it list
-        if fault_responses:
-            if isinstance(fault_responses, str):  # if desired response is string
-                fault_responses = [fault_responses]  # make it list
-
-        if not desired_responses and not fault_responses:
-            return {"status": Status.SUCCESS, "response": "No desired or fault responses"}
+        return self._wait_response(ResponseMatcher(desired_responses, fault_responses, urc=True), timeout)
 
+    def _wait_response(self, matcher, timeout):
+        if matcher.result is not None:
+            return matcher.result
         timer = time.time()
         while True:
-            time.sleep(0.1)  # wait for new chars
-
-            if time.time() - timer < timeout:
-                while self.modem_com.any():
-                    try:
-                        response += self.modem_com.read(self.modem_com.any()).decode("utf-8")
-                    except:
-                        pass
-            else:
+            # Only lines completed since the last pass are evaluated
+            result = self._match_buffered(matcher)
+            if result is not None:
+                return result
+            if time.time() - timer >= timeout:
                 return {"status": Status.TIMEOUT, "response": "timeout"}
-
-            if response != "":
-                responses = response.split("\r\n")
-                processed.extend([x for x in responses if x != ""])
-                debug.debug("Processed:", processed)
-                response = ""
-
-            head = 0
-            for index, value in enumerate(processed):
-                processed_part = processed[head : index + 1]
-
-                if desired_responses:
-                    for desired in desired_responses:
-                        if desired in value:
-                            return {"status": Status.SUCCESS, "response": processed_part}
-                if fault_responses:
-                    for fault in fault_responses:
-                        if fault in value:
-                            return {"status": Status.ERROR, "response": processed_part}
+            if not self.lines.read_from(self.modem_com):
+                time.sleep(0.1)  # wait for new chars
 
     def send_at_comm(self, command, desired=None, fault=None, timeout=5, line_end=True, urc=False):
         """
@@ -198,3 +209,182 @@ class ATCom:
         if urc:
             return self.get_urc_response(desired, fault, timeout)
         return self.get_response(desired, fault, timeout)
+
+    def _get_stream(self):
+        if self.stream is None:
+            self.stream = asyncio.StreamReader(self.modem_com)
+        return self.stream
+
+    def _route_urc(self, line, matcher):
+        """Puts an unsolicited line in its queues unless the pending command is waiting for it."""
+        routed = False
+        for prefixes, queue in self.urc_queues:
+            if line.startswith(prefixes):
+                if matcher is not None and matcher.wants(line):
+                    return False
+                queue.put_nowait(line)
+                routed = True
+        return routed
+
+    def _match_buffered(self, matcher):
+        """Feeds the complete lines already received; keeps the rest for the next call."""
+        while True:
+            raw = self.lines.next_line()
+            if raw is None:
+                # Prompts like "> " (AT+QMTPUB) are never terminated by a line end
+                if matcher is not None and self.lines.partial().strip() == b">":
+                    self.lines.discard_partial()
+                    return matcher.feed(">")
+                return None
+            if not raw:
+                continue
+            try:
+                line = raw.decode("utf-8")
+            except UnicodeError:
+                debug.error("Undecodable line from modem:", raw)
+                continue
+            debug.debug("Line:", line)
+            if self._route_urc(line, matcher):
+                continue
+            if matcher is None:
+                debug.debug("Unsolicited line dropped:", line)
+                continue
+            result = matcher.feed(line)
+            if result is not None:
+                return result
+
+    async def _read_until(self, matcher):
+        stream = self._get_stream()
+        while True:
+            result = self._match_buffered(matcher)
+            if result is not None:
+                return result
+            # Never read more than fits, so nothing is left outside the buffer
+            chunk = await stream.read(min(256, self.lines.reserve()) or 1)
+            if chunk:
+                self.lines.feed(chunk)
+
+    async def get_response_async(self, desired_responses=None, fault_responses=None, timeout=5, urc=False):
+        """
+                Async version of get_response (get_urc_response if urc is True) that
+                waits on the UART stream instead of sleeping, so other tasks keep
+                running until the response arrives or the timeout expires.
+
+        Parameters
+        ----------
+        desired_responses: str or list, default: None
+            Desired responses from modem
+        fault_responses: str or list, default: None
+            Fault responses from modem
+        timeout: int
+            Timeout for getting response
+        urc: bool, default: False
+            If True, get urc response
+
+        Returns
+        -------
+        dict
+            Result that includes "status" and "response" keys
+        """
+        matcher = ResponseMatcher(desired_responses, fault_responses, urc)
+        if matcher.result is not None:
+            return matcher.result
+        try:
+            if self._router is not None:
+                # Registered before the first await, so the router can't take the response first
+                event = asyncio.Event()
+                self._waiting = (matcher, event)
+                result = self._match_buffered(matcher)
+                if result is None:
+                    await asyncio.wait_for(event.wait(), timeout)
+                    result = matcher.result
+                return result
+            return await asyncio.wait_for(self._read_until(matcher), timeout)
+        except asyncio.TimeoutError:
+            return {"status": Status.TIMEOUT, "response": "timeout"}
+        finally:
+            self._waiting = None
+
+    async def get_urc_response_async(self, desired_responses=None, fault_responses=None, timeout=5):
+        """Async version of get_urc_response, see get_response_async."""
+        return await self.get_response_async(desired_responses, fault_responses, timeout, urc=True)
+
+    async def send_at_comm_async(self, command, desired=None, fault=None, timeout=5, line_end=True, urc=False):
+        """
+                Async version of send_at_comm, without the initial sleep
+
+        Parameters
+        ----------
+        command: str
+            AT command to send
+        desired: str or list, default: None
+            List of desired responses
+        fault: str or list, default: None
+            List of fault responses
+        timeout: int
+            Timeout for getting response
+        line_end: bool, default: True
+            If True, send line end
+        urc: bool, default: False
+            If True, get urc response
+
+        Returns
+        -------
+        dict
+            Result that includes "status" and "response" keys
+        """
+        self.send_at_comm_once(command, line_end=line_end)
+        return await self.get_response_async(desired, fault, timeout, urc=urc)
+
+    def subscribe_urc(self, prefixes, maxsize=16):
+        """
+        Function for receiving unsolicited lines (e.g. "+QMTRECV:") in a queue
+
+        Lines are routed while the URC router runs, and also while any other
+        command is reading responses, unless that command is waiting for them.
+        Every queue subscribed to a prefix gets its lines.
+
+        Parameters
+        ----------
+        prefixes: str or tuple
+            Line prefixes to route to the queue (see pico_lte.utils.urc)
+        maxsize: int, default: 16
+            Queue size; the oldest lines are dropped beyond it
+
+        Returns
+        -------
+        UrcQueue
+            Queue to await lines from
+        """
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+        queue = UrcQueue(maxsize)
+        self.urc_queues.append((tuple(prefixes), queue))
+        return queue
+
+    def start_urc_router(self, interval=0.02):
+        """
+        Function for starting the task that keeps reading the modem
+
+        While it runs, URCs are pushed to their queues as soon as they arrive and
+        async commands get their responses through it. The UART is polled with
+        any(), which costs no modem traffic.
+
+        Parameters
+        ----------
+        interval: float, default: 0.02
+            Seconds to sleep when the UART has nothing new
+        """
+        if self._router is None:
+            self._router = asyncio.create_task(self._route_urcs(interval))
+        return self._router
+
+    async def _route_urcs(self, interval):
+        while True:
+            received = self.lines.read_from(self.modem_com)
+            waiting = self._waiting
+            matcher = waiting[0] if waiting else None
+            if self._match_buffered(matcher) is not None:
+                self._waiting = None
+                waiting[1].set()
+            await asyncio.sleep(0 if received else interval)
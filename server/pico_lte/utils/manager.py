@@ -52,6 +52,8 @@ class StateManager:
         """Initializes state manager"""
         self.first_step = first_step
         self.function_name = function_name
+        # Per instance: a shared dict let one manager's steps replace another's
+        self.steps = {}
 
         if function_name:
             if not self.cache.states.get(function_name):
@@ -108,6 +110,11 @@ class StateManager:
         """Returns step with name"""
         return self.steps[name]
 
+    def restart(self):
+        """Rewinds the manager so a pre-built one can be run again"""
+        self.current = self.organizer_step
+        self.clear_counter()
+
     def clear_counter(self):
         """Clears retry counter"""
         self.retry_counter = 0
@@ -169,15 +176,25 @@ class StateManager:
         """Executes organizer step"""
         self.organizer()
 
-    def execute_current_step(self):
-        """Executes current step"""
+    def _call_current_step(self):
         params = self.current.function_params
 
         if params:
-            result = self.current.function(**params)
-        else:
-            result = self.current.function()
+            return self.current.function(**params)
+        return self.current.function()
+
+    def execute_current_step(self):
+        """Executes current step"""
+        return self._step_done(self._call_current_step())
+
+    async def execute_current_step_async(self):
+        """Executes current step, awaiting it if its function is async"""
+        result = self._call_current_step()
+        if hasattr(result, "send") and hasattr(result, "throw"):
+            result = await result
+        return self._step_done(result)
 
+    def _step_done(self, result):
         debug.debug(f"{self.current.function.__name__:<25} : {result}")
         self.cache.set_last_response(result.get("response"))
 
@@ -190,15 +207,22 @@ class StateManager:
 
     def run(self, begin=None, end=None):
         """Runs state manager."""
-        result = {}
+        self._enter_step(begin)
+        return self._step_result(self.execute_current_step(), end)
+
+    async def run_async(self, begin=None, end=None):
+        """Like run(), but awaits steps whose function is async (e.g. built on send_at_comm_async)."""
+        self._enter_step(begin)
+        return self._step_result(await self.execute_current_step_async(), end)
 
+    def _enter_step(self, begin):
         if begin:
             self.current = self.get_step(begin)
-            begin = None  # to run above line only once at the beginning
         else:
             self.execute_organizer_step()
 
-        step_result = self.execute_current_step()
+    def _step_result(self, step_result, end):
+        result = {}
 
         if end:
             if self.current.name == self.get_step(end).name:
@@ -0,0 +1,138 @@
+"""
+Module for splitting the modem byte stream into lines incrementally.
+"""
+
+# bytearray.find is missing on some MicroPython ports; fall back to a byte loop there
+_HAS_FIND = hasattr(bytearray, "find")
+
+
+class LineTokenizer:
+    """
+    Class for splitting modem output into lines over a preallocated buffer.
+
+    Bytes are appended once and only newly received bytes are searched for line
+    ends, so the cost per chunk is proportional to the chunk, not to everything
+    received so far. A line split across chunks is completed by the next chunk.
+
+    Parameters
+    ----------
+    size: int, default: 2048
+        Buffer size; a line longer than this is cut and counted in `overflows`
+    """
+
+    def __init__(self, size=2048):
+        self.size = size
+        self._buf = bytearray(size)
+        self._mv = memoryview(self._buf)
+        self._start = 0  # first byte of the current (unfinished) line
+        self._end = 0  # one past the last byte received
+        self._scan = 0  # bytes before this position hold no line end
+        self.overflows = 0
+
+    def _compact(self):
+        """Moves the unfinished line to the start of the buffer."""
+        pending = self._end - self._start
+        if self._start and pending:
+            self._buf[:pending] = self._buf[self._start : self._end]
+        self._scan -= self._start
+        self._start = 0
+        self._end = pending
+
+    def reserve(self):
+        """
+        Function for making room at the end of the buffer
+
+        Returns
+        -------
+        int
+            Number of bytes that can be fed now (0 while an overflowed line waits for next_line)
+        """
+        if self._end == self.size:
+            self._compact()
+            if self._end == self.size:
+                # A single line fills the buffer: next_line hands it out cut
+                self._scan = self._end
+                return 0
+        return self.size - self._end
+
+    def feed(self, data):
+        """
+        Function for appending received bytes
+
+        Parameters
+        ----------
+        data: bytes
+            Bytes read from the modem; only the first reserve() bytes are taken
+        Returns
+        -------
+        int
+            Number of bytes consumed
+        """
+        count = min(len(data), self.reserve())
+        self._buf[self._end : self._end + count] = data[:count]
+        self._end += count
+        return count
+
+    def read_from(self, uart):
+        """
+        Function for reading what the UART has available straight into the buffer
+
+        Returns
+        -------
+        int
+            Number of bytes read
+        """
+        available = uart.any()
+        if not available:
+            return 0
+        space = self.reserve()
+        if not space:
+            return 0
+        count = uart.readinto(self._mv[self._end : self._end + min(available, space)]) or 0
+        self._end += count
+        return count
+
+    def _find_line_end(self, start, end):
+        if _HAS_FIND:
+            return self._buf.find(b"\n", start, end)
+        buf = self._buf
+        for index in range(start, end):
+            if buf[index] == 10:
+                return index
+        return -1
+
+    def next_line(self):
+        """
+        Function for getting the next complete line
+
+        Returns
+        -------
+        bytes or None
+            Line without its line end, or None when no complete line is buffered
+        """
+        while True:
+            if self._scan >= self._end:
+                if self._end - self._start == self.size:
+                    # Overflowed line: return it as is
+                    line = bytes(self._buf[self._start : self._end])
+                    self._start = self._scan = self._end
+                    self.overflows += 1
+                    return line
+                return None
+            index = self._find_line_end(self._scan, self._end)
+            if index == -1:
+                self._scan = self._end
+                continue
+            stop = index - 1 if index > self._start and self._buf[index - 1] == 13 else index
+            line = bytes(self._buf[self._start : stop])
+            self._start = self._scan = index + 1
+            if self._start == self._end:
+                self._start = self._scan = self._end = 0
+            return line
+
+    def partial(self):
+        """Returns the bytes of the unfinished line, e.g. the "> " prompt of AT+QMTPUB."""
+        return bytes(self._buf[self._start : self._end])
+
+    def discard_partial(self):
+        self._start = self._scan = self._end = 0
@@ -0,0 +1,58 @@
+"""
+Module for delivering unsolicited result codes (URCs) to async consumers.
+"""
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# URCs the router can demultiplex; any other prefix can be subscribed as well
+MQTT_RECEIVE = "+QMTRECV:"
+MQTT_STATE = "+QMTSTAT:"
+HTTP_GET = "+QHTTPGET:"
+SOCKET_EVENT = "+QIURC:"
+
+
+class UrcQueue:
+    """
+    Class for a bounded FIFO of URC lines awaited by one consumer task
+    (uasyncio has no Queue). When full, the oldest line is dropped and
+    counted in `dropped`.
+
+    Parameters
+    ----------
+    maxsize: int, default: 16
+        Maximum number of buffered lines
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._items = []
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def qsize(self):
+        return len(self._items)
+
+    def put_nowait(self, line):
+        if len(self._items) >= self.maxsize:
+            self._items.pop(0)
+            self.dropped += 1
+        self._items.append(line)
+        self._ready.set()
+
+    def get_nowait(self):
+        """Returns the oldest line, or None when empty."""
+        if not self._items:
+            return None
+        line = self._items.pop(0)
+        if not self._items:
+            self._ready.clear()
+        return line
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.get_nowait()
@@ -0,0 +1,73 @@
+# server/utils/batcher.py
+#
+# Coalesces JSON records into one publish. Each AWS publish is a full
+# AT+QMTPUB round trip (prompt, payload, CTRL-Z, OK) with the radio on, so
+# readings arriving close together (e.g. a client flushing its backlog) go
+# out as one JSON array instead of one publish each.
+
+import uasyncio as asyncio
+
+
+def join_records(records):
+    """One record is sent as-is; several become a JSON array."""
+    if len(records) == 1:
+        return records[0]
+    return "[" + ",".join(records) + "]"
+
+
+class PayloadBatcher:
+    """
+    `await batcher.add(record)` buffers a JSON string. The batch is published
+    with `send(payload)` (async, returns True on success) once `window_s` has
+    passed since its first record, or right away when it reaches `max_records`
+    or the next record would push it over `max_bytes`. Records of a batch
+    that failed are handed to `on_failure(records)`.
+    """
+
+    def __init__(self, send, on_failure=None, window_s=3, max_bytes=2048, max_records=10):
+        self.send = send
+        self.on_failure = on_failure
+        self.window_s = window_s
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self._records = []
+        self._bytes = 0
+        self._generation = 0  # bumped on every flush, so stale timers do nothing
+        self.batches_sent = 0
+        self.records_sent = 0
+
+    def pending(self):
+        return len(self._records)
+
+    async def add(self, record):
+        # +1 for the separating comma / brackets
+        if self._records and self._bytes + len(record) + 1 > self.max_bytes:
+            await self.flush()
+        self._records.append(record)
+        self._bytes += len(record) + 1
+        if len(self._records) >= self.max_records or self._bytes >= self.max_bytes:
+            await self.flush()
+        elif len(self._records) == 1:
+            asyncio.create_task(self._flush_after(self._generation))
+
+    async def _flush_after(self, generation):
+        await asyncio.sleep(self.window_s)
+        if generation == self._generation:
+            await self.flush()
+
+    async def flush(self):
+        """Publishes whatever is buffered. Returns False if the publish failed."""
+        if not self._records:
+            return True
+        records = self._records
+        self._records = []
+        self._bytes = 0
+        self._generation += 1
+
+        ok = await self.send(join_records(records))
+        if ok:
+            self.batches_sent += 1
+            self.records_sent += len(records)
+        elif self.on_failure is not None:
+            self.on_failure(records)
+        return ok
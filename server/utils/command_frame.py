@@ -0,0 +1,74 @@
+# server/utils/command_frame.py
+#
+# Decodes the commands sent by controller_mqtt in either format:
+#   - legacy: {"data": "<base64 of the command JSON>"}
+#   - compact: a bare base64 token of a binary frame (controller_mqtt/encoding.py)
+#       "B1" | version | type | command_id (6) | timestamp (4) | body | CRC-16 (2)
+# The compact frame skips both JSON parses and is ~5x smaller for a reset.
+
+import ujson
+import ubinascii
+import ustruct
+
+MAGIC = b"B1"
+VERSION = 1
+HEADER_FORMAT = ">2sBB6sI"
+HEADER_SIZE = 14
+COMMAND_TYPES = {1: "reset", 2: "params", 3: "update", 4: "fetch_update"}
+TARGETS = {0: "client", 1: "server"}
+
+
+def crc16(data, crc=0xFFFF):
+    # CRC-16/CCITT-FALSE, same as controller_mqtt/encoding.py
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+            crc &= 0xFFFF
+    return crc
+
+
+def decode_frame(frame):
+    """Binary frame -> command dict, or None when it is not a valid frame."""
+    if len(frame) < HEADER_SIZE + 2 or frame[:2] != MAGIC:
+        return None
+    if ustruct.unpack(">H", frame[-2:])[0] != crc16(frame[:-2]):
+        return None
+    _, version, type_code, command_id, timestamp = ustruct.unpack_from(HEADER_FORMAT, frame)
+    command_type = COMMAND_TYPES.get(type_code)
+    if version != VERSION or command_type is None:
+        return None
+
+    body = frame[HEADER_SIZE:-2]
+    if command_type == "update":
+        payload = {"target": TARGETS.get(body[0], "server"), "url": body[1:].decode("utf-8")}
+    elif command_type == "fetch_update":
+        payload = {"details_url": body.decode("utf-8")}
+    elif command_type == "params":
+        payload = ujson.loads(body)
+    else:
+        payload = {}
+    return {
+        "command_id": ubinascii.hexlify(command_id).decode(),
+        "timestamp": timestamp,
+        "command_type": command_type,
+        "payload": payload,
+    }
+
+
+def decode_compact(token):
+    """Bare base64 token -> command dict, or None when it is not a compact frame."""
+    if "{" in token or "}" in token:
+        return None
+    try:
+        return decode_frame(ubinascii.a2b_base64(token.strip()))
+    except (ValueError, IndexError):
+        return None
+
+
+def decode_wrapper(json_str):
+    """Legacy {"data": base64(JSON)} wrapper -> command dict, or None without "data"."""
+    base64_payload = ujson.loads(json_str).get("data")
+    if not base64_payload:
+        return None
+    return ujson.loads(ubinascii.a2b_base64(base64_payload).decode("utf-8"))
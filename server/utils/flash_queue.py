@@ -0,0 +1,166 @@
+# server/utils/flash_queue.py
+#
+# Append-only queue on flash for payloads that could not be published.
+# Records are JSON lines in numbered segment files; a cursor file remembers
+# how far the drain has got. The cursor is written to a temp file and renamed
+# over the old one, so a reset mid-write leaves either the old or the new
+# cursor. When the queue outgrows its cap the oldest segments are deleted.
+# A line cut short by a reset is removed from the newest segment on open, so
+# the next append doesn't glue a record onto it.
+
+import uos
+
+SEGMENT_PREFIX = "seg_"
+CURSOR_FILE = "cursor"
+REPAIR_FILE = "repair.tmp"
+
+
+class FlashQueue:
+    def __init__(self, directory="backlog", segment_bytes=8 * 1024, max_bytes=96 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.evicted = 0  # records lost to the size cap
+        self._ensure_dir()
+        self._sizes = {}  # segment number -> size in bytes
+        for name in uos.listdir(directory):
+            if name.startswith(SEGMENT_PREFIX):
+                self._sizes[int(name[len(SEGMENT_PREFIX):])] = uos.stat(self._path(name))[6]
+        self._repair_tail()
+        self.cursor = self._load_cursor()
+
+    def _ensure_dir(self):
+        try:
+            uos.stat(self.directory)
+        except OSError:
+            uos.mkdir(self.directory)
+
+    def _path(self, name):
+        return f"{self.directory}/{name}"
+
+    def _segment_path(self, number):
+        return self._path(f"{SEGMENT_PREFIX}{number:08d}")
+
+    def _repair_tail(self):
+        """Rewrites the newest segment without a trailing line that has no newline."""
+        if not self._sizes:
+            return
+        number = max(self._sizes)
+        path = self._segment_path(number)
+        with open(path, "rb") as f:
+            if self._sizes[number] == 0:
+                return
+            f.seek(self._sizes[number] - 1)
+            if f.read(1) == b"\n":
+                return
+            f.seek(0)
+            data = f.read()
+        keep = data[:data.rfind(b"\n") + 1]
+        tmp = self._path(REPAIR_FILE)
+        with open(tmp, "wb") as f:
+            f.write(keep)
+        uos.rename(tmp, path)
+        self._sizes[number] = len(keep)
+
+    def _load_cursor(self):
+        try:
+            with open(self._path(CURSOR_FILE)) as f:
+                segment, offset = f.read().split()
+            cursor = (int(segment), int(offset))
+        except (OSError, ValueError):
+            cursor = (min(self._sizes) if self._sizes else 1, 0)
+        # The segment under the cursor may have been evicted before a reset
+        if self._sizes and cursor[0] < min(self._sizes):
+            cursor = (min(self._sizes), 0)
+        return cursor
+
+    def _save_cursor(self):
+        tmp = self._path(CURSOR_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            f.write(f"{self.cursor[0]} {self.cursor[1]}")
+        uos.rename(tmp, self._path(CURSOR_FILE))
+
+    def size(self):
+        """Bytes on flash, including records already drained from the first segment."""
+        return sum(self._sizes.values())
+
+    def is_empty(self):
+        segment, offset = self.cursor
+        return not any(number > segment or (number == segment and size > offset)
+                       for number, size in self._sizes.items())
+
+    def append(self, record):
+        """Stores one record (a str without newlines, e.g. a JSON payload)."""
+        line = (record + "\n").encode()
+        segment = max(self._sizes) if self._sizes else self.cursor[0]
+        if self._sizes.get(segment, 0) + len(line) > self.segment_bytes and self._sizes.get(segment):
+            segment += 1
+        with open(self._segment_path(segment), "ab") as f:
+            f.write(line)
+        self._sizes[segment] = self._sizes.get(segment, 0) + len(line)
+        self._enforce_cap()
+
+    def _enforce_cap(self):
+        while self.size() > self.max_bytes and len(self._sizes) > 1:
+            oldest = min(self._sizes)
+            if oldest >= self.cursor[0]:
+                self.evicted += self._count_records(oldest, self.cursor[1] if oldest == self.cursor[0] else 0)
+            self._drop_segment(oldest)
+            if self.cursor[0] <= oldest:
+                self.cursor = (oldest + 1, 0)
+                self._save_cursor()
+
+    def _count_records(self, segment, offset):
+        count = 0
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            while f.readline():
+                count += 1
+        return count
+
+    def _drop_segment(self, number):
+        try:
+            uos.remove(self._segment_path(number))
+        except OSError:
+            pass
+        self._sizes.pop(number, None)
+
+    def peek(self, max_records=10, max_bytes=4096):
+        """
+        Reads up to `max_records` records (and about `max_bytes`) from the cursor
+        without consuming them. Returns [(record, position_after), ...]; pass a
+        position to commit() once its record has been delivered.
+        """
+        batch = []
+        used = 0
+        segment, offset = self.cursor
+        for number in sorted(self._sizes):
+            if number < segment:
+                continue
+            start = offset if number == segment else 0
+            with open(self._segment_path(number), "rb") as f:
+                f.seek(start)
+                position = start
+                while len(batch) < max_records:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break  # end of segment (or a line cut by a reset)
+                    position += len(line)
+                    used += len(line)
+                    batch.append((line[:-1].decode(), (number, position)))
+                    if used >= max_bytes:
+                        return batch
+            if len(batch) >= max_records:
+                break
+        return batch
+
+    def commit(self, position):
+        """Moves the cursor past delivered records and deletes finished segments."""
+        self.cursor = position
+        for number in sorted(self._sizes):
+            if number < position[0] or (number == position[0] and position[1] >= self._sizes[number]
+                                        and number != max(self._sizes)):
+                self._drop_segment(number)
+        if position[0] not in self._sizes and self._sizes:
+            self.cursor = (min(self._sizes), 0)
+        self._save_cursor()
@@ -0,0 +1,84 @@
+# server/utils/json_framer.py
+#
+# Splits a stream of MQTT message chunks into complete top-level JSON objects.
+# Braces are counted outside strings only (with backslash escapes), so nested
+# objects and "}" inside base64 or text don't cut a frame short. Each byte is
+# scanned once, into a fixed-size bytearray: an object larger than the buffer
+# is skipped to its closing brace and counted in `overflows`.
+
+OPEN = 0x7B    # {
+CLOSE = 0x7D   # }
+QUOTE = 0x22   # "
+ESCAPE = 0x5C  # \
+
+
+class JsonFramer:
+    def __init__(self, max_bytes=2048):
+        self._buf = bytearray(max_bytes)
+        self._len = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._discarding = False  # inside an object that did not fit
+        self.overflows = 0
+        self.frames = 0
+
+    def pending(self):
+        """Bytes of the object currently being received."""
+        return self._len
+
+    def feed(self, data):
+        """Takes the next chunk (str or bytes); returns the objects it completed, as str."""
+        if isinstance(data, str):
+            data = data.encode()
+        objects = []
+        buf = self._buf
+        for byte in data:
+            if self._depth == 0:
+                # Between objects: anything but an opening brace is noise
+                if byte == OPEN:
+                    self._depth = 1
+                    self._in_string = False
+                    self._escaped = False
+                    self._discarding = False
+                    buf[0] = byte
+                    self._len = 1
+                continue
+
+            if not self._discarding:
+                if self._len < len(buf):
+                    buf[self._len] = byte
+                    self._len += 1
+                else:
+                    self._discarding = True
+                    self._len = 0
+                    self.overflows += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif byte == ESCAPE:
+                    self._escaped = True
+                elif byte == QUOTE:
+                    self._in_string = False
+            elif byte == QUOTE:
+                self._in_string = True
+            elif byte == OPEN:
+                self._depth += 1
+            elif byte == CLOSE:
+                self._depth -= 1
+                if self._depth == 0:
+                    if not self._discarding:
+                        try:
+                            objects.append(str(buf[:self._len], "utf-8"))
+                            self.frames += 1
+                        except UnicodeError:
+                            pass
+                    self._len = 0
+        return objects
+
+    def reset(self):
+        """Drops a partial object (e.g. after the MQTT session was lost)."""
+        self._len = 0
+        self._depth = 0
+        self._discarding = False
@@ -22,8 +22,11 @@ def build_scheduled_reboot_payload() -> dict:
     return msg
 
 
-def build_command_ack_payload(cmd: str) -> dict:
+def build_command_ack_payload(cmd: str, command_id: str = None) -> dict:
     msg = _base()
     msg["event"] = "command_ack"
     msg["command_type"] = cmd
+    if command_id:
+        # Lets controller_mqtt correlate the ack with the command it sent
+        msg["command_id"] = command_id
     return msg
@@ -0,0 +1,66 @@
+# server/utils/uart_lines.py
+#
+# Reads newline-terminated readings from a stream (the client UART) into a
+# bounded queue, so reading the UART never waits for whoever consumes the
+# lines (a cellular publish can take seconds; the 9600-baud FIFO can't).
+
+import uasyncio as asyncio
+from pico_lte.utils.tokenizer import LineTokenizer
+from pico_lte.utils.urc import UrcQueue  # bounded FIFO, drops (and counts) the oldest when full
+
+
+class LinePump:
+    def __init__(self, reader, maxsize=32, max_line=1024):
+        self.reader = reader  # anything with `async read(n)`, e.g. asyncio.StreamReader(uart)
+        self.queue = UrcQueue(maxsize)
+        self.max_line = max_line
+        # Lines are split in a fixed max_line buffer, so noise without a
+        # newline can't grow the heap the way readline() would
+        self.tokenizer = LineTokenizer(max_line)
+        self._skipping = False  # inside an overlong line, dropping until its newline
+        self.received = 0
+        self.too_long = 0
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def dropped(self):
+        """Lines lost because the consumer fell behind."""
+        return self.queue.dropped
+
+    def stats(self):
+        return {"received": self.received, "depth": self.depth(),
+                "dropped": self.dropped(), "too_long": self.too_long}
+
+    def _drain(self):
+        tokenizer = self.tokenizer
+        while True:
+            overflows = tokenizer.overflows
+            line = tokenizer.next_line()
+            if line is None:
+                return
+            if tokenizer.overflows != overflows:
+                # A cut piece of an overlong line; its tail ends at the next newline
+                if not self._skipping:
+                    self.too_long += 1
+                self._skipping = True
+                continue
+            if self._skipping:
+                self._skipping = False
+                continue
+            line = line.strip()
+            if line:
+                self.received += 1
+                self.queue.put_nowait(line)
+
+    async def run(self):
+        while True:
+            self._drain()
+            chunk = await self.reader.read(self.tokenizer.reserve())
+            if not chunk:
+                await asyncio.sleep(0.05)  # nothing (or EOF) yet
+                continue
+            self.tokenizer.feed(chunk)
+
+    async def get(self):
+        return await self.queue.get()
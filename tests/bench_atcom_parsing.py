@@ -0,0 +1,116 @@
+"""
+Benchmark: ATCom response parsing on recorded-style modem transcripts.
+
+Compares the previous get_response loop (decode + split + rescan every line on
+each read) with the LineTokenizer/ResponseMatcher path. Both get the same
+transcript, one chunk per polling sleep (the sleeps themselves take no time),
+like a long response arriving while the Pico polls the UART.
+
+    python tests/bench_atcom_parsing.py [chunk_bytes]
+
+At 115200 baud about 1.1 KB arrive per 0.1 s poll; smaller chunks model a
+slower or burstier modem.
+"""
+import sys
+import time
+
+import fake_machine  # puts `server` on the path and fakes `machine`
+
+from pico_lte.utils import atcom as atcom_module
+from pico_lte.utils.atcom import ATCom
+from pico_lte.utils.status import Status
+
+
+class ChunkedUART:
+    def __init__(self, transcript, chunk):
+        self.chunks = [transcript[i:i + chunk] for i in range(0, len(transcript), chunk)]
+        self.ready = 1
+
+    def tick(self, _seconds=None):
+        """Stands in for time.sleep: one more chunk has arrived."""
+        self.ready += 1
+
+    def any(self):
+        return len(self.chunks[0]) if self.chunks and self.ready else 0
+
+    def read(self, _n):
+        self.ready -= 1
+        return self.chunks.pop(0)
+
+    def readinto(self, buf):
+        self.ready -= 1
+        chunk = self.chunks.pop(0)
+        if len(chunk) > len(buf):
+            self.chunks.insert(0, chunk[len(buf):])
+            chunk = chunk[:len(buf)]
+        buf[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def legacy_get_response(modem_com, desired_responses):
+    """The loop ATCom.get_response used before the tokenizer."""
+    response = ""
+    processed = []
+    desired_responses = [desired_responses]
+    while True:
+        modem_com.tick()  # time.sleep(0.1)
+        while modem_com.any():
+            try:
+                response += modem_com.read(modem_com.any()).decode("utf-8")
+            except:
+                pass
+        if response != "":
+            responses = response.split("\r\n")
+            processed.extend([x for x in responses if x != ""])
+            response = ""
+        head = 0
+        for index, value in enumerate(processed):
+            processed_part = processed[head: index + 1]
+            if value == "OK":
+                if index - head < 1:
+                    return {"status": Status.ERROR, "response": processed_part}
+                for focus_line in processed[head:index]:
+                    if any(desired in focus_line for desired in desired_responses):
+                        return {"status": Status.SUCCESS, "response": processed_part}
+            elif "+CME ERROR:" in value or value == "ERROR":
+                return {"status": Status.ERROR, "response": processed_part}
+        if not modem_com.chunks:
+            return {"status": Status.TIMEOUT, "response": "timeout"}
+
+
+def transcripts():
+    file_list = b"".join(b'+QFLST: "UFS:log%04d.txt",%d\r\n' % (i, 1000 + i) for i in range(400))
+    messages = b"".join(b'+QMTRECV: 0,%d,"bioiot/control/all","%s"\r\n' % (i, b"A" * 200) for i in range(20))
+    http_body = b"".join(b'{"pH": 7.%02d, "temperature": 21.%02d}\r\n' % (i % 100, i % 100) for i in range(600))
+    return {
+        "AT+QFLST (400 files)": (b"\r\n" + file_list + b"\r\nOK\r\n", "+QFLST:"),
+        "AT+QMTRECV? (20 messages)": (b"\r\n" + messages + b"\r\nOK\r\n", "+QMTRECV:"),
+        "AT+QHTTPREAD (24 KB)": (b"\r\nCONNECT\r\n" + http_body + b"\r\nOK\r\n", "CONNECT"),
+    }
+
+
+def run(chunk=64, repeat=5):
+    print(f"{'transcript':<28}{'legacy ms':>12}{'tokenizer ms':>14}{'speedup':>10}")
+    for name, (transcript, desired) in transcripts().items():
+        timings = []
+        for parse in ("legacy", "tokenizer"):
+            best = None
+            for _ in range(repeat):
+                uart = ChunkedUART(transcript, chunk)
+                atcom_module.time.sleep = uart.tick
+                start = time.perf_counter()
+                if parse == "legacy":
+                    result = legacy_get_response(uart, desired)
+                else:
+                    atcom = ATCom(rxbuf=4096)
+                    atcom.modem_com = uart
+                    result = atcom.get_response(desired)
+                elapsed = (time.perf_counter() - start) * 1000
+                assert result["status"] == Status.SUCCESS, (name, parse, result["status"])
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+        print(f"{name:<28}{timings[0]:>12.2f}{timings[1]:>14.2f}{timings[0] / timings[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run(chunk=int(sys.argv[1]) if len(sys.argv) > 1 else 64)
@@ -0,0 +1,27 @@
+"""
+pico_lte is MicroPython code: importing this module puts `server` on the
+path and installs a fake `machine` module so it imports on CPython.
+"""
+import sys
+import types
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "server"))
+
+
+class UART:
+    def __init__(self, *args, **kwargs):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+    def any(self):
+        return 0
+
+
+if "machine" not in sys.modules:
+    machine = types.ModuleType("machine")
+    machine.Pin = lambda *args, **kwargs: None
+    machine.UART = UART
+    sys.modules["machine"] = machine
@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+
+import fake_machine  # puts `server` on the path and fakes `machine`
+
+from pico_lte.modules.mqtt import MQTT
+from pico_lte.utils.atcom import ATCom, ResponseMatcher
+from pico_lte.utils.status import Status
+
+
+class FakeModemStream:
+    """Replies to each command written to the UART with scripted chunks, after a delay."""
+
+    def __init__(self, replies, delay=0.01):
+        self.replies = replies
+        self.delay = delay
+        self.chunks = asyncio.Queue()
+
+    def on_write(self, data):
+        for chunk in self.replies.get(data.decode().strip(), []):
+            asyncio.get_running_loop().call_later(self.delay, self.chunks.put_nowait, chunk)
+
+    async def read(self, n):
+        return await self.chunks.get()
+
+
+def make_atcom(replies, delay=0.01):
+    atcom = ATCom()
+    atcom.stream = FakeModemStream(replies, delay)
+    atcom.modem_com.write = atcom.stream.on_write
+    return atcom
+
+
+class TestResponseMatcher(unittest.TestCase):
+    def test_desired_line_before_ok(self):
+        matcher = ResponseMatcher("+CSQ:")
+        self.assertIsNone(matcher.feed("+CSQ: 20,99"))
+        self.assertEqual(matcher.feed("OK")["status"], Status.SUCCESS)
+
+    def test_ok_without_information_is_an_error(self):
+        self.assertEqual(ResponseMatcher("+CSQ:").feed("OK")["status"], Status.ERROR)
+
+    def test_keeps_waiting_after_unrelated_ok(self):
+        matcher = ResponseMatcher("+QMTOPEN: 0,0", urc=False)
+        self.assertIsNone(matcher.feed("+QIURC: \"pdpdeact\""))
+        self.assertIsNone(matcher.feed("OK"))
+        self.assertIsNone(matcher.feed("+QMTOPEN: 0,0"))
+        self.assertEqual(matcher.feed("OK")["status"], Status.SUCCESS)
+
+    def test_urc_fault(self):
+        matcher = ResponseMatcher("+QHTTPGET: 0,200", "+QHTTPGET: 0,7", urc=True)
+        self.assertEqual(matcher.feed("+QHTTPGET: 0,702")["status"], Status.ERROR)
+
+
+class TestAsyncATCom(unittest.TestCase):
+    def test_send_and_split_chunks(self):
+        atcom = make_atcom({"AT+CSQ": [b"\r\n+CS", b"Q: 20,99\r", b"\n\r\nOK\r\n"]})
+        result = asyncio.run(atcom.send_at_comm_async("AT+CSQ", "+CSQ:"))
+        self.assertEqual(result, {"status": Status.SUCCESS, "response": ["+CSQ: 20,99", "OK"]})
+
+    def test_publish_prompt_without_line_end(self):
+        atcom = make_atcom({'AT+QMTPUB=0,1,1,0,"t"': [b"\r\n> "]})
+        result = asyncio.run(atcom.send_at_comm_async('AT+QMTPUB=0,1,1,0,"t"', ">", urc=True))
+        self.assertEqual(result["status"], Status.SUCCESS)
+
+    def test_trailing_lines_are_kept_for_the_next_read(self):
+        atcom = make_atcom({"AT+QHTTPGET=60": [b"\r\nOK\r\n\r\n+QHTTPGET: 0,200,1024\r\n"]})
+
+        async def scenario():
+            first = await atcom.send_at_comm_async("AT+QHTTPGET=60")
+            second = await atcom.get_urc_response_async("+QHTTPGET: 0,", timeout=1)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first["response"], ["OK"])
+        self.assertEqual(second["response"], ["+QHTTPGET: 0,200,1024"])
+
+    def test_slow_command_does_not_block_other_tasks(self):
+        atcom = make_atcom({"AT+QHTTPGET=60": [b"\r\nOK\r\n"]})
+        ticks = []
+
+        async def other_task():
+            for _ in range(10):
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            ticker = asyncio.create_task(other_task())
+            await atcom.send_at_comm_async("AT+QHTTPGET=60")
+            result = await atcom.get_urc_response_async("+QHTTPGET: 0,", timeout=0.15)
+            await ticker
+            return result
+
+        result = asyncio.run(scenario())
+        self.assertEqual(result, {"status": Status.TIMEOUT, "response": "timeout"})
+        self.assertEqual(len(ticks), 10)
+
+    def test_publish_does_not_block_other_tasks(self):
+        pub = 'AT+QMTPUB=0,1,1,0,"bioiot/data"'
+        atcom = make_atcom({pub: [b"\r\n> "], "\x1a": [b"\r\nOK\r\n"]}, delay=0.05)
+        ticks = []
+
+        async def other_task():
+            for _ in range(10):
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            ticker = asyncio.create_task(other_task())
+            result = await MQTT(atcom).publish_message_async('{"seq": 1}', topic="bioiot/data")
+            count = len(ticks)
+            await ticker
+            return result, count
+
+        result, ticks_during_publish = asyncio.run(scenario())
+        self.assertEqual(result["status"], Status.SUCCESS)
+        # Two replies at 50 ms each: the other task kept running meanwhile
+        self.assertGreaterEqual(ticks_during_publish, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import sys
+import unittest
+
+import fake_machine  # puts `server` on the path and fakes `machine`
+
+from pico_lte.utils import atcom as atcom_module
+from pico_lte.utils.atcom import ATCom
+from pico_lte.utils.status import Status
+from pico_lte.utils.tokenizer import LineTokenizer
+
+
+class ChunkedUART:
+    """Hands out a recorded transcript a few bytes at a time, like the modem FIFO."""
+
+    def __init__(self, transcript, chunk=7):
+        self.chunks = [transcript[i:i + chunk] for i in range(0, len(transcript), chunk)]
+
+    def any(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def readinto(self, buf):
+        chunk = self.chunks.pop(0)
+        if len(chunk) > len(buf):
+            self.chunks.insert(0, chunk[len(buf):])
+            chunk = chunk[:len(buf)]
+        buf[:len(chunk)] = chunk
+        return len(chunk)
+
+    def write(self, data):
+        pass
+
+
+def drain(tokenizer):
+    lines = []
+    while True:
+        line = tokenizer.next_line()
+        if line is None:
+            return lines
+        lines.append(line)
+
+
+class TestLineTokenizer(unittest.TestCase):
+    def test_lines_split_across_chunks(self):
+        tokenizer = LineTokenizer(64)
+        lines = []
+        for chunk in (b"\r\n+QMTRECV: 0,1,\"bio", b"iot/control/all\",\"{}\"\r", b"\nOK\r\n+QIU"):
+            tokenizer.feed(chunk)
+            lines += drain(tokenizer)
+        self.assertEqual(lines, [b"", b"+QMTRECV: 0,1,\"bioiot/control/all\",\"{}\"", b"OK"])
+        self.assertEqual(tokenizer.partial(), b"+QIU")
+
+    def test_buffer_is_reused(self):
+        tokenizer = LineTokenizer(16)
+        for i in range(100):
+            self.assertEqual(tokenizer.feed(b"line %d\r\n" % i), len(b"line %d\r\n" % i))
+            self.assertEqual(drain(tokenizer), [b"line %d" % i])
+        self.assertEqual(tokenizer.overflows, 0)
+
+    def test_overlong_line_is_cut_and_counted(self):
+        tokenizer = LineTokenizer(8)
+        data = b"0123456789ABCDEF\r\nOK\r\n"
+        lines = []
+        while data:
+            used = tokenizer.feed(data[:tokenizer.reserve()])
+            data = data[used:]
+            lines += drain(tokenizer)
+        self.assertEqual(lines, [b"01234567", b"89ABCDEF", b"", b"OK"])
+        self.assertEqual(tokenizer.overflows, 2)
+
+    def test_without_bytearray_find(self):
+        module = sys.modules["pico_lte.utils.tokenizer"]
+        has_find, module._HAS_FIND = module._HAS_FIND, False
+        try:
+            tokenizer = LineTokenizer(32)
+            tokenizer.feed(b"+CSQ: 20,99\r\nOK\r\n")
+            self.assertEqual(drain(tokenizer), [b"+CSQ: 20,99", b"OK"])
+        finally:
+            module._HAS_FIND = has_find
+
+
+class TestSyncResponses(unittest.TestCase):
+    def setUp(self):
+        self._sleep = atcom_module.time.sleep
+        atcom_module.time.sleep = lambda _s: None
+
+    def tearDown(self):
+        atcom_module.time.sleep = self._sleep
+
+    def test_file_list(self):
+        listing = b"".join(b'+QFLST: "UFS:file%03d.bin",%d\r\n' % (i, i * 10) for i in range(200))
+        atcom = ATCom()
+        atcom.modem_com = ChunkedUART(b"\r\n" + listing + b"\r\nOK\r\n")
+        result = atcom.get_response("+QFLST:")
+        self.assertEqual(result["status"], Status.SUCCESS)
+        self.assertEqual(len(result["response"]), 201)
+        self.assertEqual(result["response"][150], '+QFLST: "UFS:file150.bin",1500')
+
+    def test_trailing_urc_is_kept_for_the_next_call(self):
+        atcom = ATCom()
+        atcom.modem_com = ChunkedUART(b"\r\nOK\r\n\r\n+QMTSTAT: 0,1\r\n")
+        self.assertEqual(atcom.get_response()["response"], ["OK"])
+        self.assertEqual(atcom.get_urc_response("+QMTSTAT:")["response"], ["+QMTSTAT: 0,1"])
+
+    def test_cme_error(self):
+        atcom = ATCom()
+        atcom.modem_com = ChunkedUART(b"\r\n+CME ERROR: 10\r\n")
+        self.assertEqual(atcom.get_response("+CPIN:")["status"], Status.ERROR)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import unittest
+
+import fake_machine  # puts `server` on the path and fakes `machine`
+
+from pico_lte.modules.mqtt import MQTT
+from pico_lte.utils.atcom import ATCom
+from pico_lte.utils.status import Status
+from pico_lte.utils.urc import MQTT_RECEIVE, MQTT_STATE, HTTP_GET, UrcQueue
+
+RECV = b'\r\n+QMTRECV: 0,1,"bioiot/control/all","eyJhIjoxfQ=="\r\n'
+
+
+class FakeModemUART:
+    """Non-blocking UART: scripted replies to commands plus URCs injected by the test."""
+
+    def __init__(self, replies=None):
+        self.replies = replies or {}
+        self.rx = b""
+        self.written = []
+
+    def inject(self, data):
+        self.rx += data
+
+    def write(self, data):
+        self.written.append(data)
+        self.rx += self.replies.get(data.decode().strip(), b"")
+
+    def any(self):
+        return len(self.rx)
+
+    def readinto(self, buf):
+        count = min(len(buf), len(self.rx))
+        buf[:count] = self.rx[:count]
+        self.rx = self.rx[count:]
+        return count
+
+
+def make_atcom(replies=None):
+    atcom = ATCom()
+    atcom.modem_com = FakeModemUART(replies)
+    return atcom
+
+
+class TestUrcQueue(unittest.TestCase):
+    def test_oldest_lines_are_dropped_when_full(self):
+        queue = UrcQueue(maxsize=2)
+        for line in ("a", "b", "c"):
+            queue.put_nowait(line)
+        self.assertEqual(queue.dropped, 1)
+        self.assertEqual(asyncio.run(queue.get()), "b")
+        self.assertEqual(queue.get_nowait(), "c")
+        self.assertIsNone(queue.get_nowait())
+
+
+class TestUrcRouter(unittest.TestCase):
+    def test_messages_are_pushed_without_polling(self):
+        atcom = make_atcom()
+        mqtt_urcs = atcom.subscribe_urc((MQTT_RECEIVE, MQTT_STATE))
+
+        async def scenario():
+            atcom.start_urc_router(interval=0.001)
+            asyncio.get_running_loop().call_later(0.02, atcom.modem_com.inject, b'\r\n+QIURC: "pdpdeact",1\r\n' + RECV)
+            asyncio.get_running_loop().call_later(0.03, atcom.modem_com.inject, b"\r\n+QMTSTAT: 0,1\r\n")
+            return [await asyncio.wait_for(mqtt_urcs.get(), 1) for _ in range(2)]
+
+        lines = asyncio.run(scenario())
+        self.assertEqual(lines[1], "+QMTSTAT: 0,1")
+        messages = MQTT.extract_messages(lines[:1], "+QMTRECV: 0,")
+        self.assertEqual(messages[0]["topic"], "bioiot/control/all")
+        self.assertEqual(messages[0]["message"], "eyJhIjoxfQ==")
+        self.assertEqual(atcom.modem_com.written, [])
+
+    def test_urc_inside_a_command_response_is_routed(self):
+        atcom = make_atcom({"AT+CSQ": b"\r\n+CSQ: 20,99" + RECV + b"\r\nOK\r\n"})
+        mqtt_urcs = atcom.subscribe_urc(MQTT_RECEIVE)
+
+        async def scenario():
+            atcom.start_urc_router(interval=0.001)
+            return await atcom.send_at_comm_async("AT+CSQ", "+CSQ:")
+
+        result = asyncio.run(scenario())
+        self.assertEqual(result, {"status": Status.SUCCESS, "response": ["+CSQ: 20,99", "OK"]})
+        self.assertEqual(mqtt_urcs.qsize(), 1)
+
+    def test_command_waiting_for_a_subscribed_urc_still_gets_it(self):
+        atcom = make_atcom({"AT+QHTTPGET=60": b"\r\nOK\r\n"})
+        http_urcs = atcom.subscribe_urc(HTTP_GET)
+
+        async def scenario():
+            atcom.start_urc_router(interval=0.001)
+            await atcom.send_at_comm_async("AT+QHTTPGET=60")
+            asyncio.get_running_loop().call_later(0.01, atcom.modem_com.inject, b"\r\n+QHTTPGET: 0,200,10\r\n")
+            return await atcom.get_urc_response_async("+QHTTPGET: 0,", timeout=1)
+
+        self.assertEqual(asyncio.run(scenario())["response"], ["+QHTTPGET: 0,200,10"])
+        self.assertEqual(http_urcs.qsize(), 0)
+
+    def test_sync_commands_route_urcs_too(self):
+        atcom = make_atcom({"AT+QMTCONN?": b"\r\n+QMTCONN: 0,3\r\n" + RECV + b"\r\nOK\r\n"})
+        mqtt_urcs = atcom.subscribe_urc(MQTT_RECEIVE)
+        result = atcom.send_at_comm("AT+QMTCONN?", "+QMTCONN: 0,3")
+        self.assertEqual(result["status"], Status.SUCCESS)
+        self.assertTrue(mqtt_urcs.get_nowait().startswith(MQTT_RECEIVE))
+
+    def test_receive_mode_command(self):
+        atcom = make_atcom({'AT+QMTCFG="recv/mode",0,0': b"\r\nOK\r\n"})
+        self.assertEqual(MQTT(atcom).set_message_recieve_mode_config()["status"], Status.SUCCESS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import asyncio
+import unittest
+
+import fake_machine  # puts `server` on the path and fakes `machine`
+
+from pico_lte.apps.aws import AWS
+from pico_lte.modules.mqtt import MQTT
+from pico_lte.utils.atcom import ATCom
+from pico_lte.utils.status import Status
+
+PUB = 'AT+QMTPUB=0,1,1,0,"bioiot/data"'
+CTRL_Z = "\x1a"
+
+
+class ScriptedModemUART:
+    """Replies to each command with the next scripted response (the last one repeats)."""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.rx = b""
+        self.commands = []
+
+    def inject(self, data):
+        self.rx += data
+
+    def write(self, data):
+        command = data.decode().strip()
+        self.commands.append(command)
+        script = self.replies.get(command, [b""])
+        self.rx += script.pop(0) if len(script) > 1 else script[0]
+
+    def any(self):
+        return len(self.rx)
+
+    def readinto(self, buf):
+        count = min(len(buf), len(self.rx))
+        buf[:count] = self.rx[:count]
+        self.rx = self.rx[count:]
+        return count
+
+
+class SlowModemStream:
+    """Async reader over a ScriptedModemUART that takes `delay` to deliver each reply."""
+
+    def __init__(self, uart, delay=0.05):
+        self.uart = uart
+        self.delay = delay
+
+    async def read(self, n):
+        while not self.uart.rx:
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(self.delay)
+        data, self.uart.rx = self.uart.rx[:n], self.uart.rx[n:]
+        return data
+
+
+class NotReached:
+    """Stands in for the modules only the reconnect steps use."""
+
+    def __getattr__(self, name):
+        def step(*args, **kwargs):
+            raise AssertionError(f"{name} should not run")
+        return step
+
+
+def make_aws(replies):
+    atcom = ATCom()
+    atcom.modem_com = ScriptedModemUART(replies)
+    aws = AWS(NotReached(), NotReached(), NotReached(), NotReached(), MQTT(atcom), NotReached())
+    return aws, atcom.modem_com
+
+
+def publish(aws, payload):
+    return aws.publish_message(payload, host="example.iot", port=8883, topic="bioiot/data")
+
+
+REPLIES = {
+    "AT+QMTCONN?": [b"\r\n+QMTCONN: 0,3\r\n\r\nOK\r\n"],
+    PUB: [b"\r\n> "],
+    CTRL_Z: [b"\r\nOK\r\n"],
+    "AT": [b"\r\nOK\r\n"],
+}
+
+
+class TestAWSPublishFastPath(unittest.TestCase):
+    def setUp(self):
+        AWS.cache.set_state(AWS.PUBLISH_FUNCTION, None)
+
+    def test_connected_session_skips_the_connection_check(self):
+        aws, uart = make_aws(dict(REPLIES))
+        self.assertEqual(publish(aws, '{"seq": 1}')["status"], Status.SUCCESS)
+        self.assertEqual(uart.commands, ["AT+QMTCONN?", PUB, '{"seq": 1}', CTRL_Z])
+
+        uart.commands.clear()
+        self.assertEqual(publish(aws, '{"seq": 2}')["status"], Status.SUCCESS)
+        self.assertEqual(uart.commands, [PUB, '{"seq": 2}', CTRL_Z])
+        self.assertIs(aws._get_publish_manager("example.iot", 8883, "bioiot/data"), aws._publish_manager)
+
+    def test_qmtstat_forces_the_full_chain(self):
+        aws, uart = make_aws(dict(REPLIES))
+        publish(aws, '{"seq": 1}')
+        # The broker drops the session; the URC is read while another command runs
+        uart.inject(b"\r\n+QMTSTAT: 0,1\r\n")
+        aws.mqtt.atcom.send_at_comm("AT")
+        self.assertFalse(aws.is_session_up())
+
+        uart.commands.clear()
+        self.assertEqual(publish(aws, '{"seq": 2}')["status"], Status.SUCCESS)
+        self.assertEqual(uart.commands[0], "AT+QMTCONN?")
+
+    def test_failed_fast_publish_falls_back_to_the_chain(self):
+        replies = dict(REPLIES)
+        replies[CTRL_Z] = [b"\r\nOK\r\n", b"\r\nERROR\r\n", b"\r\nOK\r\n"]
+        aws, uart = make_aws(replies)
+        publish(aws, '{"seq": 1}')
+
+        uart.commands.clear()
+        self.assertEqual(publish(aws, '{"seq": 2}')["status"], Status.SUCCESS)
+        self.assertEqual(uart.commands, [PUB, '{"seq": 2}', CTRL_Z, "AT+QMTCONN?", PUB, '{"seq": 2}', CTRL_Z])
+        self.assertTrue(aws.is_session_up())
+
+
+class TestAWSPublishAsync(unittest.TestCase):
+    def setUp(self):
+        AWS.cache.set_state(AWS.PUBLISH_FUNCTION, None)
+
+    def run_with_ticker(self, aws, payload):
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            task = asyncio.create_task(ticker())
+            result = await aws.publish_message_async(payload, host="example.iot", port=8883,
+                                                     topic="bioiot/data")
+            task.cancel()
+            return result
+
+        return asyncio.run(scenario()), len(ticks)
+
+    def test_fast_path_lets_other_tasks_run(self):
+        aws, uart = make_aws(dict(REPLIES))
+        publish(aws, '{"seq": 1}')
+        aws.mqtt.atcom.stream = SlowModemStream(uart)
+
+        uart.commands.clear()
+        result, ticks = self.run_with_ticker(aws, '{"seq": 2}')
+        self.assertEqual(result["status"], Status.SUCCESS)
+        self.assertEqual(uart.commands, [PUB, '{"seq": 2}', CTRL_Z])
+        # Two replies at 50 ms each: the other task kept ticking meanwhile
+        self.assertGreaterEqual(ticks, 5)
+
+    def test_lost_session_runs_the_chain(self):
+        aws, uart = make_aws(dict(REPLIES))
+        aws.mqtt.atcom.stream = SlowModemStream(uart)
+        result, _ = self.run_with_ticker(aws, '{"seq": 1}')
+        self.assertEqual(result["status"], Status.SUCCESS)
+        self.assertEqual(uart.commands, ["AT+QMTCONN?", PUB, '{"seq": 1}', CTRL_Z])
+        self.assertTrue(aws.is_session_up())
+
+
+if __name__ == "__main__":
+    unittest.main()
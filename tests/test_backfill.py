@@ -0,0 +1,174 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+from backfill import BackfillEngine, MAX_RECORDS_PER_WRITE
+from records import MULTI, build_records, hoist_common_attributes
+
+
+class RejectedRecordsException(Exception):
+    def __init__(self, rejected):
+        super().__init__("rejected records")
+        self.response = {
+            "Error": {"Code": "RejectedRecordsException"},
+            "RejectedRecords": rejected,
+        }
+
+
+class FakeWriteClient:
+    """Local stand-in for timestream-write: rejects selected measures once"""
+
+    def __init__(self, reject_once=(), duplicates=()):
+        self.calls = []
+        self.stored = []
+        self.reject_once = set(reject_once)
+        self.duplicates = set(duplicates)
+
+    def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+        Records = [dict(CommonAttributes or {}, **record) for record in Records]
+        self.calls.append(Records)
+        rejected = []
+        for index, record in enumerate(Records):
+            key = (record["Time"], record["MeasureName"])
+            if key in self.duplicates:
+                rejected.append({"RecordIndex": index, "Reason": "duplicate", "ExistingVersion": 1})
+            elif key in self.reject_once:
+                self.reject_once.discard(key)
+                rejected.append({"RecordIndex": index, "Reason": "transient"})
+            else:
+                self.stored.append(record)
+        if rejected:
+            raise RejectedRecordsException(rejected)
+
+
+def make_rows(n_rows, per_row=11):
+    return [
+        [{"MeasureName": f"m{i}", "MeasureValue": "1", "Time": str(t)} for i in range(per_row)]
+        for t in range(n_rows)
+    ]
+
+
+class TestBackfillEngine(unittest.TestCase):
+    def test_packs_rows_into_full_batches(self):
+        client = FakeWriteClient()
+        engine = BackfillEngine(client, "db", "table", max_workers=3)
+        stats = engine.run(make_rows(50))
+
+        self.assertEqual(stats["rows"], 50)
+        self.assertEqual(stats["written"], 550)
+        self.assertEqual(len(client.calls), 6)
+        self.assertTrue(all(len(c) <= MAX_RECORDS_PER_WRITE for c in client.calls))
+        self.assertGreater(stats["rows_per_sec"], 0)
+
+    def test_retries_only_rejected_records(self):
+        client = FakeWriteClient(reject_once={("3", "m2"), ("7", "m5")})
+        engine = BackfillEngine(client, "db", "table", max_workers=1, retry_delay=0)
+        stats = engine.run(make_rows(10))
+
+        self.assertEqual(stats["written"], 110)
+        self.assertEqual(stats["retried"], 2)
+        self.assertEqual([len(c) for c in client.calls], [100, 2, 10])
+        self.assertEqual(len(client.stored), 110)
+
+    def test_duplicates_are_not_retried(self):
+        client = FakeWriteClient(duplicates={("0", "m0")})
+        engine = BackfillEngine(client, "db", "table", max_workers=1, retry_delay=0)
+        stats = engine.run(make_rows(2))
+
+        self.assertEqual(stats["duplicates"], 1)
+        self.assertEqual(stats["retried"], 0)
+        self.assertEqual(stats["written"], 21)
+
+    def test_batch_of_only_duplicates_returns_without_backoff(self):
+        client = FakeWriteClient(duplicates={("0", f"m{i}") for i in range(11)})
+        engine = BackfillEngine(client, "db", "table", max_workers=1, retry_delay=2, max_retries=3)
+        started = time.monotonic()
+        self.assertEqual(engine.write_batch(make_rows(1)[0]), 0)
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual((engine.stats["duplicates"], engine.stats["failed"]), (11, 0))
+
+    def test_commit_watermark_reaches_last_row(self):
+        client = FakeWriteClient()
+        engine = BackfillEngine(client, "db", "table", max_workers=4)
+        committed = []
+        engine.run(((t, rows) for t, rows in enumerate(make_rows(40))), on_commit=committed.append)
+
+        self.assertEqual(committed, sorted(committed))
+        self.assertEqual(committed[-1], 39)
+
+    def test_commit_watermark_stops_at_failed_rows(self):
+        class FailingClient(FakeWriteClient):
+            def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+                if any(r["Time"] == "20" for r in Records):
+                    raise ValueError("boom")
+                super().write_records(DatabaseName, TableName, Records, CommonAttributes)
+
+        engine = BackfillEngine(FailingClient(), "db", "table", max_workers=1, max_retries=0)
+        committed = []
+        engine.run(((t, rows) for t, rows in enumerate(make_rows(40))), on_commit=committed.append)
+
+        # Row 20 shares its batch with rows 18..27, so nothing from 18 on is committed
+        self.assertLess(committed[-1], 18)
+
+    def test_commit_errors_stop_the_run(self):
+        def on_commit(token):
+            raise OSError("disk full")
+
+        engine = BackfillEngine(FakeWriteClient(), "db", "table", max_workers=2, batch_size=10)
+        with self.assertRaises(OSError):
+            engine.run(((t, rows) for t, rows in enumerate(make_rows(40))), on_commit=on_commit)
+        self.assertLess(engine.stats["batches"], 44)
+
+    def test_row_split_across_batches_waits_for_both(self):
+        class SecondBatchFails(FakeWriteClient):
+            def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+                if any(dict(CommonAttributes or {}, **r)["Time"] == "1" for r in Records):
+                    raise ValueError("boom")
+                super().write_records(DatabaseName, TableName, Records, CommonAttributes)
+
+        def slow_rows():
+            # The first batch (10 of row 0's 11 records) finishes before row 0's last record is packed
+            for t, rows in enumerate(make_rows(3)):
+                yield t, rows
+                time.sleep(0.05)
+
+        engine = BackfillEngine(SecondBatchFails(), "db", "table", max_workers=2,
+                                batch_size=10, max_retries=0)
+        committed = []
+        engine.run(slow_rows(), on_commit=committed.append)
+
+        self.assertEqual(committed, [])
+        self.assertGreater(engine.stats["failed"], 0)
+
+
+class TestMultiMeasureRecords(unittest.TestCase):
+    def test_multi_record_hoists_dimensions_and_time(self):
+        dimensions = [{"Name": "device_id", "Value": "ESP32_3002EC"}]
+        measures = [("H2S", "300.1", "DOUBLE"), ("aerator_status", "ON", "VARCHAR")]
+        records = build_records(dimensions, 1000, measures, MULTI)
+
+        self.assertEqual(len(records), 1)
+        common, stripped = hoist_common_attributes(records)
+        self.assertEqual(common["Dimensions"], dimensions)
+        self.assertEqual(common["Time"], "1000")
+        self.assertEqual(common["MeasureValueType"], "MULTI")
+        self.assertEqual(stripped[0]["MeasureValues"][1], {"Name": "aerator_status", "Value": "ON", "Type": "VARCHAR"})
+
+    def test_engine_sends_common_attributes(self):
+        dimensions = [{"Name": "device_id", "Value": "ESP32_3002EC"}]
+        rows = [build_records(dimensions, t, [("H2S", "1", "DOUBLE")], MULTI) for t in range(5)]
+        client = FakeWriteClient()
+        stats = BackfillEngine(client, "db", "table", max_workers=1).run(rows)
+
+        self.assertEqual(stats["written"], 5)
+        self.assertEqual([r["Time"] for r in client.stored], ["0", "1", "2", "3", "4"])
+        self.assertTrue(all(r["Dimensions"] == dimensions for r in client.stored))
+
+
+if __name__ == "__main__":
+    unittest.main()
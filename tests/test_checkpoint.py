@@ -0,0 +1,117 @@
+import os
+import sys
+import csv
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+import checkpoint
+from checkpoint import CheckpointJournal
+from backfill import BackfillEngine
+from create_data import CSV_FIELDS
+from upload_data import read_csv_checkpoints, load_csv_file
+
+
+class RecordingClient:
+    def __init__(self):
+        self.times = []
+
+    def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+        self.times.extend(dict(CommonAttributes or {}, **r)["Time"] for r in Records)
+
+
+def write_csv(path, n_rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for i in range(n_rows):
+            writer.writerow({
+                "device_id": "ESP32_5DAEC4", "timestamp": f"2025-05-01T{i:02d}:00:00+00:00",
+                "H2S": 0.1, "NH3": 0.2, "ph_value": 7.1, "aerator_status": "ON",
+                "rs485_temperature": 24.0, "ambient_temperature": 25.0, "level": 1.2,
+                "pressure": 1013.0, "altitude": 5.0, "temperature": 24.5,
+            })
+
+
+class TestCheckpointJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        self.csv = self.dir / "data_ESP32_5DAEC4.csv"
+        write_csv(self.csv, 5)
+        self.path = self.dir / "journal.json"
+
+    def test_commits_survive_a_reload(self):
+        journal = CheckpointJournal(self.path, min_interval=0)
+        journal.start(self.csv)
+        journal.commit(self.csv, 120, "2025-05-01T01:00:00+00:00", 2)
+        journal.commit(self.csv, 60, "2025-05-01T00:00:00+00:00", 1)  # late, older commit is ignored
+
+        reloaded = CheckpointJournal(self.path)
+        self.assertEqual(reloaded.resume_offset(self.csv), 120)
+        self.assertEqual(reloaded.rows_done(self.csv), 2)
+        self.assertEqual(list(self.dir.glob("*.tmp")), [])
+
+        reloaded.finish(self.csv)
+        self.assertIsNone(CheckpointJournal(self.path).resume_offset(self.csv))
+
+    def test_changed_file_starts_over(self):
+        journal = CheckpointJournal(self.path, min_interval=0)
+        journal.start(self.csv)
+        journal.commit(self.csv, 120, None, 2)
+        stat = os.stat(self.csv)
+        os.utime(self.csv, (stat.st_atime, stat.st_mtime + 10))
+        self.assertEqual(CheckpointJournal(self.path).resume_offset(self.csv), 0)
+
+    def test_crash_before_rename_keeps_the_old_journal(self):
+        journal = CheckpointJournal(self.path, min_interval=0)
+        journal.start(self.csv)
+        before = self.path.read_text()
+
+        with mock.patch.object(checkpoint.os, "replace", side_effect=OSError("power lost")):
+            with self.assertRaises(OSError):
+                journal.commit(self.csv, 120, None, 2)
+        self.assertEqual(self.path.read_text(), before)
+        self.assertEqual(json.loads(before)[CheckpointJournal._key(self.csv)]["offset"], 0)
+
+
+class TestCsvResume(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        self.csv = self.dir / "data_ESP32_5DAEC4.csv"
+        write_csv(self.csv, 6)
+
+    def test_offsets_seek_to_the_next_row(self):
+        tokens = [token for token, _ in read_csv_checkpoints(self.csv)]
+        self.assertEqual([rows for _, _, rows in tokens], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(tokens[-1][0], os.path.getsize(self.csv))
+
+        offset, timestamp, rows = tokens[2]
+        resumed = list(read_csv_checkpoints(self.csv, offset, rows))
+        self.assertEqual([token for token, _ in resumed], tokens[3:])
+        self.assertEqual(timestamp, "2025-05-01T02:00:00+00:00")
+
+    def test_resume_uploads_only_the_rest_of_the_file(self):
+        tokens = [token for token, _ in read_csv_checkpoints(self.csv)]
+        journal = CheckpointJournal(self.dir / "journal.json", min_interval=0)
+        journal.start(self.csv)
+        journal.commit(self.csv, *tokens[3])  # a previous run wrote 4 rows
+
+        client = RecordingClient()
+        load_csv_file(self.csv, BackfillEngine(client, "db", "table", max_workers=1),
+                      CheckpointJournal(self.dir / "journal.json"))
+
+        hours = sorted({int(t) // 3600000 % 24 for t in client.times})
+        self.assertEqual(hours, [4, 5])
+        self.assertIsNone(CheckpointJournal(self.dir / "journal.json").resume_offset(self.csv))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import csv
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+from config import DEVICE_IDS
+from create_data import CSV_FIELDS, CsvArchive, flatten_data
+from columnar import (SCHEMA, DAY, ParquetArchive, csv_to_parquet, iter_rows,
+                      iter_parquet_records, write_grid_parquet)
+from records import MULTI, flat_row_to_records
+from vector_data import generate_history_arrays
+
+
+def sample_rows(hours=30):
+    data = {
+        "H2S": 301.25, "NH3": 0.02613, "Sensor pH": {"ph_value": 430.5},
+        "aerator_status": "ON",
+        "RS485 Sensor": {"rs485_temperature": 24.1, "ambient_temperature": 22.9, "level": -0.02601},
+        "Pressure": {"pressure": 764.1234, "altitude": 2310.125, "temperature": 23.4},
+    }
+    start = datetime(2025, 5, 1, 12)
+    return [flatten_data(device_id, start + timedelta(hours=h), data)
+            for h in range(hours) for device_id in DEVICE_IDS[:2]]
+
+
+class TestColumnarRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_schema_matches_csv_fields(self):
+        self.assertEqual(SCHEMA.names, CSV_FIELDS)
+
+    def test_archive_round_trips_flatten_data_rows(self):
+        rows = sample_rows()
+        for partition in ("device", DAY):
+            out = self.dir / partition
+            with ParquetArchive(out, partition) as archive:
+                for row in rows:
+                    archive.write(row)
+
+            key = lambda r: (r["timestamp"], r["device_id"])
+            self.assertEqual(sorted(iter_rows(out), key=key), sorted(rows, key=key))
+
+        self.assertEqual(len(list((self.dir / DAY).glob("day=*/data.parquet"))), 2)
+
+    def test_late_row_for_a_closed_day_is_kept(self):
+        rows = sample_rows()
+        late = rows.pop(3)  # a 2025-05-01 row that arrives once 2025-05-02 has started
+        out = self.dir / DAY
+        with ParquetArchive(out, DAY) as archive:
+            for row in rows + [late]:
+                archive.write(row)
+
+        key = lambda r: (r["timestamp"], r["device_id"])
+        self.assertEqual(sorted(iter_rows(out), key=key), sorted(rows + [late], key=key))
+        self.assertEqual(sorted(p.name for p in (out / "day=2025-05-01").iterdir()),
+                         ["data.parquet", "part-1.parquet"])
+        self.assertEqual(archive.counts["2025-05-01"], 24)
+
+    def test_csv_conversion_and_records_match_csv_upload(self):
+        with CsvArchive(self.dir) as archive:
+            for row in sample_rows():
+                archive.write(row)
+        csv_path = self.dir / f"data_{DEVICE_IDS[0]}.csv"
+        parquet_path = self.dir / "converted.parquet"
+        self.assertEqual(csv_to_parquet(csv_path, parquet_path), 30)
+
+        with open(csv_path, newline="") as f:
+            csv_rows = list(csv.DictReader(f))
+        for mode in ("single", MULTI):
+            expected = [flat_row_to_records(row, mode) for row in csv_rows]
+            self.assertEqual(list(iter_parquet_records(parquet_path, mode)), expected)
+
+    def test_vectorized_grid_matches_csv_writer(self):
+        grid = generate_history_arrays(datetime(2025, 5, 1), datetime(2025, 5, 2, 12),
+                                       timedelta(minutes=30), external_temp=25.0)
+        write_grid_parquet(grid, self.dir)
+        from vector_data import write_device_csvs
+        write_device_csvs(grid, self.dir)
+
+        for device_id in DEVICE_IDS:
+            with open(self.dir / f"data_{device_id}.csv", newline="") as f:
+                expected = [{k: (v if k in ("device_id", "timestamp", "aerator_status") else float(v))
+                             for k, v in row.items()} for row in csv.DictReader(f)]
+            self.assertEqual(list(iter_rows(self.dir / f"data_{device_id}.parquet")), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
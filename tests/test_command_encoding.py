@@ -0,0 +1,101 @@
+import sys
+import json
+import base64
+import binascii
+import struct
+import asyncio
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.append(str(ROOT / "server"))
+# The server decoder is MicroPython code: alias the u-modules it imports
+sys.modules.setdefault("ujson", json)
+sys.modules.setdefault("ubinascii", binascii)
+sys.modules.setdefault("ustruct", struct)
+
+from controller_mqtt import actions, commands, encoding
+from controller_mqtt.commander import IoTCommander
+from controller_mqtt.local_broker import LocalBroker, SimulatedServer
+from utils import command_frame
+
+ACK_TOPIC = "BIO-GEN-01-F5Z/sensors"
+URL = "https://objects.githubusercontent.com/github-production-release-asset/server.zip?X-Amz-Signature=abc"
+
+
+class LocalConfig:
+    ack_topic = ACK_TOPIC
+
+    def get_topic_for_device(self, device_id):
+        return f"bioiot/control/{device_id}"
+
+
+def sample_commands():
+    return [
+        commands.create_server_reboot_command(),
+        commands.create_update_command("server", URL),
+        commands.create_update_command("client", URL),
+        commands.create_params_command({"cycle_hours": 1.5, "duty_cycle": 0.25}),
+        commands.create_fetch_update_command(URL),
+    ]
+
+
+def without_sender(command):
+    return {k: v for k, v in command.items() if k != "sender"}
+
+
+class TestCompactEncoding(unittest.TestCase):
+    def test_round_trip_on_both_sides(self):
+        for command in sample_commands():
+            token = encoding.encode_command_token(command)
+            self.assertEqual(encoding.decode_message(token), without_sender(command))
+            self.assertEqual(command_frame.decode_compact(token), without_sender(command))
+
+    def test_legacy_wrapper_still_decodes(self):
+        command = commands.create_update_command("server", URL)
+        wrapper = json.dumps(actions._wrap_command(command, "base64"))
+        self.assertEqual(encoding.decode_message(wrapper), command)
+        self.assertEqual(command_frame.decode_wrapper(wrapper), command)
+        self.assertIsNone(command_frame.decode_compact(wrapper))
+
+    def test_is_smaller_than_the_wrapper(self):
+        command = commands.create_server_reboot_command()
+        compact = actions._wrap_command(command, "compact")
+        wrapper = json.dumps(actions._wrap_command(command, "base64"))
+        self.assertLess(len(compact) * 4, len(wrapper))
+        # Safe for the modem's +QMTRECV text: no quotes, commas or braces
+        self.assertFalse(set(compact) & set('",{}\r\n'))
+
+    def test_corrupted_frames_are_rejected(self):
+        frame = bytearray(encoding.encode_command(commands.create_update_command("server", URL)))
+        frame[20] ^= 0x01
+        with self.assertRaises(ValueError):
+            encoding.decode_command(bytes(frame))
+        self.assertIsNone(command_frame.decode_frame(bytes(frame)))
+        self.assertIsNone(command_frame.decode_compact("not-base64!"))
+
+    def test_command_id_must_be_hex(self):
+        command = commands.create_server_reboot_command()
+        command["command_id"] = "manual"
+        with self.assertRaises(ValueError):
+            encoding.encode_command(command)
+
+    def test_compact_commands_are_acked(self):
+        broker = LocalBroker()
+        server = SimulatedServer(broker, "SERVER_1", ACK_TOPIC)
+        commander = IoTCommander(LocalConfig(), mqtt_connection=broker.connection())
+        command = commands.create_server_reboot_command()
+
+        async def scenario():
+            await commander.connect()
+            return await commander.send_command_with_acks(
+                actions._wrap_command(command, "compact"), command["command_id"], ["SERVER_1"], timeout=0.3)
+
+        self.assertTrue(asyncio.run(scenario())[0]["confirmed"])
+        self.assertEqual(server.received[0]["command_type"], "reset")
+        self.assertFalse(broker.published[0][1].startswith(b"{"))
+
+
+if __name__ == "__main__":
+    unittest.main()
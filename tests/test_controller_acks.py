@@ -0,0 +1,86 @@
+import sys
+import asyncio
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from controller_mqtt import actions, commands
+from controller_mqtt.acks import AckCollector
+from controller_mqtt.commander import IoTCommander
+from controller_mqtt.local_broker import LocalBroker, SimulatedServer, topic_matches
+
+ACK_TOPIC = "BIO-GEN-01-F5Z/sensors"
+
+
+class LocalConfig:
+    ack_topic = ACK_TOPIC
+
+    def get_topic_for_device(self, device_id):
+        return f"bioiot/control/{device_id}"
+
+    def get_topic_for_all_devices(self):
+        return "bioiot/control/all"
+
+
+class TestAckCollector(unittest.TestCase):
+    def test_topic_wildcards(self):
+        self.assertTrue(topic_matches("bioiot/control/+", "bioiot/control/SERVER_1"))
+        self.assertTrue(topic_matches("bioiot/#", "bioiot/control/all"))
+        self.assertFalse(topic_matches("bioiot/control/+", "bioiot/control"))
+
+    def test_ignores_other_events_and_unknown_commands(self):
+        async def scenario():
+            collector = AckCollector()
+            future = collector.expect("abc", "SERVER_1")
+            self.assertFalse(collector.feed(ACK_TOPIC, b'{"event": "boot", "device_id": "SERVER_1"}'))
+            self.assertFalse(collector.feed(ACK_TOPIC, b'{"event": "command_ack", "command_id": "zzz", "device_id": "SERVER_1"}'))
+            self.assertTrue(collector.feed(ACK_TOPIC, b'{"event": "command_ack", "command_id": "abc", "device_id": "SERVER_1"}'))
+            return await future
+
+        self.assertEqual(asyncio.run(scenario())["command_id"], "abc")
+
+    def test_boot_event_must_carry_the_command_id(self):
+        async def scenario():
+            collector = AckCollector()
+            future = collector.expect_event("boot", "SERVER_1", "abc")
+            self.assertFalse(collector.feed(ACK_TOPIC, b'{"event": "boot", "device_id": "SERVER_1"}'))
+            self.assertFalse(collector.feed(ACK_TOPIC, b'{"event": "boot", "device_id": "SERVER_1", "command_id": "zzz"}'))
+            self.assertFalse(future.done())
+            self.assertTrue(collector.feed(ACK_TOPIC, b'{"event": "boot", "device_id": "SERVER_1", "command_id": "abc"}'))
+            return await future
+
+        self.assertEqual(asyncio.run(scenario())["command_id"], "abc")
+
+
+class TestCommandAcks(unittest.TestCase):
+    def test_acks_are_correlated_and_missing_ones_retried(self):
+        broker = LocalBroker()
+        servers = {
+            "SERVER_1": SimulatedServer(broker, "SERVER_1", ACK_TOPIC, delay=0.05),
+            "SERVER_2": SimulatedServer(broker, "SERVER_2", ACK_TOPIC, drop_acks=1),
+            "SERVER_3": SimulatedServer(broker, "SERVER_3", ACK_TOPIC, fail=True),
+        }
+        commander = IoTCommander(LocalConfig(), mqtt_connection=broker.connection())
+        command = commands.create_server_reboot_command()
+
+        async def scenario():
+            await commander.connect()
+            return await commander.send_command_with_acks(
+                actions._wrap_command(command), command["command_id"], list(servers), timeout=0.3, retries=1)
+
+        results = {r["device"]: r for r in asyncio.run(scenario())}
+
+        self.assertTrue(results["SERVER_1"]["confirmed"])
+        self.assertEqual(results["SERVER_1"]["attempts"], 1)
+        self.assertGreaterEqual(results["SERVER_1"]["ack_latency_ms"], 40)
+        self.assertTrue(results["SERVER_2"]["confirmed"])
+        self.assertEqual(results["SERVER_2"]["attempts"], 2)
+        self.assertFalse(results["SERVER_3"]["confirmed"])
+        self.assertTrue(results["SERVER_3"]["acked"])
+        self.assertEqual(len(servers["SERVER_3"].received), 2)
+        self.assertEqual(servers["SERVER_1"].received[0]["command_id"], command["command_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import sys
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from controller_mqtt.commander import IoTCommander
+from controller_mqtt.local_broker import LocalBroker, SimulatedServer
+from controller_mqtt.rollout import load_devices, plan_waves, run_rollout
+from controller_mqtt.session import CommanderSession
+
+ACK_TOPIC = "BIO-GEN-01-F5Z/sensors"
+URL = "https://example.com/server.zip"
+
+
+class LocalConfig:
+    ack_topic = ACK_TOPIC
+
+    def get_topic_for_device(self, device_id):
+        return f"bioiot/control/{device_id}"
+
+    def get_topic_for_all_devices(self):
+        return "bioiot/control/all"
+
+
+def fleet(n, failing=(), reboot_delay=0.01):
+    broker = LocalBroker()
+    servers = {f"SERVER_{i}": SimulatedServer(broker, f"SERVER_{i}", ACK_TOPIC, fail=f"SERVER_{i}" in failing,
+                                              reboot_delay=reboot_delay)
+               for i in range(n)}
+    session = CommanderSession(commander=IoTCommander(LocalConfig(), mqtt_connection=broker.connection()))
+    return servers, session
+
+
+class TestPlanWaves(unittest.TestCase):
+    def test_canary_percent_rest(self):
+        devices = [f"D{i}" for i in range(10)]
+        waves = plan_waves(devices, canary=1, percent=30)
+        self.assertEqual([len(w) for w in waves], [1, 3, 6])
+        self.assertEqual(sum(waves, []), devices)
+
+    def test_small_fleet_skips_empty_waves(self):
+        self.assertEqual(plan_waves(["A", "B"], canary=1, percent=25), [["A"], ["B"]])
+
+    def test_load_devices_merges_sources(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            devices_file = Path(tmp, "devices.txt")
+            devices_file.write_text("# campo norte\nSERVER_2\nSERVER_3\n")
+            groups_file = Path(tmp, "groups.json")
+            groups_file.write_text(json.dumps({"pilot": ["SERVER_3", "SERVER_4"]}))
+            devices = load_devices(["SERVER_1", "SERVER_2"], str(devices_file), "pilot", str(groups_file))
+        self.assertEqual(devices, ["SERVER_1", "SERVER_2", "SERVER_3", "SERVER_4"])
+
+
+class TestRollout(unittest.TestCase):
+    def test_all_waves_share_one_command(self):
+        servers, session = fleet(6)
+        with session:
+            summary = run_rollout(session, "server", URL, list(servers), canary=1, percent=50,
+                                  ack_timeout=0.3, retries=0, wait_boot=True, boot_timeout=1)
+        self.assertEqual(summary["status"], "completed")
+        self.assertEqual(summary["waves"], 3)
+        self.assertTrue(all(r["confirmed"] for r in summary["results"]))
+        ids = {s.received[0]["command_id"] for s in servers.values()}
+        self.assertEqual(ids, {summary["command_id"]})
+        self.assertEqual(servers["SERVER_0"].received[0]["payload"]["url"], URL)
+
+    def test_failing_canary_aborts_the_rest(self):
+        servers, session = fleet(5, failing={"SERVER_0"})
+        with session:
+            summary = run_rollout(session, "server", URL, list(servers), canary=1,
+                                  ack_timeout=0.2, retries=0)
+        self.assertEqual(summary["status"], "aborted")
+        self.assertEqual(summary["pending"], ["SERVER_1", "SERVER_2", "SERVER_3", "SERVER_4"])
+        self.assertEqual(servers["SERVER_1"].received, [])
+
+    def test_missing_boot_counts_as_failure_and_operator_can_continue(self):
+        servers, session = fleet(3, reboot_delay=None)
+        pauses = []
+        with session:
+            summary = run_rollout(session, "server", URL, list(servers), canary=1, percent=34,
+                                  ack_timeout=0.3, retries=0, wait_boot=True, boot_timeout=0.1,
+                                  on_pause=lambda pause: pauses.append(pause) or True)
+        self.assertEqual(summary["status"], "completed")
+        self.assertEqual([p["wave"] for p in pauses], [1])
+        self.assertFalse(any(r["confirmed"] for r in summary["results"]))
+        self.assertTrue(all(s.received for s in servers.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
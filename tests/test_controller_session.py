@@ -0,0 +1,104 @@
+import sys
+import time
+import asyncio
+import threading
+import unittest
+from concurrent.futures import Future
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from controller_mqtt import actions
+from controller_mqtt.commander import IoTCommander
+from controller_mqtt.session import CommanderSession, run_interactive
+
+
+class FakeCommander:
+    def __init__(self):
+        self.connected = False
+        self.connects = 0
+        self.sent = []
+
+    async def connect(self):
+        self.connects += 1
+        self.connected = True
+        return True
+
+    async def send_command(self, command_payload, target_devices="all"):
+        self.sent.append((command_payload, target_devices))
+        return [{"device": target_devices, "acked": True, "error": None, "latency_ms": 1.0}]
+
+    async def disconnect(self):
+        self.connected = False
+
+
+class TestCommanderSession(unittest.TestCase):
+    def test_one_connection_for_many_commands(self):
+        commander = FakeCommander()
+        with CommanderSession(commander=commander) as session:
+            for device in ("SERVER_1", "SERVER_2", "SERVER_3"):
+                actions.handle_server_reboot(device, session=session)
+            run_interactive(session, lines=iter(["reboot SERVER_4\n", "status\n", "exit\n", "reboot NEVER\n"]))
+
+        self.assertEqual(commander.connects, 1)
+        self.assertFalse(commander.connected)
+        self.assertEqual([device for _, device in commander.sent], ["SERVER_1", "SERVER_2", "SERVER_3", "SERVER_4"])
+        self.assertEqual(set(commander.sent[0][0]), {"data"})
+
+
+class FakeConfig:
+    def get_topic_for_device(self, device_id):
+        return f"bioiot/control/{device_id}"
+
+    def get_topic_for_all_devices(self):
+        return "bioiot/control/all"
+
+
+class FakeMqttConnection:
+    """PUBACKs arrive from another thread after `delay`, like awscrt futures; `lost` never ack"""
+
+    def __init__(self, delay=0.2, lost=()):
+        self.delay = delay
+        self.lost = set(lost)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload, qos):
+        future = Future()
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        def ack():
+            with self._lock:
+                self.in_flight -= 1
+            future.set_result({"packet_id": 1})
+
+        if topic.rsplit("/", 1)[-1] not in self.lost:
+            threading.Timer(self.delay, ack).start()
+        return future, 1
+
+
+class TestFleetFanOut(unittest.TestCase):
+    def test_publishes_concurrently_within_the_window(self):
+        commander = IoTCommander(FakeConfig(), max_in_flight=10, publish_timeout=1)
+        commander.mqtt_connection = FakeMqttConnection(lost={"SERVER_7"})
+        devices = [f"SERVER_{i}" for i in range(30)]
+
+        start = time.perf_counter()
+        results = asyncio.run(commander.send_command({"data": "x"}, devices))
+        elapsed = time.perf_counter() - start
+
+        # 30 devices x 200 ms with 10 in flight: about 0.6 s plus the lost device's timeout
+        self.assertLess(elapsed, 2.5)
+        self.assertEqual(commander.mqtt_connection.max_in_flight, 10)
+        self.assertEqual([r["device"] for r in results], devices)
+        failed = [r for r in results if not r["acked"]]
+        self.assertEqual([r["device"] for r in failed], ["SERVER_7"])
+        self.assertIn("PUBACK", failed[0]["error"])
+        self.assertTrue(all(r["latency_ms"] >= 150 for r in results if r["acked"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
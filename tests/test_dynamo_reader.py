@@ -0,0 +1,84 @@
+import sys
+import unittest
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+import boto3
+from botocore.stub import Stubber, ANY
+from dynamo_reader import DynamoReader, DEVICE_TIME_INDEX
+
+
+def item(device_id, ms):
+    return {"message_id": {"S": f"{device_id}-{ms}"}, "device_id": {"S": device_id},
+            "insertion_time": {"N": str(ms)}}
+
+
+class TestDynamoReaderQuery(unittest.TestCase):
+    def setUp(self):
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1",
+                                  aws_access_key_id="local", aws_secret_access_key="local")
+        self.table = dynamodb.Table("SensorDataTable")
+        self.stubber = Stubber(self.table.meta.client)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+
+    def test_latest_queries_the_index_newest_first_across_pages(self):
+        expected = {"TableName": "SensorDataTable", "IndexName": DEVICE_TIME_INDEX,
+                    "KeyConditionExpression": ANY, "ScanIndexForward": False, "Limit": 3}
+        last_key = {"message_id": {"S": "d1-900"}, "device_id": {"S": "d1"}, "insertion_time": {"N": "900"}}
+        self.stubber.add_response("query", {"Items": [item("d1", 1000), item("d1", 900)],
+                                            "LastEvaluatedKey": last_key}, expected)
+        self.stubber.add_response("query", {"Items": [item("d1", 800)]},
+                                  dict(expected, Limit=1, ExclusiveStartKey={
+                                      "message_id": "d1-900", "device_id": "d1",
+                                      "insertion_time": Decimal(900)}))
+
+        items = DynamoReader(self.table).latest("d1", limit=3)
+        self.assertEqual([i["insertion_time"] for i in items], [1000.0, 900.0, 800.0])
+        self.stubber.assert_no_pending_responses()
+
+
+class FakeScanClient:
+    """Serves `pages` pages of 10 items per segment"""
+
+    def __init__(self, pages=3):
+        self.pages = pages
+        self.calls = []
+
+    def scan(self, TableName, Segment, TotalSegments, Limit=None, ExclusiveStartKey=None):
+        self.calls.append((Segment, ExclusiveStartKey))
+        page = ExclusiveStartKey["page"] if ExclusiveStartKey else 0
+        items = [{"segment": Segment, "n": page * 10 + i} for i in range(10)]
+        response = {"Items": items}
+        if page + 1 < self.pages:
+            response["LastEvaluatedKey"] = {"page": page + 1}
+        return response
+
+
+class TestDynamoReaderScan(unittest.TestCase):
+    def test_parallel_scan_reads_every_segment_and_page(self):
+        client = FakeScanClient()
+        reader = DynamoReader(SimpleNamespace(meta=SimpleNamespace(client=client), name="t"))
+
+        items = list(reader.scan_all(segments=4, buffer=5))
+        self.assertEqual(len(items), 4 * 3 * 10)
+        self.assertEqual({(i["segment"], i["n"]) for i in items},
+                         {(s, n) for s in range(4) for n in range(30)})
+
+    def test_stopping_early_releases_the_workers(self):
+        client = FakeScanClient(pages=1000)
+        reader = DynamoReader(SimpleNamespace(meta=SimpleNamespace(client=client), name="t"))
+
+        scan = reader.scan_all(segments=2, buffer=5)
+        self.assertEqual(len([next(scan) for _ in range(20)]), 20)
+        scan.close()
+        self.assertLess(len(client.calls), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
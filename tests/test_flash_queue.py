@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "server"))
+sys.modules.setdefault("uos", os)
+
+from utils.flash_queue import FlashQueue
+
+
+def reading(i):
+    return json.dumps({"client_id": "client-1", "seq": i, "pH": 7.1})
+
+
+class TestFlashQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = os.path.join(self.tmp.name, "backlog")
+
+    def seqs(self, batch):
+        return [json.loads(record)["seq"] for record, _ in batch]
+
+    def test_peek_does_not_consume_until_commit(self):
+        queue = FlashQueue(self.directory)
+        self.assertTrue(queue.is_empty())
+        for i in range(5):
+            queue.append(reading(i))
+
+        batch = queue.peek(max_records=3)
+        self.assertEqual(self.seqs(batch), [0, 1, 2])
+        self.assertEqual(self.seqs(queue.peek(max_records=3)), [0, 1, 2])
+
+        queue.commit(batch[1][1])  # only the first two were delivered
+        self.assertEqual(self.seqs(queue.peek()), [2, 3, 4])
+        queue.commit(queue.peek()[-1][1])
+        self.assertTrue(queue.is_empty())
+        self.assertEqual(queue.peek(), [])
+
+    def test_records_span_segments_and_finished_segments_are_deleted(self):
+        queue = FlashQueue(self.directory, segment_bytes=120)
+        for i in range(10):
+            queue.append(reading(i))
+        segments = [name for name in os.listdir(self.directory) if name.startswith("seg_")]
+        self.assertGreater(len(segments), 3)
+
+        batch = queue.peek(max_records=100, max_bytes=100000)
+        self.assertEqual(self.seqs(batch), list(range(10)))
+        queue.commit(batch[-1][1])
+        segments = [name for name in os.listdir(self.directory) if name.startswith("seg_")]
+        self.assertEqual(len(segments), 1)  # the segment being appended to is kept
+        queue.append(reading(10))
+        self.assertEqual(self.seqs(queue.peek()), [10])
+
+    def test_survives_a_reboot(self):
+        queue = FlashQueue(self.directory, segment_bytes=120)
+        for i in range(6):
+            queue.append(reading(i))
+        queue.commit(queue.peek(max_records=4)[-1][1])
+
+        rebooted = FlashQueue(self.directory, segment_bytes=120)
+        self.assertEqual(self.seqs(rebooted.peek()), [4, 5])
+        rebooted.append(reading(6))
+        self.assertEqual(self.seqs(rebooted.peek()), [4, 5, 6])
+
+    def test_cap_evicts_oldest_records_first(self):
+        queue = FlashQueue(self.directory, segment_bytes=120, max_bytes=400)
+        for i in range(20):
+            queue.append(reading(i))
+        self.assertLessEqual(queue.size(), 400)
+        remaining = self.seqs(queue.peek(max_records=100, max_bytes=100000))
+        self.assertEqual(remaining[-1], 19)
+        self.assertEqual(remaining, list(range(remaining[0], 20)))
+        self.assertEqual(queue.evicted, remaining[0])
+
+    def test_batch_respects_byte_budget(self):
+        queue = FlashQueue(self.directory)
+        for i in range(10):
+            queue.append(reading(i))
+        record_bytes = len(reading(0)) + 1
+        self.assertEqual(len(queue.peek(max_records=10, max_bytes=3 * record_bytes)), 3)
+
+    def test_line_cut_by_a_reset_is_not_returned(self):
+        queue = FlashQueue(self.directory)
+        queue.append(reading(0))
+        with open(os.path.join(self.directory, "seg_00000001"), "ab") as f:
+            f.write(b'{"client_id": "cli')  # power lost mid-write
+        self.assertEqual(self.seqs(FlashQueue(self.directory).peek()), [0])
+
+    def test_append_after_a_reset_starts_on_a_fresh_line(self):
+        queue = FlashQueue(self.directory)
+        queue.append(reading(0))
+        with open(os.path.join(self.directory, "seg_00000001"), "ab") as f:
+            f.write(b'{"client_id": "cli')  # power lost mid-write
+
+        rebooted = FlashQueue(self.directory)
+        rebooted.append(reading(1))
+        self.assertEqual(self.seqs(rebooted.peek()), [0, 1])
+        self.assertEqual(rebooted.size(), 2 * (len(reading(0)) + 1))
+        rebooted.commit(rebooted.peek()[-1][1])
+        self.assertTrue(rebooted.is_empty())
+        self.assertNotIn("repair.tmp", os.listdir(self.directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
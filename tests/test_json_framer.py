@@ -0,0 +1,45 @@
+import sys
+import json
+import unittest
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "server"))
+
+from utils.json_framer import JsonFramer
+
+
+class TestJsonFramer(unittest.TestCase):
+    def test_nested_objects_and_braces_inside_strings(self):
+        wrapper = json.dumps({"data": "e30=}{", "meta": {"note": "a \"}\" quoted", "n": [1, {"x": 2}]}})
+        framer = JsonFramer()
+        self.assertEqual(framer.feed(wrapper), [wrapper])
+        self.assertEqual(json.loads(wrapper)["meta"]["n"][1], {"x": 2})
+
+    def test_object_split_across_messages(self):
+        wrapper = '{"data": "eyJjb21tYW5kX3R5cGUiOiAicmVzZXQifQ=="}'
+        framer = JsonFramer()
+        self.assertEqual(framer.feed(wrapper[:7]), [])
+        self.assertEqual(framer.feed(wrapper[7:20]), [])
+        self.assertEqual(framer.pending(), 20)
+        self.assertEqual(framer.feed(wrapper[20:] + ' {"data": "x"}'), [wrapper, '{"data": "x"}'])
+        self.assertEqual(framer.pending(), 0)
+
+    def test_escaped_quote_does_not_end_a_string(self):
+        framer = JsonFramer()
+        self.assertEqual(framer.feed('{"a": "\\\\"}'), ['{"a": "\\\\"}'])
+        self.assertEqual(framer.feed('{"a": "\\"}"}'), ['{"a": "\\"}"}'])
+
+    def test_noise_between_objects_is_skipped(self):
+        framer = JsonFramer()
+        self.assertEqual(framer.feed('garbage} ] {"a": 1}\r\n'), ['{"a": 1}'])
+
+    def test_oversized_object_is_dropped_and_counted(self):
+        framer = JsonFramer(max_bytes=32)
+        big = json.dumps({"data": "A" * 40, "inner": {"k": "{"}})
+        self.assertEqual(framer.feed(big + '{"ok": true}'), ['{"ok": true}'])
+        self.assertEqual(framer.overflows, 1)
+        self.assertEqual(framer.frames, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
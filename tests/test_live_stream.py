@@ -0,0 +1,53 @@
+import sys
+import time
+import asyncio
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+import live_stream
+from live_stream import LiveStream, next_tick, simulated_device_ids
+
+
+class SlowWriteClient:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = []
+
+    def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+        time.sleep(self.delay)
+        self.calls.append(CommonAttributes["Dimensions"][0]["Value"])
+
+
+class TestLiveStream(unittest.TestCase):
+    def setUp(self):
+        self._temp = live_stream.get_interpolated_temp
+        live_stream.get_interpolated_temp = lambda t: 25.0
+
+    def tearDown(self):
+        live_stream.get_interpolated_temp = self._temp
+
+    def test_ticks_align_to_wall_clock(self):
+        self.assertEqual(next_tick(3599.9, 60), 3600)
+        self.assertEqual(next_tick(3600.0, 60), 3660)
+        self.assertEqual(next_tick(1_700_000_123.4, 3600) % 3600, 0)
+
+    def test_devices_are_written_concurrently(self):
+        devices = simulated_device_ids(40)
+        self.assertEqual(len(set(devices)), 40)
+
+        client = SlowWriteClient()
+        stream = LiveStream(client, devices, interval=60, concurrency=40)
+        start = time.perf_counter()
+        results = asyncio.run(stream.tick(1_747_000_000))
+
+        # 40 writes of 200 ms each finish in about one write's time, not 8 s
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertEqual(sorted(client.calls), sorted(devices))
+        self.assertTrue(all(r is not None for r in results))
+        self.assertTrue(all(m.sent == 1 and m.last_ms >= 150 for m in stream.metrics.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
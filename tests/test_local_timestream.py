@@ -0,0 +1,125 @@
+import sys
+import time
+import json
+import unittest
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+import boto3
+from botocore.exceptions import ClientError
+from backfill import BackfillEngine
+from local_timestream import LocalTimestream, serve_in_background
+from records import MULTI, build_records
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def record(measure="ph_value", value="430.5", t=None, device="ESP32_5DAEC4", **extra):
+    return dict({
+        "Dimensions": [{"Name": "device_id", "Value": device}],
+        "MeasureName": measure, "MeasureValue": value, "MeasureValueType": "DOUBLE",
+        "Time": str(t or now_ms()),
+    }, **extra)
+
+
+class TestLocalTimestreamValidation(unittest.TestCase):
+    def setUp(self):
+        self.store = LocalTimestream()
+
+    def rejected(self, records, **kwargs):
+        with self.assertRaises(ClientError) as ctx:
+            self.store.write_records("db", "table", records, **kwargs)
+        return ctx.exception.response
+
+    def test_batch_size_limit(self):
+        response = self.rejected([record(t=now_ms() - i) for i in range(101)])
+        self.assertEqual(response["Error"]["Code"], "ValidationException")
+
+    def test_invalid_records_are_rejected_and_valid_ones_kept(self):
+        t = now_ms()
+        response = self.rejected([
+            record(t=t), record("H2S", "abc", t=t), record("NH3", t=t + 3600 * 1000),
+            record("level", t=t, Dimensions=[]),
+        ])
+        self.assertEqual([r["RecordIndex"] for r in response["RejectedRecords"]], [1, 2, 3])
+        self.assertEqual(self.store.count(), 1)
+
+    def test_duplicates_by_dimensions_time_and_measure(self):
+        t = now_ms()
+        self.store.write_records("db", "table", [record(t=t)])
+        self.store.write_records("db", "table", [record(t=t)])  # identical: idempotent
+
+        response = self.rejected([record(value="431", t=t)])
+        self.assertEqual(response["RejectedRecords"][0]["ExistingVersion"], 1)
+
+        self.store.write_records("db", "table", [record(value="431", t=t, Version=2)])
+        self.store.write_records("db", "table", [record(value="431", t=t, device="other")])
+        rows = self.store.query("db", "table", dimensions={"device_id": "ESP32_5DAEC4"})
+        self.assertEqual([r["value"] for r in rows], ["431"])
+
+    def test_micro_and_nanosecond_times_round_trip(self):
+        base = now_ms() - 60000
+        times = [base + i for i in range(50)]
+        for unit, factor in (("MICROSECONDS", 1000), ("NANOSECONDS", 1000000)):
+            self.store.write_records("db", "table", [
+                record(t=t * factor, TimeUnit=unit, device=unit) for t in times])
+            rows = self.store.query("db", "table", dimensions={"device_id": unit})
+            self.assertEqual([r["time"] for r in rows], times, unit)
+
+            # The same points in ms are duplicates of those, not new records
+            self.store.write_records("db", "table", [record(t=t, device=unit) for t in times])
+            self.assertEqual(len(self.store.query("db", "table", times[7], times[7],
+                                                  dimensions={"device_id": unit})), 1)
+        self.assertEqual(self.store.count(), 2 * len(times))
+
+    def test_time_range_query_with_multi_records(self):
+        base = now_ms() - 10 * 60 * 1000
+        for minute in range(10):
+            records = build_records([{"Name": "device_id", "Value": "d1"}], base + minute * 60000,
+                                    [("H2S", str(300 + minute), "DOUBLE"), ("aerator_status", "ON", "VARCHAR")],
+                                    MULTI)
+            self.store.write_records("db", "table", records)
+
+        rows = self.store.query("db", "table", base + 2 * 60000, base + 4 * 60000)
+        self.assertEqual([r["values"]["H2S"] for r in rows], ["302", "303", "304"])
+
+
+class TestLocalTimestreamServer(unittest.TestCase):
+    def setUp(self):
+        self.store = LocalTimestream()
+        self.server, self.url = serve_in_background(self.store)
+        self.client = boto3.client("timestream-write", endpoint_url=self.url, region_name="us-east-1",
+                                   aws_access_key_id="local", aws_secret_access_key="local")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_backfill_engine_over_http(self):
+        t = now_ms() - 3600 * 1000
+        rows = [[record(f"m{i}", "1.0", t=t + row) for i in range(7)] for row in range(60)]
+        engine = BackfillEngine(self.client, "db", "table", max_workers=4)
+
+        stats = engine.run(rows)
+        self.assertEqual((stats["written"], stats["failed"]), (420, 0))
+        # Re-uploading the same rows is accepted without new data
+        stats = engine.run(rows)
+        self.assertEqual((stats["written"], stats["failed"]), (420, 0))
+        self.assertEqual(self.store.count("db", "table"), 420)
+
+        with self.assertRaises(ClientError) as ctx:
+            self.client.write_records(DatabaseName="db", TableName="table",
+                                      Records=[record("m0", "2.0", t=t)])
+        self.assertIn("ExistingVersion", ctx.exception.response["RejectedRecords"][0])
+
+        query = f"{self.url}/records?database=db&table=table&measure=m0&start={t}&end={t + 9}"
+        with urllib.request.urlopen(query) as response:
+            self.assertEqual(len(json.load(response)["records"]), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+import json
+import asyncio
+import unittest
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "server"))
+sys.modules.setdefault("uasyncio", asyncio)
+
+from utils.batcher import PayloadBatcher, join_records
+
+
+def reading(i, pad=0):
+    return json.dumps({"client_id": "client-1", "seq": i, "raw": "x" * pad})
+
+
+class FakeLink:
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.payloads = []
+        self.failed = []
+
+    async def send(self, payload):
+        self.payloads.append(payload)
+        return self.ok
+
+    def seqs(self, payload):
+        decoded = json.loads(payload)
+        return [r["seq"] for r in decoded] if isinstance(decoded, list) else [decoded["seq"]]
+
+
+class TestPayloadBatcher(unittest.TestCase):
+    def test_readings_within_the_window_share_one_publish(self):
+        link = FakeLink()
+
+        async def scenario():
+            batcher = PayloadBatcher(link.send, window_s=0.05)
+            for i in range(5):  # a client flushing its pending files 0.5 s apart, scaled down
+                await batcher.add(reading(i))
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.1)
+            return batcher
+
+        batcher = asyncio.run(scenario())
+        self.assertEqual(len(link.payloads), 1)
+        self.assertEqual(link.seqs(link.payloads[0]), [0, 1, 2, 3, 4])
+        self.assertEqual((batcher.batches_sent, batcher.records_sent), (1, 5))
+
+    def test_byte_budget_and_record_limit_flush_early(self):
+        link = FakeLink()
+
+        async def scenario():
+            batcher = PayloadBatcher(link.send, window_s=10, max_bytes=300, max_records=3)
+            for i in range(3):
+                await batcher.add(reading(i, pad=100))
+            for i in range(3, 6):
+                await batcher.add(reading(i))
+            return batcher
+
+        batcher = asyncio.run(scenario())
+        self.assertEqual([link.seqs(p) for p in link.payloads], [[0, 1], [2, 3, 4]])
+        self.assertTrue(all(len(p) <= 300 for p in link.payloads))
+        self.assertEqual(batcher.pending(), 1)
+
+    def test_failed_batch_is_handed_back(self):
+        link = FakeLink(ok=False)
+
+        async def scenario():
+            batcher = PayloadBatcher(link.send, link.failed.extend, window_s=10)
+            await batcher.add(reading(0))
+            await batcher.add(reading(1))
+            return await batcher.flush()
+
+        self.assertFalse(asyncio.run(scenario()))
+        self.assertEqual(link.failed, [reading(0), reading(1)])
+
+    def test_single_record_is_sent_unwrapped(self):
+        self.assertEqual(join_records([reading(0)]), reading(0))
+        self.assertIsInstance(json.loads(join_records([reading(0), reading(1)])), list)
+
+
+if __name__ == "__main__":
+    unittest.main()
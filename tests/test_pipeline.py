@@ -0,0 +1,121 @@
+import sys
+import json
+import time
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+import config
+import pipeline
+from config import DATABASE_NAME, TABLE_NAME
+from botocore.exceptions import ClientError
+from local_timestream import LocalTimestream
+from records import flat_row_to_records
+from upload_data import read_csv_records
+from weather_cache import FixtureSource
+
+START = datetime(2025, 5, 1, tzinfo=timezone.utc)
+
+
+class SlowStore(LocalTimestream):
+    """LocalTimestream whose writes take a while, to make the writers the bottleneck"""
+
+    def __init__(self, delay=0.005):
+        super().__init__()
+        self.delay = delay
+        self.records_written = 0
+        self._count_lock = threading.Lock()
+
+    def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+        time.sleep(self.delay)
+        result = super().write_records(DatabaseName, TableName, Records, CommonAttributes)
+        with self._count_lock:
+            self.records_written += len(Records)
+        return result
+
+
+class BrokenStore:
+    def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+        raise ClientError({"Error": {"Code": "AccessDeniedException", "Message": "denied"}}, "WriteRecords")
+
+
+def stored_keys(store):
+    return {(r["dimensions"]["device_id"], r["time"], r["measure_name"], str(r["value"]))
+            for r in store.query(DATABASE_NAME, TABLE_NAME)}
+
+
+def csv_keys(archive_dir):
+    keys = set()
+    for path in sorted(Path(archive_dir).glob("data_*.csv")):
+        for records in read_csv_records(path):
+            for r in records:
+                keys.add((r["Dimensions"][0]["Value"], int(r["Time"]), r["MeasureName"], r["MeasureValue"]))
+    return keys
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        times = [f"2025-04-{d:02d}T{h:02d}:00" for d in range(28, 31) for h in range(24)]
+        times += [f"2025-05-{d:02d}T{h:02d}:00" for d in range(1, 6) for h in range(24)]
+        fixture = Path(self.tmp.name) / "open_meteo.json"
+        fixture.write_text(json.dumps({"hourly": {"time": times, "temperature_2m": [24.0] * len(times)}}))
+        config.configure_weather(FixtureSource(fixture))
+        self.addCleanup(setattr, config, "_weather", None)
+
+    def test_csv_copy_matches_what_was_written(self):
+        store = LocalTimestream()
+        archive = Path(self.tmp.name) / "archive"
+        stats = pipeline.run_pipeline(store, START, START + timedelta(hours=12),
+                                      archive_dir=archive, max_workers=2)
+
+        self.assertEqual(stats["rows"], 13 * len(config.DEVICE_IDS))
+        self.assertEqual(stats["failed"], 0)
+        self.assertEqual(csv_keys(archive), stored_keys(store))
+        self.assertEqual(store.count(), stats["records"])
+
+    def test_generation_waits_for_the_writers(self):
+        store = SlowStore()
+        produced = [0]
+        real_iter_history = pipeline.iter_history
+        max_in_flight = 2
+        backlog = []
+
+        def counting_history(*args, **kwargs):
+            for row in real_iter_history(*args, **kwargs):
+                produced[0] += len(flat_row_to_records(row))
+                # Records generated but not written yet: the in-flight batches plus the one being packed
+                backlog.append(produced[0] - store.records_written)
+                yield row
+
+        with mock.patch.object(pipeline, "iter_history", counting_history):
+            stats = pipeline.run_pipeline(store, START, START + timedelta(days=1),
+                                          max_workers=1, max_in_flight=max_in_flight)
+
+        self.assertEqual(stats["written"], produced[0])
+        self.assertLessEqual(max(backlog), (max_in_flight + 1) * 100 + 20)
+
+    def test_failed_writer_raises_instead_of_hanging(self):
+        result = {}
+
+        def run():
+            try:
+                pipeline.run_pipeline(BrokenStore(), START, START + timedelta(days=2), max_workers=2)
+            except Exception as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(30)
+        self.assertFalse(thread.is_alive())
+        self.assertIsInstance(result.get("error"), RuntimeError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import sys
+import json
+import tempfile
+import threading
+import unittest
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+from backfill import BackfillEngine
+from config import CYCLE_START_UTC, get_cycle_id
+from local_timestream import LocalTimestream
+from records import MULTI, SINGLE, build_records
+from rollups import CYCLE, FIVE_MINUTES, HOURLY, RollupStore, RollupWriter, make_server
+
+START_MS = int(CYCLE_START_UTC.timestamp() * 1000)
+
+
+def minute_rows(minutes, mode=SINGLE):
+    """One row per minute for one device: ph_value = minute, plus a VARCHAR"""
+    return [build_records([{"Name": "device_id", "Value": "d1"}], START_MS + m * 60000,
+                          [("ph_value", str(float(m)), "DOUBLE"), ("aerator_status", "ON", "VARCHAR")], mode)
+            for m in range(minutes)]
+
+
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = RollupStore(Path(self.tmp.name) / "rollups.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_levels_from_single_and_multi_records(self):
+        for mode in (SINGLE, MULTI):
+            store = RollupStore(":memory:")
+            for records in minute_rows(240, mode):
+                store.ingest(records)
+
+            five = store.query(FIVE_MINUTES, device_id="d1", measure="ph_value")
+            self.assertEqual(len(five), 48)
+            self.assertEqual((five[1]["min"], five[1]["max"], five[1]["mean"], five[1]["count"]),
+                             (5.0, 9.0, 7.0, 5))
+
+            # The cycles start at :15, so the 17:00 hour holds minutes 45..104
+            hourly = store.query(HOURLY, START_MS + 60 * 60000, START_MS + 2 * 60 * 60000)
+            self.assertEqual([r["mean"] for r in hourly], [74.5, 134.5])
+
+            cycles = store.query(CYCLE)
+            first = datetime.fromtimestamp(START_MS / 1000, timezone.utc)
+            self.assertEqual(cycles[0]["cycle_id"], get_cycle_id(first))
+            self.assertEqual([r["count"] for r in cycles], [180, 60])
+            self.assertEqual(store.distinct("measure"), ["ph_value"])
+
+    def test_writer_ingests_only_accepted_records(self):
+        local = LocalTimestream(retention_hours=None)
+        client = RollupWriter(local, self.store)
+        rows = minute_rows(30)
+        rows[3][0]["MeasureValue"] = "not a number"
+
+        stats = BackfillEngine(client, "db", "table", max_workers=2, max_retries=0).run(rows)
+        self.assertEqual(stats["failed"], 1)
+        (row,) = self.store.query(HOURLY)
+        self.assertEqual(row["count"], 29)
+
+    def test_reupload_and_upsert_are_idempotent(self):
+        for _ in range(2):
+            for records in minute_rows(10):
+                self.store.ingest(records)
+        (row,) = self.store.query(HOURLY)
+        self.assertEqual((row["count"], row["min"], row["max"], row["mean"]), (10, 0.0, 9.0, 4.5))
+
+        # A new value for minute 9 replaces the old one instead of adding to it
+        upsert = minute_rows(10)[9]
+        upsert[0]["MeasureValue"] = "1.0"
+        self.store.ingest(upsert)
+        (row,) = self.store.query(HOURLY)
+        self.assertEqual((row["count"], row["min"], row["max"], row["mean"]), (10, 0.0, 8.0, 3.7))
+        five = self.store.query(FIVE_MINUTES)
+        self.assertEqual([(r["max"], r["count"]) for r in five], [(4.0, 5), (8.0, 5)])
+
+    def test_time_units_are_normalized(self):
+        scale = {"SECONDS": 1 / 1000, "MILLISECONDS": 1, "MICROSECONDS": 1000, "NANOSECONDS": 1000000}
+        for unit, factor in scale.items():
+            store = RollupStore(":memory:")
+            for records in minute_rows(10):
+                for record in records:
+                    record["Time"] = str(int(int(record["Time"]) * factor))
+                    record["TimeUnit"] = unit
+                store.ingest(records)
+            five = store.query(FIVE_MINUTES)
+            self.assertEqual([r["time"] for r in five], [START_MS, START_MS + 5 * 60000], unit)
+            self.assertEqual([r["count"] for r in five], [5, 5], unit)
+
+    def test_http_api(self):
+        for records in minute_rows(10):
+            self.store.ingest(records)
+        server = make_server(self.store, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/rollups?level=5m&device_id=d1&from={START_MS}"
+            with urllib.request.urlopen(url) as response:
+                rows = json.load(response)
+            self.assertEqual([r["mean"] for r in rows], [2.0, 7.0])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import asyncio
+import unittest
+from pathlib import Path
+
+# Server code is MicroPython: alias the u-modules it imports
+sys.path.append(str(Path(__file__).resolve().parents[1] / "server"))
+sys.modules.setdefault("uasyncio", asyncio)
+sys.modules.setdefault("uos", os)
+sys.modules.setdefault("utime", time)
+
+from utils import logger
+logger.LOGGING_ENABLED = False
+
+from core.modem import ModemArbiter, PRIORITY_COMMAND, PRIORITY_POLL, PRIORITY_PUBLISH
+
+
+class TestModemArbiter(unittest.TestCase):
+    def test_publishes_overtake_queued_polls(self):
+        order = []
+
+        async def scenario():
+            arbiter = ModemArbiter()
+            async with arbiter.exclusive(PRIORITY_COMMAND):
+                # Queued while the modem is held
+                poll = asyncio.create_task(arbiter.call(order.append, "poll", priority=PRIORITY_POLL))
+                publish = asyncio.create_task(arbiter.call(order.append, "publish", priority=PRIORITY_PUBLISH))
+                await asyncio.sleep(0.01)
+                self.assertEqual(order, [])
+                self.assertEqual(arbiter.pending(), 2)
+                order.append("ota")
+            await asyncio.gather(poll, publish)
+
+        asyncio.run(scenario())
+        self.assertEqual(order, ["ota", "publish", "poll"])
+
+    def test_results_and_errors_reach_the_caller(self):
+        async def later(value):
+            await asyncio.sleep(0)
+            return value * 2
+
+        def broken():
+            raise OSError("UART timeout")
+
+        async def scenario():
+            arbiter = ModemArbiter()
+            self.assertEqual(await arbiter.call(max, 3, 7), 7)
+            self.assertEqual(await arbiter.call(later, 21), 42)
+            try:
+                await arbiter.call(broken)
+            except OSError as e:
+                error = e
+            self.assertEqual(str(error), "UART timeout")
+            return await arbiter.call(sorted, [3, 1, 2], reverse=True)
+
+        self.assertEqual(asyncio.run(scenario()), [3, 2, 1])
+
+    def test_transactions_never_interleave(self):
+        active = []
+        overlaps = []
+
+        async def transaction(name):
+            active.append(name)
+            overlaps.append(len(active))
+            await asyncio.sleep(0.005)
+            active.remove(name)
+
+        async def scenario():
+            arbiter = ModemArbiter()
+            await asyncio.gather(*(arbiter.call(transaction, i, priority=i % 3) for i in range(10)))
+            return arbiter.jobs_run
+
+        self.assertEqual(asyncio.run(scenario()), 10)
+        self.assertEqual(max(overlaps), 1)
+
+    def test_cancelled_waiter_does_not_stall_the_modem(self):
+        async def scenario():
+            arbiter = ModemArbiter()
+            holder = arbiter.exclusive()
+            await holder.__aenter__()
+
+            async def waiter():
+                async with arbiter.exclusive():
+                    pass
+
+            queued = asyncio.create_task(waiter())
+            await asyncio.sleep(0)
+            queued.cancel()
+            await holder.__aexit__(None, None, None)
+            return await asyncio.wait_for(arbiter.call(len, "ok"), 1)
+
+        self.assertEqual(asyncio.run(scenario()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import json
+import asyncio
+import unittest
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "server"))
+sys.modules.setdefault("uasyncio", asyncio)
+
+from utils.uart_lines import LinePump
+
+
+def reading(i):
+    return json.dumps({"client_id": "client-1", "seq": i}).encode() + b"\r\n"
+
+
+class TestLinePump(unittest.TestCase):
+    def test_reader_keeps_going_while_the_consumer_is_busy(self):
+        async def scenario():
+            reader = asyncio.StreamReader()
+            pump = LinePump(reader, maxsize=3)
+            task = asyncio.create_task(pump.run())
+            # The client sends five readings in pieces while nothing consumes them
+            data = b"".join(reading(i) for i in range(5))
+            for i in range(0, len(data), 7):
+                reader.feed_data(data[i:i + 7])
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.01)
+            lines = [await pump.get() for _ in range(pump.depth())]
+            task.cancel()
+            return pump, lines
+
+        pump, lines = asyncio.run(scenario())
+        self.assertEqual([json.loads(line)["seq"] for line in lines], [2, 3, 4])
+        self.assertEqual(pump.stats(), {"received": 5, "depth": 0, "dropped": 2, "too_long": 0})
+
+    def test_overlong_and_blank_lines_are_skipped(self):
+        async def scenario():
+            reader = asyncio.StreamReader()
+            pump = LinePump(reader, max_line=64)
+            task = asyncio.create_task(pump.run())
+            reader.feed_data(b"\r\n" + b"x" * 100 + b"\n" + reading(7))
+            line = await asyncio.wait_for(pump.get(), 1)
+            task.cancel()
+            return pump, line
+
+        pump, line = asyncio.run(scenario())
+        self.assertEqual(json.loads(line)["seq"], 7)
+        self.assertEqual((pump.received, pump.too_long), (1, 1))
+
+    def test_noise_without_newline_stays_in_the_line_buffer(self):
+        async def scenario():
+            reader = asyncio.StreamReader()
+            pump = LinePump(reader, max_line=64)
+            task = asyncio.create_task(pump.run())
+            for _ in range(100):
+                reader.feed_data(b"\xff" * 100)
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.01)
+            buffered = len(reader._buffer)
+            reader.feed_data(b"\n" + reading(3))
+            line = await asyncio.wait_for(pump.get(), 1)
+            task.cancel()
+            return pump, line, buffered
+
+        pump, line, buffered = asyncio.run(scenario())
+        self.assertEqual(buffered, 0)
+        self.assertEqual(len(pump.tokenizer._buf), 64)
+        self.assertEqual(json.loads(line)["seq"], 3)
+        self.assertEqual((pump.received, pump.too_long), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import json
+import random
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+import numpy as np
+import config
+from vector_data import generate_history_arrays, CellRandom, UNIFORM_FIELDS
+from weather_cache import FixtureSource
+
+
+class TestVectorizedHistory(unittest.TestCase):
+    def test_values_only_depend_on_device_and_timestamp(self):
+        day = generate_history_arrays(datetime(2025, 5, 1), datetime(2025, 5, 2),
+                                      timedelta(minutes=1), external_temp=25.0)
+        hour = generate_history_arrays(datetime(2025, 5, 1, 12), datetime(2025, 5, 1, 13),
+                                       timedelta(minutes=1), external_temp=25.0)
+        start = list(day["timestamp"]).index(hour["timestamp"][0])
+
+        for field in ("H2S", "ph_value", "ambient_temperature"):
+            np.testing.assert_array_equal(day[field][start:start + 61], hour[field])
+
+    def test_ranges_and_aerator_phase(self):
+        grid = generate_history_arrays(datetime(2025, 5, 11, 10), datetime(2025, 5, 12, 10),
+                                       external_temp=30.0)
+        for field, (low, high, _) in UNIFORM_FIELDS.items():
+            self.assertTrue(((grid[field] >= low) & (grid[field] <= high)).all(), field)
+
+        self.assertEqual(grid["H2S"].shape, (25, 4))
+        expected = np.where(grid["cycle_id"] % 2 == 0, "ON", "OFF")
+        np.testing.assert_array_equal(grid["aerator_status"], expected)
+
+
+class TestWeatherJitter(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # Six-hourly data, so most hours are interpolated (and jittered)
+        times = [f"2025-05-01T{h:02d}:00" for h in range(0, 24, 6)]
+        fixture = Path(tmp.name) / "open_meteo.json"
+        fixture.write_text(json.dumps({"hourly": {"time": times, "temperature_2m": [20.0, 24.0, 30.0, 26.0]}}))
+        config.configure_weather(FixtureSource(fixture))
+        self.addCleanup(setattr, config, "_weather", None)
+
+    def test_scalar_generator_matches_cell_random(self):
+        epoch_s = np.array([0, 1746057600, 1746061200], dtype=np.int64)
+        rand = CellRandom(epoch_s, ["ESP32_5DAEC4"])
+        for stream in range(3):
+            expected = rand.normal(stream)[:, 0]
+            actual = [config.cell_normal("ESP32_5DAEC4", int(s), stream) for s in epoch_s]
+            np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    def test_interpolated_temp_is_reproducible_across_threads(self):
+        hours = [datetime(2025, 5, 1, 12, tzinfo=timezone.utc) + timedelta(hours=h) for h in range(12)]
+        expected = [config.get_interpolated_temp(t) for t in hours]
+
+        def churn(_):
+            random.seed(0)  # other threads using the global random module change nothing
+            return [random.random() for _ in range(100)]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            churned = pool.map(churn, range(8))
+            actual = list(pool.map(config.get_interpolated_temp, hours))
+            list(churned)
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(config.generate_sensor_data(hours[0], "ESP32_5DAEC4"),
+                         config.generate_sensor_data(hours[0], "ESP32_5DAEC4"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import sys
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "timestream"))
+
+from weather_cache import WeatherCache, FixtureSource
+
+
+class TestWeatherCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmp.name)
+        times = [f"2025-05-{d:02d}T{h:02d}:00" for d in range(1, 31) for h in range(24)]
+        temps = [20 + (i % 24) for i in range(len(times))]
+        self.fixture = tmp / "open_meteo.json"
+        self.fixture.write_text(json.dumps({"hourly": {"time": times, "temperature_2m": temps}}))
+        self.db = tmp / "cache.sqlite"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_range_is_fetched_once_and_persisted(self):
+        source = FixtureSource(self.fixture)
+        cache = WeatherCache(25.78, -108.89, source=source, path=self.db)
+        self.assertEqual(cache.prefetch("2025-05-01", "2025-05-20"), 20)
+        hs, ts = cache.get_day("2025-05-10")
+        self.assertEqual(hs, list(range(24)))
+        self.assertEqual(ts[6], 26)
+        self.assertEqual(source.requests, 1)
+
+        reopened = WeatherCache(25.78, -108.89, source=FixtureSource(self.fixture), path=self.db)
+        self.assertEqual(reopened.prefetch("2025-05-01", "2025-05-20"), 0)
+        self.assertEqual(reopened.get_day("2025-05-10"), (hs, ts))
+        self.assertEqual(reopened.source.requests, 0)
+
+    def test_days_without_data_are_not_refetched(self):
+        source = FixtureSource(self.fixture)
+        cache = WeatherCache(25.78, -108.89, source=source, path=self.db)
+        self.assertEqual(cache.get_day("2024-01-01"), ([], []))
+        cache.get_day("2024-01-01")
+        self.assertEqual(source.requests, 1)
+
+        # An empty answer (outage, archive lag) is retried by the next run
+        reopened = WeatherCache(25.78, -108.89, source=FixtureSource(self.fixture), path=self.db)
+        self.assertEqual(reopened.prefetch("2024-01-01", "2024-01-01"), 1)
+        self.assertEqual(reopened.source.requests, 1)
+
+    def test_fixture_source_never_touches_the_default_cache(self):
+        cache = WeatherCache(25.78, -108.89, source=FixtureSource(self.fixture))
+        cache.prefetch("2025-05-01", "2025-05-02")
+        self.assertEqual(cache._db.execute("PRAGMA database_list").fetchone()[2], "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+"""Batched, concurrent writer used to backfill the aws time stream"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import DATABASE_NAME, TABLE_NAME
+from records import hoist_common_attributes
+
+MAX_RECORDS_PER_WRITE = 100  # hard limit of WriteRecords
+RETRYABLE_ERRORS = {"ThrottlingException", "InternalServerException"}
+
+
+def _error_code(error):
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code")
+
+
+def _rejected_records(error):
+    """Returns the RejectedRecords list of a RejectedRecordsException, None otherwise"""
+    response = getattr(error, "response", None) or {}
+    return response.get("RejectedRecords")
+
+
+class _Watermark:
+    """
+    Tracks which rows are fully written while batches complete out of order.
+    A row stays open while its records are being packed and while any batch
+    holding some of them is in flight. Rows that lost records block the
+    watermark, so they are retried on resume.
+    """
+
+    def __init__(self, on_commit):
+        self.on_commit = on_commit
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._open = {}  # row -> holds: the row itself until packed, plus one per batch
+        self._finished = set()
+        self._blocked = False
+        self._next = 0
+
+    def add(self, seq, token):
+        with self._lock:
+            self._tokens[seq] = token
+            self._open[seq] = 1
+
+    def pending(self, seq):
+        """A batch now holds records of row `seq`"""
+        with self._lock:
+            self._open[seq] += 1
+
+    def close(self, seq):
+        """Every record of row `seq` has been put in a batch"""
+        self._release([seq])
+
+    def done(self, seqs, failed=0):
+        self._release(seqs, failed)
+
+    def _release(self, seqs, failed=0):
+        with self._lock:
+            if failed:
+                self._blocked = True
+            for seq in seqs:
+                self._open[seq] -= 1
+                if self._open[seq] == 0:
+                    del self._open[seq]
+                    self._finished.add(seq)
+        self._advance()
+
+    def _advance(self):
+        with self._lock:
+            if self._blocked:
+                return
+            token = None
+            while self._next in self._finished:
+                self._finished.discard(self._next)
+                token = self._tokens.pop(self._next)
+                self._next += 1
+            if token is not None:
+                self.on_commit(token)
+
+
+class BackfillEngine:
+    """
+    Packs the records of many rows into WriteRecords calls of up to 100 records
+    and sends them through a thread pool. Only the records listed in
+    RejectedRecords are retried; the rest of the batch is counted as written.
+    """
+
+    def __init__(self, client, database=DATABASE_NAME, table=TABLE_NAME,
+                 max_workers=4, batch_size=MAX_RECORDS_PER_WRITE,
+                 max_retries=3, retry_delay=0.5, max_in_flight=None):
+        if not 0 < batch_size <= MAX_RECORDS_PER_WRITE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_RECORDS_PER_WRITE}")
+        self.client = client
+        self.database = database
+        self.table = table
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_in_flight = max_in_flight or max_workers * 2
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.stats = {
+            "rows": 0, "records": 0, "batches": 0, "written": 0,
+            "retried": 0, "duplicates": 0, "failed": 0, "elapsed": 0.0,
+        }
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def _write(self, records):
+        # RecordIndex in RejectedRecords still refers to `records`: hoisting keeps the order
+        common, records = hoist_common_attributes(records)
+        kwargs = {"CommonAttributes": common} if common else {}
+        self.client.write_records(
+            DatabaseName=self.database,
+            TableName=self.table,
+            Records=records,
+            **kwargs
+        )
+
+    def write_batch(self, records):
+        """
+        Writes one batch, retrying the rejected records with exponential backoff.
+        Returns the number of records that could not be written.
+        """
+        pending = records
+        attempt = 0
+
+        while pending:
+            try:
+                self._write(pending)
+                self._count(written=len(pending))
+                return 0
+            except Exception as e:
+                rejected = _rejected_records(e)
+                if rejected is None:
+                    if _error_code(e) not in RETRYABLE_ERRORS and hasattr(e, "response"):
+                        print(f"[ERROR] Batch of {len(pending)} records failed: {e}")
+                        self._count(failed=len(pending))
+                        return len(pending)
+                    retry = pending
+                else:
+                    retry = []
+                    for item in rejected:
+                        if "ExistingVersion" in item:
+                            # Same dimensions/time/measure already stored, retrying won't help
+                            self._count(duplicates=1)
+                        else:
+                            retry.append(pending[item["RecordIndex"]])
+                    self._count(written=len(pending) - len(rejected))
+                    if not retry:
+                        return 0
+
+            attempt += 1
+            if attempt > self.max_retries:
+                print(f"[ERROR] Giving up on {len(retry)} records after {self.max_retries} retries")
+                self._count(failed=len(retry))
+                return len(retry)
+
+            self._count(retried=len(retry))
+            pending = retry
+            time.sleep(self.retry_delay * 2 ** (attempt - 1))
+        return 0
+
+    def _batches(self, rows, watermark=None):
+        """Yields (batch, seqs) with the sequence numbers of the rows it holds records of"""
+        batch = []
+        seqs = []
+        for seq, records in enumerate(rows):
+            if watermark is not None:
+                token, records = records
+                watermark.add(seq, token)
+            self._count(rows=1, records=len(records))
+            for record in records:
+                if not seqs or seqs[-1] != seq:
+                    seqs.append(seq)
+                    if watermark is not None:
+                        watermark.pending(seq)
+                batch.append(record)
+                if len(batch) == self.batch_size:
+                    yield batch, seqs
+                    batch = []
+                    seqs = []
+            if watermark is not None:
+                watermark.close(seq)
+        if batch:
+            yield batch, seqs
+
+    def run(self, rows, on_commit=None):
+        """
+        Writes every record produced by `rows` (an iterable of per-row record lists).
+        At most `max_in_flight` batches are queued at once, so `rows` is consumed lazily.
+
+        With `on_commit`, `rows` yields (token, records) pairs instead and
+        on_commit(token) is called with the token of the last row such that it
+        and every row before it have been fully written.
+        An unexpected exception in a worker (or in on_commit) stops the run and
+        is raised here. Returns the stats dict, including rows/sec.
+        """
+        self._reset_stats()
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        watermark = _Watermark(on_commit) if on_commit else None
+        start = time.monotonic()
+
+        errors = []
+
+        def task(batch, seqs):
+            failed = len(batch)
+            try:
+                failed = self.write_batch(batch)
+            except BaseException as e:
+                self._count(failed=len(batch))
+                errors.append(e)
+            try:
+                if watermark:
+                    watermark.done(seqs, failed)
+            except BaseException as e:
+                errors.append(e)  # e.g. on_commit could not save the journal
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for batch, seqs in self._batches(rows, watermark):
+                slots.acquire()
+                if errors:
+                    break
+                self._count(batches=1)
+                pool.submit(task, batch, seqs)
+        if errors:
+            raise errors[0]
+
+        elapsed = time.monotonic() - start
+        self.stats["elapsed"] = elapsed
+        self.stats["rows_per_sec"] = self.stats["rows"] / elapsed if elapsed > 0 else 0.0
+        return self.stats
+
+    def report(self, label=""):
+        s = self.stats
+        prefix = f"{label}: " if label else ""
+        print(
+            f"[OK] {prefix}{s['rows']} rows / {s['records']} records in {s['batches']} batches, "
+            f"{s['elapsed']:.1f}s ({s.get('rows_per_sec', 0.0):.1f} rows/sec) | "
+            f"written={s['written']} retried={s['retried']} "
+            f"duplicates={s['duplicates']} failed={s['failed']}"
+        )
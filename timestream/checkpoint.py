@@ -0,0 +1,118 @@
+"""Crash-safe journal of how far each CSV file has been uploaded"""
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+JOURNAL_PATH = Path("upload_journal.json")
+
+
+class CheckpointJournal:
+    """
+    JSON file mapping each CSV path to the byte offset and timestamp of the
+    last row known to be written. Saves go through a temp file and an atomic
+    rename, so a crash leaves either the old or the new journal, never half of one.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, min_interval=1.0):
+        self.path = Path(path)
+        self.min_interval = min_interval  # throttles saves while a file is uploading
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._dirty = False
+        self.entries = {}
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text())
+            except ValueError as e:
+                print(f"[ERROR] Ignoring unreadable journal {self.path}: {e}")
+
+    @staticmethod
+    def _key(file_path):
+        return str(Path(file_path).resolve())
+
+    @staticmethod
+    def _mtime(file_path):
+        return os.stat(file_path).st_mtime
+
+    def resume_offset(self, file_path):
+        """
+        Byte offset to continue from, or None when the file is already done.
+        A file changed since it was journaled starts over from the top.
+        """
+        entry = self.entries.get(self._key(file_path))
+        if not entry:
+            return 0
+        if entry.get("mtime") != self._mtime(file_path):
+            print(f"[INFO] {Path(file_path).name} changed since the last run, starting over")
+            return 0
+        if entry.get("done"):
+            return None
+        return entry.get("offset", 0)
+
+    def start(self, file_path):
+        """Remembers the file's mtime; keeps the saved offset if it is still valid"""
+        key = self._key(file_path)
+        mtime = self._mtime(file_path)
+        with self._lock:
+            entry = self.entries.get(key)
+            if not entry or entry.get("mtime") != mtime:
+                self.entries[key] = {"offset": 0, "last_timestamp": None, "rows": 0,
+                                     "mtime": mtime, "done": False}
+                self._dirty = True
+        self.flush()
+
+    def rows_done(self, file_path):
+        entry = self.entries.get(self._key(file_path))
+        return entry["rows"] if entry else 0
+
+    def commit(self, file_path, offset, timestamp, rows):
+        """Records that the first `rows` rows, up to byte `offset`, are written (thread-safe)"""
+        with self._lock:
+            entry = self.entries[self._key(file_path)]
+            if offset <= entry["offset"]:
+                return
+            entry["offset"] = offset
+            entry["last_timestamp"] = timestamp
+            entry["rows"] = rows
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= self.min_interval
+        if due:
+            self.flush()
+
+    def finish(self, file_path):
+        with self._lock:
+            self.entries[self._key(file_path)]["done"] = True
+            self._dirty = True
+        self.flush()
+
+    def flush(self):
+        """Writes the journal if anything changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self.entries, indent=2, sort_keys=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            _fsync_dir(self.path.parent)
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+
+def _fsync_dir(directory):
+    """Makes the rename itself durable; not every platform can open a directory"""
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
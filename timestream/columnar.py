@@ -0,0 +1,204 @@
+"""Parquet export/import of the simulated data, with the same columns as the CSV files"""
+from datetime import datetime
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from records import FLOAT_FIELDS, build_records, SINGLE
+
+# Same columns as create_data.flatten_data; timestamps are naive wall clock like the CSVs
+SCHEMA = pa.schema(
+    [("device_id", pa.string()), ("timestamp", pa.timestamp("s"))]
+    + [(name, pa.float64()) for name in ("H2S", "NH3", "ph_value")]
+    + [("aerator_status", pa.string())]
+    + [(name, pa.float64()) for name in
+       ("rs485_temperature", "ambient_temperature", "level", "pressure", "altitude", "temperature")]
+)
+COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 64 * 1024
+DEVICE = "device"  # data_<device>.parquet
+DAY = "day"        # day=YYYY-MM-DD/data.parquet with every device (+ part-N.parquet for late rows)
+
+
+def _to_table(columns):
+    return pa.Table.from_pydict(columns, schema=SCHEMA)
+
+
+def _grid_table(grid, rows=slice(None), cols=slice(None)):
+    """Long (time-major) table from a vector_data grid slice"""
+    import numpy as np
+
+    device_ids = grid["device_id"][cols]
+    timestamps = grid["timestamp"][rows].astype("datetime64[s]")
+    n_times, n_devices = len(timestamps), len(device_ids)
+    columns = {
+        "device_id": np.tile(device_ids, n_times),
+        "timestamp": np.repeat(timestamps, n_devices),
+        "aerator_status": np.repeat(grid["aerator_status"][rows], n_devices),
+    }
+    for name in SCHEMA.names:
+        if name not in columns:
+            # (T, D) arrays are C-ordered, so ravel() is time-major without copying
+            columns[name] = np.ascontiguousarray(grid[name][rows, cols]).ravel()
+    return _to_table(columns)
+
+
+def write_grid_parquet(grid, output_dir, partition=DEVICE):
+    """Writes a vector_data grid as one file per device or one directory per day"""
+    import numpy as np
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    if partition == DEVICE:
+        for col, device_id in enumerate(grid["device_id"]):
+            path = output_dir / f"data_{device_id}.parquet"
+            table = _grid_table(grid, cols=slice(col, col + 1))
+            pq.write_table(table, path, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+            print(f"Wrote {path} with {table.num_rows} rows")
+            paths.append(path)
+    elif partition == DAY:
+        days = np.array([stamp[:10] for stamp in grid["timestamp"]])
+        for day in np.unique(days):
+            index = np.flatnonzero(days == day)
+            path = output_dir / f"day={day}" / "data.parquet"
+            path.parent.mkdir(exist_ok=True)
+            table = _grid_table(grid, rows=slice(index[0], index[-1] + 1))
+            pq.write_table(table, path, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+            print(f"Wrote {path} with {table.num_rows} rows")
+            paths.append(path)
+    else:
+        raise ValueError(f"Unknown partitioning: {partition}")
+    return paths
+
+
+class ParquetArchive:
+    """
+    Streaming counterpart of create_data.CsvArchive: buffers flat rows and
+    appends them as row groups, one file per device or per day. A row for a
+    day whose file was already closed goes into a new part file next to it.
+    """
+
+    def __init__(self, output_dir, partition=DEVICE, row_group_size=ROW_GROUP_SIZE):
+        if partition not in (DEVICE, DAY):
+            raise ValueError(f"Unknown partitioning: {partition}")
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.partition = partition
+        self.row_group_size = row_group_size
+        self._writers = {}
+        self._buffers = {}
+        self._paths = {}  # key -> file being written
+        self._parts = {}  # key -> files already closed (DAY)
+        self.counts = {}
+
+    def _path(self, key):
+        if self.partition == DEVICE:
+            return self.output_dir / f"data_{key}.parquet"
+        part = self._parts.get(key, 0)
+        name = f"part-{part}.parquet" if part else "data.parquet"
+        path = self.output_dir / f"day={key}" / name
+        path.parent.mkdir(exist_ok=True)
+        return path
+
+    def write(self, row):
+        key = row["device_id"] if self.partition == DEVICE else str(row["timestamp"])[:10]
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = {name: [] for name in SCHEMA.names}
+            self.counts.setdefault(key, 0)
+        for name in SCHEMA.names:
+            value = row[name]
+            if name == "timestamp" and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            buffer[name].append(value)
+        self.counts[key] += 1
+        if len(buffer["device_id"]) >= self.row_group_size:
+            self._flush(key)
+        elif self.partition == DAY and len(self._buffers) > 1:
+            # Rows arrive in time order, so an older day is complete once a new one starts
+            for old in [k for k in self._buffers if k < key]:
+                self._close(old)
+
+    def _flush(self, key):
+        buffer = self._buffers[key]
+        if not buffer["device_id"]:
+            return
+        writer = self._writers.get(key)
+        if writer is None:
+            self._paths[key] = self._path(key)
+            writer = self._writers[key] = pq.ParquetWriter(self._paths[key], SCHEMA, compression=COMPRESSION)
+        writer.write_table(_to_table(buffer))
+        for values in buffer.values():
+            values.clear()
+
+    def _close(self, key):
+        self._flush(key)
+        del self._buffers[key]
+        writer = self._writers.pop(key, None)
+        if writer is not None:
+            writer.close()
+            self._parts[key] = self._parts.get(key, 0) + 1
+            print(f"Wrote {self._paths.pop(key)} ({self.counts[key]} rows so far for {key})")
+
+    def close(self):
+        for key in list(self._buffers):
+            self._close(key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def csv_to_parquet(csv_path, parquet_path):
+    """Converts one data_<device>.csv without going through Python rows"""
+    table = pacsv.read_csv(csv_path, convert_options=pacsv.ConvertOptions(column_types=SCHEMA))
+    pq.write_table(table.select(SCHEMA.names).cast(SCHEMA), parquet_path,
+                   compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    return table.num_rows
+
+
+def parquet_files(path):
+    """A single file, or every .parquet below a directory (both partitionings)"""
+    path = Path(path)
+    return [path] if path.is_file() else sorted(path.rglob("*.parquet"))
+
+
+def iter_record_batches(path, batch_size=ROW_GROUP_SIZE, columns=None):
+    for file in parquet_files(path):
+        yield from pq.ParquetFile(file).iter_batches(batch_size=batch_size, columns=columns)
+
+
+def iter_rows(path):
+    """Yields flat dicts equal to create_data.flatten_data rows (timestamp as ISO string)"""
+    for batch in iter_record_batches(path):
+        columns = batch.to_pydict()
+        columns["timestamp"] = [ts.isoformat() for ts in columns["timestamp"]]
+        for values in zip(*(columns[name] for name in SCHEMA.names)):
+            yield dict(zip(SCHEMA.names, values))
+
+
+def batch_to_records(batch, mode=SINGLE):
+    """
+    Yields the record list of each row of a RecordBatch. Values are turned
+    into the strings the API expects column by column inside Arrow, instead
+    of once per value in Python.
+    """
+    devices = batch.column("device_id").to_pylist()
+    # Naive wall clock -> epoch with the local timezone, exactly like flat_row_to_records
+    times = [int(ts.timestamp() * 1000) for ts in batch.column("timestamp").to_pylist()]
+    status = batch.column("aerator_status").to_pylist()
+    columns = [(field, pc.cast(batch.column(field), pa.string()).to_pylist()) for field in FLOAT_FIELDS]
+
+    for i, device_id in enumerate(devices):
+        measures = [(field, values[i], "DOUBLE") for field, values in columns if values[i] is not None]
+        measures.append(("aerator_status", status[i], "VARCHAR"))
+        yield build_records([{"Name": "device_id", "Value": device_id}], times[i], measures, mode)
+
+
+def iter_parquet_records(path, mode=SINGLE):
+    for batch in iter_record_batches(path):
+        yield from batch_to_records(batch, mode)
@@ -1,75 +1,132 @@
-from math import sin, pi
-import time
-from datetime import datetime
+import os
+import sys
+import zlib
+from math import sin, pi, sqrt, log, cos
+from datetime import datetime, timezone
 import random
-import requests
 from bisect import bisect_right
 from zoneinfo import ZoneInfo
+from weather_cache import WeatherCache, FixtureSource
 
 DEVICE_IDS = [f"ESP32_{suffix}" for suffix in ["3002EC", "5DAEC4", "5D99C8", "2E57D0"]]
 DATABASE_NAME = "sampleDB"
 TABLE_NAME = "sampleTable"
+RECORD_MODE = "single"  # "multi" -> one MULTI record per device per timestamp
 
 _LAT, _LON = 25.78758584457698, -108.89569650966546
+WEATHER_TZ = "America/Mexico_City"
 DEVICE_OFFSETS = {device_id: offset for device_id, offset in zip(DEVICE_IDS, [0.0, 0.4, -0.3, 0.6])}
 
-_temp_day_cache = {}
+CYCLE_START_UTC = datetime(2025, 5, 11, 16, 15, tzinfo=timezone.utc)
+CYCLE_MINUTES = 180
+
+TIMESTREAM_ENDPOINT = os.getenv("TIMESTREAM_ENDPOINT")  # e.g. http://localhost:8765 (local_timestream.py)
+
+_weather = None
+
+def get_write_client(max_connections=None):
+    """
+    timestream-write client; with TIMESTREAM_ENDPOINT set it talks to the local
+    stand-in instead, with dummy credentials so no AWS account is needed.
+    With ROLLUP_DB set, every accepted record also updates the rollups there.
+    """
+    import boto3
+    from botocore.config import Config
+
+    config = Config(max_pool_connections=max_connections) if max_connections else None
+    if not TIMESTREAM_ENDPOINT:
+        client = boto3.client("timestream-write", config=config)
+    else:
+        print(f"[INFO] Using local time stream at {TIMESTREAM_ENDPOINT}")
+        client = boto3.client(
+            "timestream-write", endpoint_url=TIMESTREAM_ENDPOINT, config=config,
+            region_name=os.getenv("AWS_REGION", "us-east-1"),
+            aws_access_key_id="local", aws_secret_access_key="local"
+        )
+
+    if os.getenv("ROLLUP_DB"):
+        from rollups import RollupStore, RollupWriter
+        print(f"[INFO] Updating rollups in {os.getenv('ROLLUP_DB')}")
+        client = RollupWriter(client, RollupStore(os.getenv("ROLLUP_DB")))
+    return client
 
 # --- Ruido leve ---
-def __noise(scale=1.0): return random.gauss(0, scale)
+def __noise(scale=1.0, rng=random): return rng.gauss(0, scale)
+
+# --- Ruido por contador (mismo generador que vector_data.CellRandom) ---
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_WEATHER_KEY = "open-meteo"
+
+def _mix64(x):
+    """splitmix64 finalizer, the scalar twin of vector_data._mix"""
+    x ^= x >> 30
+    x = (x * 0xBF58476D1CE4E5B9) & _MASK64
+    x ^= x >> 27
+    x = (x * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+def cell_uniform(name, epoch_s, stream):
+    """Uniform [0, 1) value that depends only on (name, epoch second, stream)"""
+    key = _mix64((epoch_s * _GOLDEN + _mix64(zlib.crc32(name.encode()))) & _MASK64)
+    bits = _mix64((key + (stream + 1) * _GOLDEN) & _MASK64)
+    return (bits >> 11) * (1.0 / (1 << 53))
+
+def cell_normal(name, epoch_s, stream):
+    u1 = max(cell_uniform(name, epoch_s, 2 * stream), sys.float_info.min)
+    u2 = cell_uniform(name, epoch_s, 2 * stream + 1)
+    return sqrt(-2.0 * log(u1)) * cos(2.0 * pi * u2)
+
+def __jitter(t, scale):
+    # Keyed on the timestamp, not on shared state, so it is safe (and
+    # reproducible) from the live_stream and backfill thread pools
+    return scale * cell_normal(_WEATHER_KEY, int(t.timestamp()), 0)
+
+def configure_weather(source=None, path=None):
+    """
+    Selects the weather source and cache file. Without a path, fixture sources
+    (WEATHER_FIXTURE) use an in-memory cache instead of the real one.
+    """
+    global _weather
+    if source is None and os.getenv("WEATHER_FIXTURE"):
+        source = FixtureSource(os.getenv("WEATHER_FIXTURE"))
+    kwargs = {"path": path} if path else {}
+    _weather = WeatherCache(_LAT, _LON, source=source, **kwargs)
+    return _weather
+
+def _get_weather():
+    if _weather is None:
+        configure_weather()
+    return _weather
+
+def prefetch_temps(start, end):
+    """Caches every local day between two datetimes with a single range request"""
+    tz = ZoneInfo(WEATHER_TZ)
+    first = start.astimezone(tz).strftime("%Y-%m-%d")
+    last = end.astimezone(tz).strftime("%Y-%m-%d")
+    try:
+        _get_weather().prefetch(first, last)
+    except Exception as e:
+        print(f"[ERROR] Failed to prefetch temps {first}..{last}: {e}")
 
 # --- Temperatura interpolada ---
 def get_interpolated_temp(t):
-    local_t = t.astimezone(ZoneInfo("America/Mexico_City"))
+    local_t = t.astimezone(ZoneInfo(WEATHER_TZ))
     fecha = local_t.strftime("%Y-%m-%d")
     hora_actual = local_t.hour
-    key = f"{fecha}"
-
-    if key not in _temp_day_cache:
-        try:
-            print(f"[INFO] Requesting temperature for {fecha}...")
-            time.sleep(1)
-            url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                "latitude": _LAT,
-                "longitude": _LON,
-                "hourly": "temperature_2m",
-                "start_date": fecha,
-                "end_date": fecha,
-                "timezone": "America/Mexico_City"
-            }
-            r = requests.get(url, params=params)
-            r.raise_for_status()
-            data = r.json()
-
-            horas = data["hourly"]["time"]
-            temps = data["hourly"]["temperature_2m"]
-            horas_interes = list(range(0, 24))  # incluir todas las horas
-
-            indices_objetivo = [f"{fecha}T{str(h).zfill(2)}:00" for h in horas_interes]
-            hs = []
-            ts = []
-
-            for h in indices_objetivo:
-                if h in horas:
-                    idx = horas.index(h)
-                    hs.append(int(h[11:13]))
-                    ts.append(temps[idx])
-
-            _temp_day_cache[key] = (hs, ts)
-            print(f"[OK] Cached {len(ts)} temps for {fecha}: {ts}")
-        except Exception as e:
-            print(f"[ERROR] Failed to get temp for {fecha}: {e}")
-            _temp_day_cache[key] = ([], [])
-            return 22 + __noise(0.3)
-
-    hs, ts = _temp_day_cache[key]
+
+    try:
+        hs, ts = _get_weather().get_day(fecha)
+    except Exception as e:
+        print(f"[ERROR] Failed to get temp for {fecha}: {e}")
+        return 22 + __jitter(t, 0.3)
+
     if not hs:
-        return 22 + __noise(0.3)
+        return 22 + __jitter(t, 0.3)
 
     if hora_actual < hs[0] or hora_actual > hs[-1]:
         print(f"[WARN] Hora {hora_actual} fuera del rango {hs[0]}–{hs[-1]}")
-        return ts[0] + __noise(0.3)
+        return ts[0] + __jitter(t, 0.3)
 
     if hora_actual in hs:
         return ts[hs.index(hora_actual)]
@@ -79,13 +136,19 @@ def get_interpolated_temp(t):
     t1, t2 = ts[idx - 1], ts[idx]
     factor = (hora_actual - h1) / (h2 - h1)
     interpolated = t1 + (t2 - t1) * factor
-    return round(interpolated + __noise(0.3), 2)
+    return round(interpolated + __jitter(t, 0.3), 2)
+
+def get_cycle_id(timestamp):
+    if timestamp.tzinfo is None:
+        raise ValueError("timestamp must be timezone-aware")
+    delta_min = int((timestamp.astimezone(timezone.utc) - CYCLE_START_UTC).total_seconds() // 60)
+    return delta_min // CYCLE_MINUTES
 
 def is_aerator_on(timestamp):
     return (timestamp.hour % 6) < 3
 
 def generate_sensor_data(t, device_id, external_temp=None, cycle_id=None):
-    random.seed(f"{device_id}-{t}")
+    rng = random.Random(f"{device_id}-{t}")  # per row, never the shared module state
     
     if cycle_id is not None:
         aerator_on = (cycle_id % 2 == 0)
@@ -98,24 +161,24 @@ def generate_sensor_data(t, device_id, external_temp=None, cycle_id=None):
         external_temp = get_interpolated_temp(t)
 
     base_temp = external_temp + device_offset
-    ambient_temp = round(base_temp + __noise(0.3), 2)
-    rs485_temp = round(base_temp + 1.2 + __noise(0.3), 2)
-    pressure_temp = round(base_temp + 0.5 + __noise(0.2), 2)
+    ambient_temp = round(base_temp + __noise(0.3, rng), 2)
+    rs485_temp = round(base_temp + 1.2 + __noise(0.3, rng), 2)
+    pressure_temp = round(base_temp + 0.5 + __noise(0.2, rng), 2)
 
     return {
-        "H2S": round(random.uniform(298, 367), 2),
-        "NH3": round(random.uniform(0.026, 0.027), 5),
+        "H2S": round(rng.uniform(298, 367), 2),
+        "NH3": round(rng.uniform(0.026, 0.027), 5),
         "Sensor pH": {
-            "ph_value": round(random.uniform(423, 454), 2)
+            "ph_value": round(rng.uniform(423, 454), 2)
         },
         "RS485 Sensor": {
             "rs485_temperature": rs485_temp,
             "ambient_temperature": ambient_temp,
-            "level": round(random.uniform(-0.027, -0.025), 5)
+            "level": round(rng.uniform(-0.027, -0.025), 5)
         },
         "Pressure": {
-            "pressure": round(random.uniform(762, 767), 4),
-            "altitude": round(random.uniform(2302, 2333), 3),
+            "pressure": round(rng.uniform(762, 767), 4),
+            "altitude": round(rng.uniform(2302, 2333), 3),
             "temperature": pressure_temp
         },
         "aerator_status": "ON" if aerator_on else "OFF"
@@ -1,12 +1,16 @@
 """Create the csv formatted data to send into the aws time stream"""
 import csv
+import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
-from config import DEVICE_IDS, generate_sensor_data
+from config import DEVICE_IDS, generate_sensor_data, prefetch_temps
 
 OUTPUT_DIR = Path("simulated_data")
-OUTPUT_DIR.mkdir(exist_ok=True)
-print(f"Output directory: {OUTPUT_DIR.resolve()}")
+CSV_FIELDS = [
+    "device_id", "timestamp", "H2S", "NH3", "ph_value", "aerator_status",
+    "rs485_temperature", "ambient_temperature", "level",
+    "pressure", "altitude", "temperature"
+]
 
 def flatten_data(device_id, timestamp, data):
     flat = {
@@ -34,35 +38,108 @@ def flatten_data(device_id, timestamp, data):
 
     return flat
 
-def write_device_csv(device_id, rows):
-    filepath = OUTPUT_DIR / f"data_{device_id}.csv"
-    with open(filepath, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-        writer.writeheader()
-        writer.writerows(rows)
-    print(f"Wrote {filepath} with {len(rows)} rows")
+class CsvArchive:
+    """Appends flat rows to one data_<device>.csv per device as they arrive"""
 
-def generate_history_csv(start_time, end_time):
-    print(f"Generating data from {start_time} to {end_time}")
-    current_time = start_time
-    device_data = {dev: [] for dev in DEVICE_IDS}
+    def __init__(self, output_dir=OUTPUT_DIR):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._files = {}
+        self._writers = {}
+        self.counts = {}
+
+    def write(self, row):
+        device_id = row["device_id"]
+        writer = self._writers.get(device_id)
+        if writer is None:
+            f = open(self.output_dir / f"data_{device_id}.csv", "w", newline="")
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            self._files[device_id] = f
+            self._writers[device_id] = writer
+            self.counts[device_id] = 0
+        writer.writerow(row)
+        self.counts[device_id] += 1
+
+    def close(self):
+        for device_id, f in self._files.items():
+            f.close()
+            print(f"Wrote {f.name} with {self.counts[device_id]} rows")
+        self._files.clear()
+        self._writers.clear()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_history(start_time, end_time, step=timedelta(hours=1), device_ids=DEVICE_IDS):
+    """Yields flat rows step by step, without keeping any history in memory"""
+    prefetch_temps(start_time, end_time)
+    current_time = start_time
     steps = 0
     while current_time <= end_time:
-        for device_id in DEVICE_IDS:
+        for device_id in device_ids:
             data = generate_sensor_data(current_time, device_id)
-            flat = flatten_data(device_id, current_time, data)
-            device_data[device_id].append(flat)
-        current_time += timedelta(hours=1)
+            yield flatten_data(device_id, current_time, data)
+        current_time += step
         steps += 1
         if steps % 24 == 0:
-            print(f"...processed {steps} hourly steps")
+            print(f"...processed {steps} steps")
 
-    for dev_id, rows in device_data.items():
-        write_device_csv(dev_id, rows)
+def generate_history_csv(start_time, end_time):
+    print(f"Generating data from {start_time} to {end_time}")
+    with CsvArchive(OUTPUT_DIR) as archive:
+        for row in iter_history(start_time, end_time):
+            archive.write(row)
+
+def generate_history_parquet(start_time, end_time, partition="device"):
+    # pyarrow is only needed for the columnar output
+    from columnar import ParquetArchive
+
+    print(f"Generating Parquet data from {start_time} to {end_time}")
+    with ParquetArchive(OUTPUT_DIR, partition) as archive:
+        for row in iter_history(start_time, end_time):
+            archive.write(row)
+
+def generate_history_csv_vectorized(start_time, end_time, step=timedelta(hours=1)):
+    # numpy is only needed for this path
+    from vector_data import generate_history_arrays, write_device_csvs
+
+    print(f"Generating vectorized data from {start_time} to {end_time} every {step}")
+    grid = generate_history_arrays(start_time, end_time, step)
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    return write_device_csvs(grid, OUTPUT_DIR)
+
+def generate_history_parquet_vectorized(start_time, end_time, step=timedelta(hours=1), partition="device"):
+    from vector_data import generate_history_arrays
+    from columnar import write_grid_parquet
+
+    print(f"Generating vectorized Parquet data from {start_time} to {end_time} every {step}")
+    grid = generate_history_arrays(start_time, end_time, step)
+    return write_grid_parquet(grid, OUTPUT_DIR, partition)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectorized", action="store_true", help="Build the whole grid with NumPy")
+    parser.add_argument("--step-minutes", type=int, default=60, help="Sampling step (vectorized only)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--partition", choices=["device", "day"], default="device",
+                        help="Parquet layout: one file per device or one directory per day")
+    args = parser.parse_args()
+
+    print(f"Output directory: {OUTPUT_DIR.resolve()}")
     start = datetime(2025, 4, 11, 18, 18)
     end = datetime.now()
-    generate_history_csv(start, end)
+    step = timedelta(minutes=args.step_minutes)
+    if args.format == "parquet":
+        if args.vectorized:
+            generate_history_parquet_vectorized(start, end, step, args.partition)
+        else:
+            generate_history_parquet(start, end, args.partition)
+    elif args.vectorized:
+        generate_history_csv_vectorized(start, end, step)
+    else:
+        generate_history_csv(start, end)
 
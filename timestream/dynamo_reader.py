@@ -0,0 +1,188 @@
+"""Reads the IoT sensor registers stored in DynamoDB without full-table scans"""
+import os
+import queue
+import threading
+from decimal import Decimal
+import boto3
+from boto3.dynamodb.conditions import Key
+
+TABLE_NAME = os.getenv("IOT_DYNAMO_TABLE", "SensorDataTable")
+REGION = os.getenv("AWS_REGION", "us-east-1")
+DYNAMO_ENDPOINT = os.getenv("IOT_DYNAMO_ENDPOINT")  # e.g. http://localhost:8000 (dynamodb-local)
+# GSI with device_id as partition key and insertion_time (N, ms) as sort key.
+# Set IOT_DYNAMO_INDEX="" when the table itself is keyed that way.
+DEVICE_TIME_INDEX = os.getenv("IOT_DYNAMO_INDEX", "device_id-insertion_time-index")
+
+_DONE = object()
+
+
+def convert_decimals(obj):
+    if isinstance(obj, dict):
+        return {k: convert_decimals(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_decimals(i) for i in obj]
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    return obj
+
+
+def get_table(name=TABLE_NAME, endpoint_url=DYNAMO_ENDPOINT):
+    kwargs = {"region_name": REGION}
+    if endpoint_url:
+        # dynamodb-local accepts any credentials
+        kwargs.update(endpoint_url=endpoint_url, aws_access_key_id="local", aws_secret_access_key="local")
+    return boto3.resource("dynamodb", **kwargs).Table(name)
+
+
+def create_sensor_table(dynamodb, name=TABLE_NAME, index_name=DEVICE_TIME_INDEX):
+    """Table shaped like the IoT rule's (one item per message) plus the device/time GSI, for local tests"""
+    table = dynamodb.create_table(
+        TableName=name,
+        KeySchema=[{"AttributeName": "message_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "message_id", "AttributeType": "S"},
+            {"AttributeName": "device_id", "AttributeType": "S"},
+            {"AttributeName": "insertion_time", "AttributeType": "N"},
+        ],
+        GlobalSecondaryIndexes=[_device_time_index(index_name)],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    return table
+
+
+def add_device_time_index(table, index_name=DEVICE_TIME_INDEX):
+    """
+    Adds the GSI to an existing table. Only items with top-level device_id and
+    insertion_time attributes are indexed, so the IoT rule must write them there
+    (not only inside `payload`).
+    """
+    return table.meta.client.update_table(
+        TableName=table.name,
+        AttributeDefinitions=[
+            {"AttributeName": "device_id", "AttributeType": "S"},
+            {"AttributeName": "insertion_time", "AttributeType": "N"},
+        ],
+        GlobalSecondaryIndexUpdates=[{"Create": _device_time_index(index_name)}],
+    )
+
+
+def _device_time_index(index_name):
+    return {
+        "IndexName": index_name,
+        "KeySchema": [
+            {"AttributeName": "device_id", "KeyType": "HASH"},
+            {"AttributeName": "insertion_time", "KeyType": "RANGE"},
+        ],
+        "Projection": {"ProjectionType": "ALL"},
+    }
+
+
+class DynamoReader:
+    """
+    Query-based access to the registers of one device, newest or oldest first,
+    page by page; plus parallel segment scans for bulk exports. Everything goes
+    through the table's low-level client, which (unlike resources) is thread-safe.
+    """
+
+    def __init__(self, table, index_name=DEVICE_TIME_INDEX):
+        self.client = table.meta.client
+        self.table_name = table.name
+        self.index_name = index_name or None
+
+    def _query_kwargs(self, device_id, start_ms, end_ms, newest_first):
+        condition = Key("device_id").eq(device_id)
+        if start_ms is not None and end_ms is not None:
+            condition &= Key("insertion_time").between(Decimal(start_ms), Decimal(end_ms))
+        elif start_ms is not None:
+            condition &= Key("insertion_time").gte(Decimal(start_ms))
+        elif end_ms is not None:
+            condition &= Key("insertion_time").lte(Decimal(end_ms))
+
+        kwargs = {"TableName": self.table_name, "KeyConditionExpression": condition,
+                  "ScanIndexForward": not newest_first}
+        if self.index_name:
+            kwargs["IndexName"] = self.index_name
+        return kwargs
+
+    def iter_device(self, device_id, start_ms=None, end_ms=None, newest_first=False, page_size=None,
+                    limit=None):
+        """Yields the device's items in insertion_time order, following LastEvaluatedKey"""
+        kwargs = self._query_kwargs(device_id, start_ms, end_ms, newest_first)
+        remaining = limit
+        while True:
+            if remaining is not None:
+                kwargs["Limit"] = min(remaining, page_size or remaining)
+            elif page_size:
+                kwargs["Limit"] = page_size
+            response = self.client.query(**kwargs)
+            for item in response.get("Items", []):
+                yield item
+            if remaining is not None:
+                remaining -= len(response.get("Items", []))
+                if remaining <= 0:
+                    return
+            if "LastEvaluatedKey" not in response:
+                return
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def latest(self, device_id, limit=5):
+        """The `limit` newest items: reads about `limit` items instead of the whole table"""
+        return [convert_decimals(item) for item in
+                self.iter_device(device_id, newest_first=True, limit=limit)]
+
+    def _scan_segment(self, segment, total_segments, page_size, out, stop):
+        kwargs = {"TableName": self.table_name, "Segment": segment, "TotalSegments": total_segments}
+        if page_size:
+            kwargs["Limit"] = page_size
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            while not stop.is_set():
+                response = self.client.scan(**kwargs)
+                for item in response.get("Items", []):
+                    if not put(item):
+                        return
+                if "LastEvaluatedKey" not in response:
+                    break
+                kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    def scan_all(self, segments=4, page_size=None, buffer=1000):
+        """
+        Yields every item using `segments` parallel scan workers. The bounded
+        buffer keeps memory flat: workers wait while the consumer catches up.
+        Items from different segments are interleaved in no particular order.
+        """
+        out = queue.Queue(maxsize=buffer)
+        stop = threading.Event()
+        workers = [threading.Thread(target=self._scan_segment, args=(s, segments, page_size, out, stop),
+                                    daemon=True)
+                   for s in range(segments)]
+        for worker in workers:
+            worker.start()
+
+        running = segments
+        try:
+            while running:
+                item = out.get()
+                if item is _DONE:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # Also reached when the consumer stops early: lets blocked workers exit
+            stop.set()
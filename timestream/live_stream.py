@@ -1,31 +1,33 @@
+import os
 import time
-import boto3
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
-from config import DEVICE_IDS, DATABASE_NAME, TABLE_NAME, generate_sensor_data
+from config import (DEVICE_IDS, DATABASE_NAME, TABLE_NAME, RECORD_MODE, generate_sensor_data,
+                    get_cycle_id, get_interpolated_temp, get_write_client)
+from records import FLOAT_FIELDS, build_records, hoist_common_attributes
 
 local_tz = ZoneInfo("America/Mazatlan")
-CYCLE_START_UTC = datetime(2025, 5, 11, 16, 15, tzinfo=timezone.utc)
 
-client = boto3.client("timestream-write")
-SEND_INTERVAL = 60 * 60  # 60 min de latencia
+SEND_INTERVAL = int(os.getenv("STREAM_INTERVAL", 60 * 60))  # 60 min de latencia
 SEND = True # ← cambiar a True cuando quieras enviar
+STREAM_DEVICES = int(os.getenv("STREAM_DEVICES", len(DEVICE_IDS)))  # >4 agrega dispositivos simulados
+MAX_CONCURRENT_WRITES = int(os.getenv("STREAM_CONCURRENCY", 32))
+VERBOSE_DEVICES = 10  # con más dispositivos solo se imprime el resumen del tick
 
-FLOAT_FIELDS = [
-    "H2S", "NH3", "ph_value",
-    "rs485_temperature", "ambient_temperature", "level",
-    "pressure", "altitude", "temperature"
-]
+def simulated_device_ids(count=STREAM_DEVICES):
+    """The real DEVICE_IDS first, then SIM_0004, SIM_0005... up to `count`"""
+    return DEVICE_IDS[:count] + [f"SIM_{i:04d}" for i in range(len(DEVICE_IDS), count)]
 
-def get_cycle_id(timestamp):
-    if timestamp.tzinfo is None:
-        raise ValueError("timestamp must be timezone-aware")
-    delta_min = int((timestamp.astimezone(timezone.utc) - CYCLE_START_UTC).total_seconds() // 60)
-    return delta_min // 180
+def next_tick(now_s, interval):
+    """Next wall-clock multiple of `interval` seconds, so ticks never drift"""
+    return (int(now_s // interval) + 1) * interval
 
-def convert_row(device_id, data, cycle_id, now_ms):
+def convert_row(device_id, data, cycle_id, now_ms, mode=RECORD_MODE):
     dimensions = [{"Name": "device_id", "Value": device_id}]
-    records = []
+    measures = []
 
     for field in FLOAT_FIELDS:
         if field in data:
@@ -42,72 +44,171 @@ def convert_row(device_id, data, cycle_id, now_ms):
             val = None
 
         if val is not None:
-            records.append({
-                "Dimensions": dimensions,
-                "MeasureName": field,
-                "MeasureValue": str(val),
-                "MeasureValueType": "DOUBLE",
-                "Time": str(now_ms)
-            })
-
-    records.append({
-        "Dimensions": dimensions,
-        "MeasureName": "aerator_status",
-        "MeasureValue": data["aerator_status"],
-        "MeasureValueType": "VARCHAR",
-        "Time": str(now_ms)
-    })
-
-    records.append({
-        "Dimensions": dimensions,
-        "MeasureName": "cycle_id",
-        "MeasureValue": str(cycle_id),
-        "MeasureValueType": "BIGINT",
-        "Time": str(now_ms)
-    })
-
-    return records
-
-
-def live_stream():
-    while True:
-        now = datetime.now(timezone.utc).astimezone(local_tz)
-        now_ms = int(now.astimezone(timezone.utc).timestamp() * 1000)
-        cycle_id = get_cycle_id(now)
-        cycle_phase = "ON" if (cycle_id % 2 == 0) else "OFF"
+            measures.append((field, str(val), "DOUBLE"))
 
-        print("="*60)
-        print(f"[DEBUG] Hora local Mazatlán: {now.isoformat()}")
-        print(f"[DEBUG] Hora UTC: {now.astimezone(timezone.utc).isoformat()}")
-        print(f"[DEBUG] now_ms (UTC): {now_ms}")
-        print(f"[DEBUG] Ciclo actual: {cycle_id}")
-        print(f"[DEBUG] Fase: {cycle_phase}")
-        print("="*60)
+    measures.append(("aerator_status", data["aerator_status"], "VARCHAR"))
+    measures.append(("cycle_id", str(cycle_id), "BIGINT"))
 
-        for device_id in DEVICE_IDS:
-            try:
-                data = generate_sensor_data(now, device_id, cycle_id=cycle_id)
-                records = convert_row(device_id, data, cycle_id, now_ms)
-
-                if SEND:
-                    client.write_records(
-                        DatabaseName=DATABASE_NAME,
-                        TableName=TABLE_NAME,
-                        Records=records
-                    )
-                    print(f"[OK] Sent data for {device_id}")
-                else:
-                    print(f"[SKIPPED] Data not sent for {device_id}")
+    return build_records(dimensions, now_ms, measures, mode)
+
+
+class DeviceMetrics:
+    """Write latency per simulated device, accumulated over the whole run"""
 
+    def __init__(self):
+        self.sent = 0
+        self.errors = 0
+        self.last_ms = None
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+
+    def record(self, latency_ms, ok=True):
+        if ok:
+            self.sent += 1
+        else:
+            self.errors += 1
+        self.last_ms = latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+        self.total_ms += latency_ms
+
+    @property
+    def avg_ms(self):
+        count = self.sent + self.errors
+        return self.total_ms / count if count else 0.0
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LiveStream:
+    """
+    Fires one write per device every `interval` seconds, all devices at once.
+    Data is generated on the event loop; only the weather lookup and the
+    blocking write_records calls go to a thread pool bounded by `concurrency`.
+    """
+
+    def __init__(self, client, device_ids, interval=SEND_INTERVAL, concurrency=MAX_CONCURRENT_WRITES,
+                 send=SEND, mode=RECORD_MODE):
+        self.client = client
+        self.device_ids = device_ids
+        self.interval = interval
+        self.send = send
+        self.mode = mode
+        self.metrics = {device_id: DeviceMetrics() for device_id in device_ids}
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="live-write")
+        self._slots = asyncio.Semaphore(concurrency)
+        self._ticks = set()
+
+    def _write(self, records):
+        common, records = hoist_common_attributes(records)
+        self.client.write_records(
+            DatabaseName=DATABASE_NAME,
+            TableName=TABLE_NAME,
+            Records=records,
+            CommonAttributes=common
+        )
+
+    async def send_device(self, device_id, now, now_ms, cycle_id, external_temp):
+        data = generate_sensor_data(now, device_id, external_temp=external_temp, cycle_id=cycle_id)
+        records = convert_row(device_id, data, cycle_id, now_ms, self.mode)
+        if not self.send:
+            return None
+
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._pool, self._write, records)
+                ok = True
             except Exception as e:
                 print(f"[ERROR] {device_id}: {repr(e)}")
+                ok = False
+            latency_ms = (time.perf_counter() - start) * 1000
+        self.metrics[device_id].record(latency_ms, ok)
+        if ok and len(self.device_ids) <= VERBOSE_DEVICES:
+            print(f"[OK] Sent data for {device_id} ({latency_ms:.0f} ms)")
+        return latency_ms if ok else None
+
+    async def tick(self, tick_s):
+        now = datetime.fromtimestamp(tick_s, timezone.utc).astimezone(local_tz)
+        now_ms = int(tick_s * 1000)
+        cycle_id = get_cycle_id(now)
+        lag_ms = (time.time() - tick_s) * 1000
 
-        print(f"[WAIT] Sleeping {SEND_INTERVAL} sec...\n")
-        time.sleep(SEND_INTERVAL)
+        print("="*60)
+        print(f"[DEBUG] Hora local Mazatlán: {now.isoformat()} | Ciclo {cycle_id} "
+              f"({'ON' if cycle_id % 2 == 0 else 'OFF'}) | retraso {lag_ms:.0f} ms")
+
+        # One weather lookup per tick instead of one per device
+        external_temp = await asyncio.get_running_loop().run_in_executor(
+            self._pool, get_interpolated_temp, now)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            self.send_device(device_id, now, now_ms, cycle_id, external_temp)
+            for device_id in self.device_ids
+        ))
+        self.report(results, (time.perf_counter() - started) * 1000)
+        return results
+
+    def report(self, results, elapsed_ms):
+        if not self.send:
+            print(f"[SKIPPED] Data not sent for {len(results)} devices")
+            return
+        latencies = [r for r in results if r is not None]
+        failed = len(results) - len(latencies)
+        if not latencies:
+            print(f"[ERROR] Tick failed for all {failed} devices")
+            return
+        print(f"[OK] Tick: {len(latencies)} devices in {elapsed_ms:.0f} ms | latency "
+              f"p50={_percentile(latencies, 0.5):.0f} p95={_percentile(latencies, 0.95):.0f} "
+              f"max={max(latencies):.0f} ms | failed={failed}")
+        slowest = max(self.metrics.items(), key=lambda item: item[1].avg_ms)
+        print(f"[INFO] Slowest device so far: {slowest[0]} avg={slowest[1].avg_ms:.0f} ms "
+              f"max={slowest[1].max_ms:.0f} ms errors={slowest[1].errors}")
+
+    async def run(self, ticks=None):
+        """Runs `ticks` ticks (forever when None), each aligned to a multiple of the interval"""
+        count = 0
+        target = next_tick(time.time(), self.interval)
+        try:
+            while ticks is None or count < ticks:
+                await asyncio.sleep(max(0.0, target - time.time()))
+                # A slow tick never delays the next one, it runs alongside it
+                task = asyncio.ensure_future(self.tick(target))
+                self._ticks.add(task)
+                task.add_done_callback(self._ticks.discard)
+                count += 1
+
+                target += self.interval
+                if target <= time.time():
+                    skipped = int((time.time() - target) // self.interval) + 1
+                    print(f"[WARN] Skipping {skipped} missed ticks")
+                    target += skipped * self.interval
+                print(f"[WAIT] Next tick at {datetime.fromtimestamp(target, local_tz).isoformat()}\n")
+            if self._ticks:
+                await asyncio.gather(*self._ticks)
+        finally:
+            self._pool.shutdown(wait=False)
+
+
+def live_stream(devices=STREAM_DEVICES, interval=SEND_INTERVAL, concurrency=MAX_CONCURRENT_WRITES):
+    # One pooled connection per concurrent write, otherwise urllib3 serializes them
+    client = get_write_client(concurrency) if SEND else None
+    stream = LiveStream(client, simulated_device_ids(devices), interval, concurrency)
+    print(f"[INFO] Streaming {len(stream.device_ids)} devices every {interval} s "
+          f"(max {concurrency} concurrent writes)")
+    asyncio.run(stream.run())
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live simulated stream into the aws time stream")
+    parser.add_argument("--devices", type=int, default=STREAM_DEVICES)
+    parser.add_argument("--interval", type=int, default=SEND_INTERVAL, help="Seconds between ticks")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_WRITES)
+    args = parser.parse_args()
     try:
-        live_stream()
+        live_stream(args.devices, args.interval, args.concurrency)
     except KeyboardInterrupt:
         print("\n[INFO] Exiting...")
     except Exception as e:
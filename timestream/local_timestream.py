@@ -0,0 +1,316 @@
+"""
+Local stand-in for the aws time stream write API, for tests and offline benchmarks.
+
+Run `python local_timestream.py` and point the uploaders at it with
+TIMESTREAM_ENDPOINT=http://localhost:8765 (see config.get_write_client).
+"""
+import json
+import math
+import time
+import sqlite3
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from botocore.exceptions import ClientError
+from records import TIME_UNITS, time_ms_of
+
+MAX_RECORDS_PER_WRITE = 100
+MAX_DIMENSIONS = 128
+MAX_VARCHAR_BYTES = 2048
+FUTURE_TOLERANCE_MS = 15 * 60 * 1000  # the service rejects records more than 15 min ahead
+DB_PATH = "local_timestream.sqlite"
+TARGET_PREFIX = "Timestream_20181101."
+ERROR_NAMESPACE = "com.amazonaws.timestream.v20181101#"
+
+
+class RecordError(ValueError):
+    """A single record failed validation; becomes a RejectedRecords entry"""
+
+    def __init__(self, reason, existing_version=None):
+        super().__init__(reason)
+        self.existing_version = existing_version
+
+
+def _client_error(code, message, operation="WriteRecords", **extra):
+    return ClientError(dict({"Error": {"Code": code, "Message": message}}, **extra), operation)
+
+
+def _check_value(value, value_type):
+    if not isinstance(value, str):
+        raise RecordError(f"Measure value must be a string, got {type(value).__name__}")
+    try:
+        if value_type == "DOUBLE":
+            if not math.isfinite(float(value)):
+                raise ValueError
+        elif value_type in ("BIGINT", "TIMESTAMP"):
+            int(value)
+        elif value_type == "BOOLEAN":
+            if value.lower() not in ("true", "false"):
+                raise ValueError
+        elif value_type == "VARCHAR":
+            if len(value.encode()) > MAX_VARCHAR_BYTES:
+                raise RecordError(f"VARCHAR value exceeds {MAX_VARCHAR_BYTES} bytes")
+        else:
+            raise RecordError(f"Invalid MeasureValueType: {value_type}")
+    except ValueError:
+        raise RecordError(f"Measure value {value!r} is not a valid {value_type}") from None
+
+
+def normalize_record(record, now_ms, retention_ms=None):
+    """
+    Validates one record (CommonAttributes already merged) and returns
+    (dimensions_key, time_ms, measure_name, value_json, value_type, version).
+    """
+    dimensions = record.get("Dimensions") or []
+    if not dimensions:
+        raise RecordError("At least one dimension is required")
+    if len(dimensions) > MAX_DIMENSIONS:
+        raise RecordError(f"At most {MAX_DIMENSIONS} dimensions are allowed")
+    dims = {}
+    for dimension in dimensions:
+        name, value = dimension.get("Name"), dimension.get("Value")
+        if not name or value is None or value == "":
+            raise RecordError("Dimensions need a Name and a non-empty Value")
+        if name in dims:
+            raise RecordError(f"Duplicate dimension name: {name}")
+        dims[name] = value
+
+    measure_name = record.get("MeasureName")
+    if not measure_name:
+        raise RecordError("MeasureName is required")
+    if measure_name in dims:
+        raise RecordError(f"MeasureName {measure_name} clashes with a dimension name")
+
+    value_type = record.get("MeasureValueType", "DOUBLE")
+    if value_type == "MULTI":
+        if "MeasureValue" in record:
+            raise RecordError("MULTI records use MeasureValues, not MeasureValue")
+        values = record.get("MeasureValues") or []
+        if not values:
+            raise RecordError("MeasureValues must not be empty for MULTI records")
+        names = set()
+        for measure in values:
+            if measure.get("Name") in names or not measure.get("Name"):
+                raise RecordError("MeasureValues need unique, non-empty names")
+            names.add(measure["Name"])
+            _check_value(measure.get("Value"), measure.get("Type"))
+        value = sorted((m["Name"], m["Value"], m["Type"]) for m in values)
+    else:
+        if "MeasureValues" in record:
+            raise RecordError("MeasureValues are only allowed for MULTI records")
+        value = record.get("MeasureValue")
+        _check_value(value, value_type)
+
+    unit = record.get("TimeUnit", "MILLISECONDS")
+    if unit not in TIME_UNITS:
+        raise RecordError(f"Invalid TimeUnit: {unit}")
+    try:
+        time_ms = time_ms_of(record)
+    except (KeyError, ValueError, TypeError):
+        raise RecordError("Time must be an integer string") from None
+    if time_ms > now_ms + FUTURE_TOLERANCE_MS or (retention_ms and time_ms < now_ms - retention_ms):
+        raise RecordError("The record timestamp is outside the time range of the data ingestion window.")
+
+    dims_key = json.dumps(sorted(dims.items()), separators=(",", ":"))
+    return dims_key, time_ms, measure_name, json.dumps(value), value_type, record.get("Version")
+
+
+class LocalTimestream:
+    """
+    SQLite-backed store implementing write_records with the service's
+    validation rules, so it can be passed to BackfillEngine / LiveStream
+    directly in place of a boto3 client.
+
+    A record that repeats dimensions + time + measure name is accepted when
+    its value is identical (writes are idempotent) or when it carries a higher
+    Version; otherwise it is rejected with the ExistingVersion.
+    `retention_hours` mimics the memory store window (None accepts any past time).
+    """
+
+    def __init__(self, path=":memory:", retention_hours=None):
+        self.retention_ms = retention_hours * 3600 * 1000 if retention_hours else None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                db TEXT, tbl TEXT, dims TEXT, time_ms INTEGER, measure TEXT,
+                value TEXT, value_type TEXT, version INTEGER,
+                PRIMARY KEY (db, tbl, dims, time_ms, measure));
+            CREATE INDEX IF NOT EXISTS records_time ON records (db, tbl, time_ms);
+        """)
+        self.requests = 0
+
+    def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None):
+        if not 1 <= len(Records) <= MAX_RECORDS_PER_WRITE:
+            raise _client_error("ValidationException",
+                                f"Records must contain between 1 and {MAX_RECORDS_PER_WRITE} items")
+        common = CommonAttributes or {}
+        now_ms = int(time.time() * 1000)
+        rejected = []
+        written = 0
+
+        with self._lock, self._db:
+            self.requests += 1
+            for index, record in enumerate(Records):
+                try:
+                    row = normalize_record(dict(common, **record), now_ms, self.retention_ms)
+                    self._upsert(DatabaseName, TableName, *row)
+                    written += 1
+                except RecordError as e:
+                    entry = {"RecordIndex": index, "Reason": str(e)}
+                    if e.existing_version is not None:
+                        entry["ExistingVersion"] = e.existing_version
+                    rejected.append(entry)
+
+        if rejected:
+            raise _client_error("RejectedRecordsException",
+                                "One or more records have been rejected. See RejectedRecords for details.",
+                                RejectedRecords=rejected)
+        return {"RecordsIngested": {"Total": written, "MemoryStore": written, "MagneticStore": 0}}
+
+    def _upsert(self, database, table, dims, time_ms, measure, value, value_type, version):
+        key = (database, table, dims, time_ms, measure)
+        existing = self._db.execute(
+            "SELECT value, value_type, version FROM records "
+            "WHERE db=? AND tbl=? AND dims=? AND time_ms=? AND measure=?", key).fetchone()
+        if existing:
+            old_value, old_type, old_version = existing
+            if (old_value, old_type) == (value, value_type) and version in (None, old_version):
+                return
+            if version is None or version <= (old_version or 0):
+                raise RecordError("A record with the same dimensions, time and measure name "
+                                  "already exists with a different value.", existing_version=old_version or 1)
+        self._db.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         key + (value, value_type, version))
+
+    def query(self, database, table, start_ms=None, end_ms=None, dimensions=None, measure_name=None,
+              limit=None):
+        """Stored records in [start_ms, end_ms] ordered by time, optionally filtered"""
+        sql = "SELECT dims, time_ms, measure, value, value_type FROM records WHERE db=? AND tbl=?"
+        args = [database, table]
+        if start_ms is not None:
+            sql += " AND time_ms >= ?"
+            args.append(int(start_ms))
+        if end_ms is not None:
+            sql += " AND time_ms <= ?"
+            args.append(int(end_ms))
+        if measure_name:
+            sql += " AND measure = ?"
+            args.append(measure_name)
+        sql += " ORDER BY time_ms, dims, measure"
+
+        wanted = (dimensions or {}).items()
+        rows = []
+        with self._lock:
+            cursor = self._db.execute(sql, args)
+            for dims, time_ms, measure, value, value_type in cursor:
+                dims = dict(json.loads(dims))
+                if any(dims.get(k) != v for k, v in wanted):
+                    continue
+                row = {"dimensions": dims, "time": time_ms, "measure_name": measure, "type": value_type}
+                value = json.loads(value)
+                if value_type == "MULTI":
+                    row["values"] = {name: v for name, v, _ in value}
+                else:
+                    row["value"] = value
+                rows.append(row)
+                if limit and len(rows) >= limit:
+                    break
+        return rows
+
+    def count(self, database=None, table=None):
+        sql, args = "SELECT COUNT(*) FROM records", []
+        if database:
+            sql += " WHERE db=? AND tbl=?"
+            args = [database, table]
+        with self._lock:
+            return self._db.execute(sql, args).fetchone()[0]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """awsJson1_0 WriteRecords / DescribeEndpoints plus GET /records for queries"""
+
+    store = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/x-amz-json-1.0"):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, code, message, **extra):
+        self._send(status, dict({"__type": ERROR_NAMESPACE + code, "message": message}, **extra))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+        target = self.headers.get("X-Amz-Target", "")
+        try:
+            params = json.loads(body or b"{}")
+        except ValueError:
+            return self._error(400, "ValidationException", "Malformed JSON body")
+
+        if target == TARGET_PREFIX + "DescribeEndpoints":
+            host = self.headers.get("Host", f"localhost:{self.server.server_port}")
+            return self._send(200, {"Endpoints": [{"Address": host, "CachePeriodInMinutes": 1440}]})
+        if target != TARGET_PREFIX + "WriteRecords":
+            return self._error(400, "UnknownOperationException", f"Unsupported operation: {target}")
+
+        try:
+            result = self.store.write_records(params.get("DatabaseName"), params.get("TableName"),
+                                              params.get("Records", []), params.get("CommonAttributes"))
+        except ClientError as e:
+            error = e.response["Error"]
+            return self._error(400, error["Code"], error["Message"],
+                               **({"RejectedRecords": e.response["RejectedRecords"]}
+                                  if "RejectedRecords" in e.response else {}))
+        self._send(200, result)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/records":
+            return self._send(404, {"message": "Not found"}, "application/json")
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            rows = self.store.query(
+                query.get("database"), query.get("table"),
+                start_ms=query.get("start"), end_ms=query.get("end"),
+                dimensions={"device_id": query["device_id"]} if "device_id" in query else None,
+                measure_name=query.get("measure"), limit=int(query.get("limit", 10000)))
+        except ValueError as e:
+            return self._send(400, {"message": str(e)}, "application/json")
+        self._send(200, {"records": rows}, "application/json")
+
+
+def make_server(store, host="127.0.0.1", port=8765):
+    handler = type("Handler", (_Handler,), {"store": store})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve_in_background(store, host="127.0.0.1", port=0):
+    """Starts the HTTP server on a daemon thread; returns (server, endpoint_url)"""
+    server = make_server(store, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local aws time stream write API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=DB_PATH, help="SQLite file (':memory:' for a throwaway store)")
+    parser.add_argument("--retention-hours", type=int, help="Reject records older than this window")
+    args = parser.parse_args()
+
+    server = make_server(LocalTimestream(args.db, args.retention_hours), args.host, args.port)
+    print(f"[INFO] Local time stream listening on http://{args.host}:{args.port} (db: {args.db})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Exiting...")
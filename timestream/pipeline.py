@@ -0,0 +1,65 @@
+"""Generate -> flatten -> convert -> batch -> write in a single streaming pass"""
+import argparse
+from datetime import datetime, timedelta
+from config import DATABASE_NAME, TABLE_NAME, RECORD_MODE, get_write_client
+from backfill import BackfillEngine
+from create_data import CsvArchive, iter_history
+from records import flat_row_to_records
+
+
+def tee_csv(rows, archive):
+    """Passes rows through while appending them to a CsvArchive"""
+    for row in rows:
+        archive.write(row)
+        yield row
+
+
+def convert_rows(rows, mode=RECORD_MODE):
+    for row in rows:
+        yield flat_row_to_records(row, mode)
+
+
+def run_pipeline(client, start_time, end_time, step=timedelta(hours=1), archive_dir=None,
+                 vectorized=False, mode=RECORD_MODE, max_workers=4, max_in_flight=None):
+    """
+    Simulates and uploads [start_time, end_time] in one pass. Rows are produced
+    lazily and the engine never holds more than `max_in_flight` batches, so
+    memory stays bounded whatever the length of the range. When the writers
+    fall behind, generation simply waits for a free slot. Raises if any record
+    could not be written.
+    """
+    if vectorized:
+        from vector_data import iter_history_rows
+        rows = iter_history_rows(start_time, end_time, step)
+    else:
+        rows = iter_history(start_time, end_time, step)
+
+    engine = BackfillEngine(client, DATABASE_NAME, TABLE_NAME,
+                            max_workers=max_workers, max_in_flight=max_in_flight)
+    if archive_dir is None:
+        engine.run(convert_rows(rows, mode))
+    else:
+        with CsvArchive(archive_dir) as archive:
+            engine.run(convert_rows(tee_csv(rows, archive), mode))
+    engine.report("pipeline")
+    if engine.stats["failed"]:
+        raise RuntimeError(f"{engine.stats['failed']} records could not be written")
+    return engine.stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=datetime(2025, 4, 11, 18, 18))
+    parser.add_argument("--end", type=datetime.fromisoformat, default=datetime.now())
+    parser.add_argument("--step-minutes", type=int, default=60)
+    parser.add_argument("--archive", help="Also write the rows as CSV into this directory")
+    parser.add_argument("--vectorized", action="store_true", help="Generate with NumPy, one day per chunk")
+    parser.add_argument("--mode", choices=["single", "multi"], default=RECORD_MODE)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    run_pipeline(
+        get_write_client(args.workers), args.start, args.end,
+        step=timedelta(minutes=args.step_minutes), archive_dir=args.archive,
+        vectorized=args.vectorized, mode=args.mode, max_workers=args.workers
+    )
@@ -0,0 +1,86 @@
+"""Helpers shared by the uploaders to build aws time stream records"""
+from datetime import datetime
+
+FLOAT_FIELDS = [
+    "H2S", "NH3", "ph_value",
+    "rs485_temperature", "ambient_temperature", "level",
+    "pressure", "altitude", "temperature"
+]
+
+SINGLE = "single"  # one record per measure (what the Grafana dashboards query today)
+MULTI = "multi"    # one MULTI record per device per timestamp
+MULTI_MEASURE_NAME = "sensor_data"
+
+# Attributes that may be sent once per WriteRecords call through CommonAttributes
+COMMON_KEYS = ("Dimensions", "Time", "TimeUnit", "MeasureName", "MeasureValueType")
+
+# (multiply, divide) to get ms from each TimeUnit, kept in integers so ns stay exact
+TIME_UNITS = {"SECONDS": (1000, 1), "MILLISECONDS": (1, 1),
+              "MICROSECONDS": (1, 1000), "NANOSECONDS": (1, 1000000)}
+
+
+def time_ms_of(record):
+    """Record time in ms (floored), for any TimeUnit; raises ValueError for an unknown unit"""
+    unit = record.get("TimeUnit", "MILLISECONDS")
+    if unit not in TIME_UNITS:
+        raise ValueError(f"Invalid TimeUnit: {unit}")
+    multiply, divide = TIME_UNITS[unit]
+    return int(record["Time"]) * multiply // divide
+
+
+def build_records(dimensions, time_ms, measures, mode=SINGLE):
+    """
+    Builds the records for one device at one timestamp.
+    `measures` is a list of (name, value, type) tuples with values already as strings.
+    """
+    if mode == MULTI:
+        return [{
+            "Dimensions": dimensions,
+            "MeasureName": MULTI_MEASURE_NAME,
+            "MeasureValueType": "MULTI",
+            "MeasureValues": [
+                {"Name": name, "Value": value, "Type": value_type}
+                for name, value, value_type in measures
+            ],
+            "Time": str(time_ms)
+        }]
+    if mode != SINGLE:
+        raise ValueError(f"Unknown record mode: {mode}")
+
+    return [{
+        "Dimensions": dimensions,
+        "MeasureName": name,
+        "MeasureValue": value,
+        "MeasureValueType": value_type,
+        "Time": str(time_ms)
+    } for name, value, value_type in measures]
+
+
+def hoist_common_attributes(records):
+    """
+    Moves the attributes shared by every record into a CommonAttributes dict.
+    Returns (common_attributes, records); the input records are not modified.
+    """
+    if not records:
+        return {}, records
+
+    first = records[0]
+    common = {}
+    for key in COMMON_KEYS:
+        if key in first and all(r.get(key) == first[key] for r in records[1:]):
+            common[key] = first[key]
+
+    if not common:
+        return {}, records
+
+    stripped = [{k: v for k, v in r.items() if k not in common} for r in records]
+    return common, stripped
+
+
+def flat_row_to_records(row, mode=SINGLE):
+    """Records for one row shaped like create_data.flatten_data (read from CSV or in memory)"""
+    dimensions = [{"Name": "device_id", "Value": row["device_id"]}]
+    time_ms = int(datetime.fromisoformat(row["timestamp"]).timestamp() * 1000)
+    measures = [(field, str(row[field]), "DOUBLE") for field in FLOAT_FIELDS if row[field] not in ("", None)]
+    measures.append(("aerator_status", row["aerator_status"], "VARCHAR"))
+    return build_records(dimensions, time_ms, measures, mode)
@@ -0,0 +1,274 @@
+"""
+Pre-aggregated 5 min / hourly / per-cycle rollups of the written measures.
+
+RollupWriter wraps a write client and folds every accepted record into the
+rollups as it is written; `python rollups.py` serves them as JSON for Grafana
+(e.g. with the Infinity datasource).
+"""
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from config import get_cycle_id, CYCLE_START_UTC, CYCLE_MINUTES
+from records import time_ms_of
+
+ROLLUP_DB = os.getenv("ROLLUP_DB", "rollups.sqlite")
+NUMERIC_TYPES = ("DOUBLE", "BIGINT")
+FIVE_MINUTES = "5m"
+HOURLY = "1h"
+CYCLE = "cycle"
+BUCKET_MS = {FIVE_MINUTES: 5 * 60 * 1000, HOURLY: 60 * 60 * 1000}
+LEVELS = (FIVE_MINUTES, HOURLY, CYCLE)
+
+
+def cycle_of(time_ms):
+    return get_cycle_id(datetime.fromtimestamp(time_ms / 1000, timezone.utc))
+
+
+def cycle_start_ms(cycle_id):
+    return int(CYCLE_START_UTC.timestamp() * 1000) + cycle_id * CYCLE_MINUTES * 60 * 1000
+
+
+def numeric_measures(record):
+    """(device_id, time_ms, [(measure, float)]) for one record with CommonAttributes merged"""
+    dims = {d["Name"]: d["Value"] for d in record.get("Dimensions", [])}
+    time_ms = time_ms_of(record)
+    value_type = record.get("MeasureValueType")
+    if value_type == "MULTI":
+        values = [(m["Name"], float(m["Value"])) for m in record["MeasureValues"] if m["Type"] in NUMERIC_TYPES]
+    elif value_type in NUMERIC_TYPES:
+        values = [(record["MeasureName"], float(record["MeasureValue"]))]
+    else:
+        values = []
+    return dims.get("device_id"), time_ms, values
+
+
+class RollupStore:
+    """
+    min / max / sum / count per (level, bucket, device, measure) in SQLite.
+    Buckets are the start time in ms for 5m and 1h, and the cycle_id for cycles.
+    Every point is also kept by (device, measure, time), so ingesting the same
+    point again (a re-upload) changes nothing and a new value for it (an
+    upsert) replaces the old one in the buckets it falls in.
+    """
+
+    def __init__(self, path=ROLLUP_DB):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS rollups (
+                level TEXT, bucket INTEGER, device_id TEXT, measure TEXT,
+                min REAL, max REAL, sum REAL, count INTEGER,
+                PRIMARY KEY (level, device_id, measure, bucket));
+            CREATE TABLE IF NOT EXISTS points (
+                device_id TEXT, measure TEXT, time INTEGER, value REAL,
+                PRIMARY KEY (device_id, measure, time));
+        """)
+
+    def ingest(self, records, common=None):
+        """Folds a list of records (as sent to write_records) into every level"""
+        points = {}
+        for record in records:
+            device_id, time_ms, values = numeric_measures(dict(common or {}, **record))
+            if device_id is None:
+                continue
+            for measure, value in values:
+                points[(device_id, measure, time_ms)] = value
+        if not points:
+            return 0
+
+        with self._lock, self._db:
+            added, changed = self._store_points(points)
+            totals = {}
+            cycles = {}
+            for (device_id, measure, time_ms), value in added:
+                for level, bucket in self._buckets(time_ms, cycles):
+                    key = (level, bucket, device_id, measure)
+                    agg = totals.get(key)
+                    if agg is None:
+                        totals[key] = [value, value, value, 1]
+                    else:
+                        agg[0] = min(agg[0], value)
+                        agg[1] = max(agg[1], value)
+                        agg[2] += value
+                        agg[3] += 1
+            self._db.executemany("""
+                INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (level, device_id, measure, bucket) DO UPDATE SET
+                    min = min(min, excluded.min), max = max(max, excluded.max),
+                    sum = sum + excluded.sum, count = count + excluded.count
+            """, [key + tuple(agg) for key, agg in totals.items()])
+
+            # An upserted value can't be subtracted out of min/max: rebuild those buckets
+            stale = {(level, bucket, device_id, measure)
+                     for device_id, measure, time_ms in changed
+                     for level, bucket in self._buckets(time_ms, cycles)}
+            for key in stale:
+                self._rebuild(*key)
+        return len(totals) + len(stale)
+
+    def _store_points(self, points):
+        """Saves the points; returns the new ones as (key, value) and the keys whose value changed"""
+        added, changed = [], []
+        for key, value in points.items():
+            row = self._db.execute(
+                "SELECT value FROM points WHERE device_id=? AND measure=? AND time=?", key).fetchone()
+            if row is None:
+                added.append((key, value))
+            elif row[0] != value:
+                changed.append(key)
+            else:
+                continue
+            self._db.execute("INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?)", key + (value,))
+        return added, changed
+
+    @staticmethod
+    def _buckets(time_ms, cycles):
+        if time_ms not in cycles:
+            cycles[time_ms] = cycle_of(time_ms)
+        buckets = [(level, time_ms - time_ms % size) for level, size in BUCKET_MS.items()]
+        buckets.append((CYCLE, cycles[time_ms]))
+        return buckets
+
+    def _rebuild(self, level, bucket, device_id, measure):
+        if level == CYCLE:
+            start = cycle_start_ms(bucket)
+            end = cycle_start_ms(bucket + 1)
+        else:
+            start, end = bucket, bucket + BUCKET_MS[level]
+        self._db.execute("""
+            INSERT OR REPLACE INTO rollups
+            SELECT ?, ?, device_id, measure, min(value), max(value), sum(value), count(*)
+            FROM points WHERE device_id=? AND measure=? AND time >= ? AND time < ?
+            GROUP BY device_id, measure
+        """, (level, bucket, device_id, measure, start, end))
+
+    def query(self, level, start_ms=None, end_ms=None, device_id=None, measure=None):
+        """Rows ordered by time with min/max/mean/count; `time` is the bucket start in ms"""
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level: {level} (expected one of {', '.join(LEVELS)})")
+        sql = "SELECT bucket, device_id, measure, min, max, sum, count FROM rollups WHERE level=?"
+        args = [level]
+        if start_ms is not None:
+            sql += " AND bucket >= ?"
+            args.append(cycle_of(int(start_ms)) if level == CYCLE else int(start_ms) - int(start_ms) % BUCKET_MS[level])
+        if end_ms is not None:
+            sql += " AND bucket <= ?"
+            args.append(cycle_of(int(end_ms)) if level == CYCLE else int(end_ms))
+        if device_id:
+            sql += " AND device_id = ?"
+            args.append(device_id)
+        if measure:
+            sql += " AND measure = ?"
+            args.append(measure)
+        sql += " ORDER BY bucket, device_id, measure"
+
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        result = []
+        for bucket, device, name, low, high, total, count in rows:
+            row = {"time": cycle_start_ms(bucket) if level == CYCLE else bucket,
+                   "device_id": device, "measure": name,
+                   "min": low, "max": high, "mean": total / count, "count": count}
+            if level == CYCLE:
+                row["cycle_id"] = bucket
+            result.append(row)
+        return result
+
+    def distinct(self, column):
+        if column not in ("device_id", "measure"):
+            raise ValueError(f"Unknown column: {column}")
+        with self._lock:
+            return [v for (v,) in self._db.execute(f"SELECT DISTINCT {column} FROM rollups ORDER BY 1")]
+
+
+class RollupWriter:
+    """
+    Drop-in write client: forwards write_records and ingests the records the
+    service accepted (rejected ones are retried by the caller and ingested then).
+    """
+
+    def __init__(self, client, store):
+        self.client = client
+        self.store = store
+
+    def write_records(self, DatabaseName, TableName, Records, CommonAttributes=None, **kwargs):
+        if CommonAttributes:
+            kwargs["CommonAttributes"] = CommonAttributes
+        try:
+            result = self.client.write_records(DatabaseName=DatabaseName, TableName=TableName,
+                                               Records=Records, **kwargs)
+        except Exception as e:
+            rejected = (getattr(e, "response", None) or {}).get("RejectedRecords")
+            if rejected is not None:
+                skip = {item["RecordIndex"] for item in rejected}
+                self.store.ingest([r for i, r in enumerate(Records) if i not in skip], CommonAttributes)
+            raise
+        self.store.ingest(Records, CommonAttributes)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    GET /rollups?level=1h&device_id=...&measure=ph_value&from=<ms>&to=<ms>
+    GET /devices, GET /measures, GET / (health check for the datasource)
+    """
+
+    store = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/":
+                return self._send(200, {"status": "ok", "levels": list(LEVELS)})
+            if url.path == "/devices":
+                return self._send(200, self.store.distinct("device_id"))
+            if url.path == "/measures":
+                return self._send(200, self.store.distinct("measure"))
+            if url.path == "/rollups":
+                return self._send(200, self.store.query(
+                    query.get("level", HOURLY), query.get("from"), query.get("to"),
+                    query.get("device_id"), query.get("measure")))
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        self._send(404, {"error": "Not found"})
+
+
+def make_server(store, host="0.0.0.0", port=8766):
+    handler = type("Handler", (_Handler,), {"store": store})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the rollups as JSON for Grafana")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--db", default=ROLLUP_DB)
+    args = parser.parse_args()
+
+    server = make_server(RollupStore(args.db), args.host, args.port)
+    print(f"[INFO] Rollup API listening on http://{args.host}:{args.port} (db: {args.db})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Exiting...")
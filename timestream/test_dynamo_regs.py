@@ -1,8 +1,6 @@
 # test_dynamo_scan.py
-import boto3
-from decimal import Decimal
-import os
 from datetime import datetime, timezone
+from dynamo_reader import DynamoReader, get_table, convert_decimals
 
 def format_timestamp(ms):
     try:
@@ -10,33 +8,19 @@ def format_timestamp(ms):
     except Exception as e:
         return f"[ERROR] {e}"
 
-def _convert_decimals(obj):
-    if isinstance(obj, dict):
-        return {k: _convert_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [_convert_decimals(i) for i in obj]
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    return obj
+# Kept for the callers of the old helper
+_convert_decimals = convert_decimals
 
-TABLE_NAME = os.getenv("IOT_DYNAMO_TABLE", "SensorDataTable")
-REGION = os.getenv("AWS_REGION", "us-east-1")
-
-dynamodb = boto3.resource("dynamodb", region_name=REGION)
-table = dynamodb.Table(TABLE_NAME)
+table = get_table()
+reader = DynamoReader(table)
 
 def scan_and_sort_by_insertion(device_id, limit=5):
-    response = table.scan(
-        FilterExpression=boto3.dynamodb.conditions.Attr("device_id").eq(device_id)
-    )
-    items = response.get("Items", [])
-    items.sort(key=lambda x: float(x.get("payload", x).get("insertion_time", 0)), reverse=True)
-    return [_convert_decimals(i) for i in items[:limit]]
+    """Latest `limit` registers of a device, newest first (a Query on the device/time index)"""
+    return reader.latest(device_id, limit)
 
 # Prueba
 if __name__ == "__main__":
     items = scan_and_sort_by_insertion("ESP32_5DAEC4", limit=3)
     for i, item in enumerate(items):
         data = item.get("payload", item)
-        print(f"[{i}] insertion_time: {format_timestamp(data.get('insertion_time'))}, data: {data}")
-
+        print(f"[{i}] insertion_time: {format_timestamp(data.get('insertion_time', item.get('insertion_time')))}, data: {data}")
@@ -1,63 +1,111 @@
 """Upload the data into the sampleDB sampleTable aws time stream"""
 import csv
-import boto3
+import argparse
 from pathlib import Path
-from datetime import datetime
-from config import DATABASE_NAME, TABLE_NAME
+from config import DATABASE_NAME, TABLE_NAME, RECORD_MODE, get_write_client
+from backfill import BackfillEngine
+from checkpoint import CheckpointJournal, JOURNAL_PATH
+from records import flat_row_to_records
 
-client = boto3.client("timestream-write")
 CSV_DIR = Path("simulated_data")
+MAX_WORKERS = 4
 
-FLOAT_FIELDS = [
-    "H2S", "NH3", "ph_value",
-    "rs485_temperature", "ambient_temperature", "level",
-    "pressure", "altitude", "temperature"
-]
-
-def convert_row(row):
-    dimensions = [{"Name": "device_id", "Value": row["device_id"]}]
-    time_ms = int(datetime.fromisoformat(row["timestamp"]).timestamp() * 1000)
-    records = []
-
-    for field in FLOAT_FIELDS:
-        val = row[field]
-        if val:
-            records.append({
-                "Dimensions": dimensions,
-                "MeasureName": field,
-                "MeasureValue": val,
-                "MeasureValueType": "DOUBLE",
-                "Time": str(time_ms)
-            })
-
-    records.append({
-        "Dimensions": dimensions,
-        "MeasureName": "aerator_status",
-        "MeasureValue": row["aerator_status"],
-        "MeasureValueType": "VARCHAR",
-        "Time": str(time_ms)
-    })
-
-    return records
-
-def load_csv_file(file_path):
-    print(f"Loading {file_path.name}...")
+def convert_row(row, mode=RECORD_MODE):
+    return flat_row_to_records(row, mode)
+
+def read_csv_records(file_path):
     with open(file_path, newline="") as f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                records = convert_row(row)
-                client.write_records(
-                    DatabaseName=DATABASE_NAME,
-                    TableName=TABLE_NAME,
-                    Records=records
-                )
+                yield convert_row(row)
+            except Exception as e:
+                print(f"Failed to convert row {row.get('timestamp')} for {row.get('device_id')}: {e}")
+
+def read_csv_checkpoints(file_path, offset=0, rows_done=0):
+    """
+    Yields ((end_offset, timestamp, rows), records) for every row, starting at
+    byte `offset`. The file is read in binary so offsets can be used with seek().
+    """
+    with open(file_path, "rb") as f:
+        header = next(csv.reader([f.readline().decode()]))
+        if offset:
+            f.seek(offset)
+        rows = rows_done
+        for line in iter(f.readline, b""):
+            rows += 1
+            token = (f.tell(), None, rows)
+            values = next(csv.reader([line.decode()]), None)
+            if not values:
+                yield token, []
+                continue
+            row = dict(zip(header, values))
+            try:
+                yield (token[0], row.get("timestamp"), rows), convert_row(row)
             except Exception as e:
-                print(f"Failed to write row {row['timestamp']} for {row['device_id']}: {e}")
+                print(f"Failed to convert row {row.get('timestamp')} for {row.get('device_id')}: {e}")
+                yield token, []
+
+def load_csv_file(file_path, engine, journal=None):
+    if journal is None:
+        print(f"Loading {file_path.name}...")
+        engine.run(read_csv_records(file_path))
+        engine.report(file_path.name)
+        return
+
+    offset = journal.resume_offset(file_path)
+    if offset is None:
+        print(f"[INFO] Skipping {file_path.name}, already uploaded")
+        return
+    journal.start(file_path)
+    rows_done = journal.rows_done(file_path) if offset else 0
+    if offset:
+        print(f"[INFO] Resuming {file_path.name} at byte {offset} (row {rows_done})")
+    else:
+        print(f"Loading {file_path.name}...")
+
+    def on_commit(token):
+        end_offset, timestamp, rows = token
+        journal.commit(file_path, end_offset, timestamp, rows)
+
+    try:
+        stats = engine.run(read_csv_checkpoints(file_path, offset, rows_done), on_commit=on_commit)
+    finally:
+        journal.flush()
+    engine.report(file_path.name)
+    if stats["failed"]:
+        print(f"[ERROR] {file_path.name} has failed records, rerun with --resume to retry them")
+    else:
+        journal.finish(file_path)
+
+def load_parquet_file(file_path, engine, mode=RECORD_MODE):
+    # pyarrow is only needed for the columnar input
+    from columnar import iter_parquet_records
+
+    print(f"Loading {file_path}...")
+    engine.run(iter_parquet_records(file_path, mode))
+    engine.report(str(file_path))
 
 def main():
-    for csv_file in CSV_DIR.glob("data_*.csv"):
-        load_csv_file(csv_file)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue every file from its last journaled offset")
+    parser.add_argument("--journal", type=Path, default=JOURNAL_PATH, help="Checkpoint journal path")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="Upload data_*.csv or every *.parquet under the data directory")
+    args = parser.parse_args()
+
+    engine = BackfillEngine(get_write_client(MAX_WORKERS), DATABASE_NAME, TABLE_NAME, max_workers=MAX_WORKERS)
+    if args.format == "parquet":
+        for parquet_file in sorted(CSV_DIR.rglob("*.parquet")):
+            load_parquet_file(parquet_file, engine)
+        return
+
+    journal = CheckpointJournal(args.journal)
+    if not args.resume:
+        journal.entries.clear()
+    for csv_file in sorted(CSV_DIR.glob("data_*.csv")):
+        load_csv_file(csv_file, engine, journal)
 
 if __name__ == "__main__":
     main()
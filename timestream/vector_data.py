@@ -0,0 +1,177 @@
+"""Vectorized (NumPy) generator for long simulated histories"""
+import zlib
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from config import (DEVICE_IDS, DEVICE_OFFSETS, CYCLE_START_UTC, CYCLE_MINUTES,
+                    get_interpolated_temp, prefetch_temps)
+
+# Same column order as create_data.flatten_data
+CSV_COLUMNS = [
+    "device_id", "timestamp", "H2S", "NH3", "ph_value", "aerator_status",
+    "rs485_temperature", "ambient_temperature", "level",
+    "pressure", "altitude", "temperature"
+]
+
+# (low, high, decimals) for the uniform readings of config.generate_sensor_data
+UNIFORM_FIELDS = {
+    "H2S": (298, 367, 2),
+    "NH3": (0.026, 0.027, 5),
+    "ph_value": (423, 454, 2),
+    "level": (-0.027, -0.025, 5),
+    "pressure": (762, 767, 4),
+    "altitude": (2302, 2333, 3),
+}
+
+# (offset over external temp, noise sigma) for the temperature readings
+TEMP_FIELDS = {
+    "ambient_temperature": (0.0, 0.3),
+    "rs485_temperature": (1.2, 0.3),
+    "temperature": (0.5, 0.2),
+}
+
+_ROW_FORMAT = "%s,%s,%.2f,%.5f,%.2f,%s,%.2f,%.2f,%.5f,%.4f,%.3f,%.2f\n"
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(x):
+    """splitmix64 finalizer: maps uint64 keys to well distributed uint64 values"""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _device_seed(device_id):
+    return np.uint64(zlib.crc32(device_id.encode()))
+
+
+class CellRandom:
+    """
+    Counter based random numbers: every value depends only on
+    (device, timestamp, stream), so any sub-range of the grid is reproducible.
+    """
+
+    def __init__(self, epoch_s, device_ids):
+        seeds = np.array([_device_seed(d) for d in device_ids], dtype=np.uint64)
+        ts = epoch_s.astype(np.int64).view(np.uint64)
+        with np.errstate(over="ignore"):
+            self.keys = _mix(ts[:, None] * _GOLDEN + _mix(seeds)[None, :])
+
+    def uniform(self, stream):
+        with np.errstate(over="ignore"):
+            bits = _mix(self.keys + np.uint64(stream + 1) * _GOLDEN)
+        return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+    def normal(self, stream):
+        # Box-Muller over two independent uniform streams
+        u1 = np.maximum(self.uniform(2 * stream), np.finfo(np.float64).tiny)
+        u2 = self.uniform(2 * stream + 1)
+        return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+
+def _epoch_seconds(start, end, step):
+    step_s = int(step.total_seconds())
+    if step_s <= 0:
+        raise ValueError("step must be positive")
+    count = int((end - start).total_seconds() // step_s) + 1
+    offsets = np.arange(max(count, 0), dtype=np.int64) * step_s
+    return int(start.timestamp()) + offsets, offsets
+
+
+def _hourly_temps(epoch_s):
+    """Calls get_interpolated_temp once per distinct hour and broadcasts it"""
+    hours, inverse = np.unique(epoch_s // 3600, return_inverse=True)
+    if len(hours):
+        prefetch_temps(datetime.fromtimestamp(int(hours[0]) * 3600, tz=timezone.utc),
+                       datetime.fromtimestamp(int(hours[-1]) * 3600, tz=timezone.utc))
+    temps = np.array([
+        get_interpolated_temp(datetime.fromtimestamp(int(h) * 3600, tz=timezone.utc))
+        for h in hours
+    ], dtype=np.float64)
+    return temps[inverse]
+
+
+def generate_history_arrays(start_time, end_time, step=timedelta(hours=1),
+                            device_ids=DEVICE_IDS, external_temp=None):
+    """
+    Builds the whole time x device grid at once.
+
+    Returns a dict with "timestamp" (T,), "cycle_id" (T,), "device_id" (D,)
+    and one (T, D) array per measure. `external_temp` may be None (hourly
+    values from get_interpolated_temp), a scalar or a (T,) array.
+    Timestamps keep the wall clock of `start_time`, like create_data does.
+    """
+    epoch_s, offsets = _epoch_seconds(start_time, end_time, step)
+    wall_clock = np.datetime64(start_time.replace(tzinfo=None), "s") + offsets.astype("timedelta64[s]")
+
+    cycle_id = (epoch_s - int(CYCLE_START_UTC.timestamp())) // 60 // CYCLE_MINUTES
+    aerator_on = (cycle_id % 2 == 0)
+
+    if external_temp is None:
+        external_temp = _hourly_temps(epoch_s)
+    external_temp = np.broadcast_to(np.asarray(external_temp, dtype=np.float64), epoch_s.shape)
+
+    rand = CellRandom(epoch_s, device_ids)
+    offsets_by_device = np.array([DEVICE_OFFSETS.get(d, 0) for d in device_ids])
+    base_temp = external_temp[:, None] + offsets_by_device[None, :]
+
+    grid = {
+        "timestamp": np.datetime_as_string(wall_clock, unit="s"),
+        "cycle_id": cycle_id,
+        "device_id": np.array(device_ids),
+        "aerator_status": np.where(aerator_on, "ON", "OFF"),
+    }
+
+    stream = 0
+    for field, (low, high, decimals) in UNIFORM_FIELDS.items():
+        grid[field] = np.round(low + (high - low) * rand.uniform(stream), decimals)
+        stream += 1
+
+    for field, (offset, sigma) in TEMP_FIELDS.items():
+        grid[field] = np.round(base_temp + offset + sigma * rand.normal(stream), 2)
+        stream += 1
+
+    return grid
+
+
+def write_device_csvs(grid, output_dir):
+    """Writes one data_<device>.csv per device straight from the column arrays"""
+    paths = []
+    timestamps = grid["timestamp"]
+    status = grid["aerator_status"]
+
+    for col, device_id in enumerate(grid["device_id"]):
+        filepath = output_dir / f"data_{device_id}.csv"
+        columns = [grid[name][:, col] for name in CSV_COLUMNS[2:] if name != "aerator_status"]
+        h2s, nh3, ph, rs485, ambient, level, pressure, altitude, temperature = columns
+
+        with open(filepath, "w", newline="") as f:
+            f.write(",".join(CSV_COLUMNS) + "\n")
+            f.writelines(
+                _ROW_FORMAT % row
+                for row in zip([device_id] * len(timestamps), timestamps, h2s, nh3, ph, status,
+                               rs485, ambient, level, pressure, altitude, temperature)
+            )
+        print(f"Wrote {filepath} with {len(timestamps)} rows")
+        paths.append(filepath)
+    return paths
+
+
+def iter_history_rows(start_time, end_time, step=timedelta(hours=1),
+                      device_ids=DEVICE_IDS, chunk=timedelta(days=1)):
+    """Yields flat rows (create_data.flatten_data shape) grid chunk by grid chunk"""
+    prefetch_temps(start_time, end_time)
+    chunk_start = start_time
+    while chunk_start <= end_time:
+        chunk_end = min(chunk_start + chunk - step, end_time)
+        grid = generate_history_arrays(chunk_start, chunk_end, step, device_ids)
+        columns = {name: grid[name].tolist() for name in CSV_COLUMNS[2:]}
+        for i, timestamp in enumerate(grid["timestamp"].tolist()):
+            for col, device_id in enumerate(device_ids):
+                row = {"device_id": device_id, "timestamp": timestamp}
+                for name in CSV_COLUMNS[2:]:
+                    value = columns[name][i]
+                    row[name] = value if name == "aerator_status" else value[col]
+                yield row
+        chunk_start = chunk_end + step
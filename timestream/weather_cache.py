@@ -0,0 +1,166 @@
+"""Persistent cache of hourly Open-Meteo temperatures keyed by lat/lon/date"""
+import json
+import time
+import sqlite3
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+import requests
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+ARCHIVE_DELAY_DAYS = 5  # the archive API lags a few days behind
+CACHE_PATH = Path(__file__).with_name("weather_cache.sqlite")
+TIMEZONE = "America/Mexico_City"
+
+
+def _group_by_day(hourly, start_date, end_date):
+    """Open-Meteo "hourly" block -> {"YYYY-MM-DD": [(hour, temp), ...]} within the range"""
+    days = {}
+    for stamp, temp in zip(hourly.get("time", []), hourly.get("temperature_2m", [])):
+        day = stamp[:10]
+        if temp is None or not (start_date <= day <= end_date):
+            continue
+        days.setdefault(day, []).append((int(stamp[11:13]), temp))
+    return days
+
+
+class OpenMeteoSource:
+    """Fetches a whole date range with one request per API (archive and/or forecast)"""
+
+    def __init__(self, timezone=TIMEZONE, min_interval=1.0, timeout=30):
+        self.timezone = timezone
+        self.min_interval = min_interval  # courtesy delay between real requests
+        self.timeout = timeout
+        self._last_request = 0.0
+
+    def _get(self, url, lat, lon, start_date, end_date):
+        wait = self.min_interval - (time.monotonic() - self._last_request)
+        if wait > 0:
+            time.sleep(wait)
+        print(f"[INFO] Requesting temperatures {start_date}..{end_date} from {url}")
+        params = {
+            "latitude": lat,
+            "longitude": lon,
+            "hourly": "temperature_2m",
+            "start_date": start_date,
+            "end_date": end_date,
+            "timezone": self.timezone
+        }
+        try:
+            r = requests.get(url, params=params, timeout=self.timeout)
+            r.raise_for_status()
+            return r.json().get("hourly", {})
+        finally:
+            self._last_request = time.monotonic()
+
+    def fetch(self, lat, lon, start_date, end_date):
+        archive_end = (date.today() - timedelta(days=ARCHIVE_DELAY_DAYS + 1)).isoformat()
+        days = {}
+        if start_date <= archive_end:
+            hourly = self._get(ARCHIVE_URL, lat, lon, start_date, min(end_date, archive_end))
+            days.update(_group_by_day(hourly, start_date, end_date))
+        if end_date > archive_end:
+            recent_start = max(start_date, (date.fromisoformat(archive_end) + timedelta(days=1)).isoformat())
+            hourly = self._get(FORECAST_URL, lat, lon, recent_start, end_date)
+            days.update(_group_by_day(hourly, recent_start, end_date))
+        return days
+
+
+class FixtureSource:
+    """Offline source: JSON file(s) shaped like an Open-Meteo response, for tests"""
+
+    cache_path = ":memory:"  # fixture temperatures must never reach the real cache
+
+    def __init__(self, path):
+        path = Path(path)
+        files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+        self.hourly = {"time": [], "temperature_2m": []}
+        for file in files:
+            hourly = json.loads(file.read_text()).get("hourly", {})
+            self.hourly["time"].extend(hourly.get("time", []))
+            self.hourly["temperature_2m"].extend(hourly.get("temperature_2m", []))
+        self.requests = 0
+
+    def fetch(self, lat, lon, start_date, end_date):
+        self.requests += 1
+        return _group_by_day(self.hourly, start_date, end_date)
+
+
+class WeatherCache:
+    """
+    Hourly temperatures stored in SQLite and mirrored in memory.
+    Missing days are fetched as one contiguous range. Days the source has
+    no data for are only remembered for this run, so an outage doesn't
+    leave permanent holes in the file.
+    """
+
+    def __init__(self, lat, lon, source=None, path=None):
+        self.lat = round(lat, 4)
+        self.lon = round(lon, 4)
+        self.source = source or OpenMeteoSource()
+        if path is None:
+            path = getattr(self.source, "cache_path", CACHE_PATH)
+        self._days = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS days (
+                lat REAL, lon REAL, day TEXT, fetched_at REAL,
+                PRIMARY KEY (lat, lon, day));
+            CREATE TABLE IF NOT EXISTS hourly (
+                lat REAL, lon REAL, day TEXT, hour INTEGER, temp REAL,
+                PRIMARY KEY (lat, lon, day, hour));
+        """)
+
+    def _load(self, start_date, end_date):
+        key = (self.lat, self.lon, start_date, end_date)
+        # Only days with temperatures count as cached (older files also listed empty days)
+        for day, hour, temp in self._db.execute(
+                "SELECT day, hour, temp FROM hourly WHERE lat=? AND lon=? AND day BETWEEN ? AND ? "
+                "ORDER BY day, hour", key):
+            hs, ts = self._days.setdefault(day, ([], []))
+            if hour not in hs:
+                hs.append(hour)
+                ts.append(temp)
+
+    def _store(self, requested, fetched):
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?)",
+                [(self.lat, self.lon, day, now) for day in requested if fetched.get(day)])
+            self._db.executemany(
+                "INSERT OR REPLACE INTO hourly VALUES (?, ?, ?, ?, ?)",
+                [(self.lat, self.lon, day, hour, temp)
+                 for day, values in fetched.items() for hour, temp in values])
+        for day in requested:
+            values = sorted(fetched.get(day, []))
+            self._days[day] = ([h for h, _ in values], [t for _, t in values])
+
+    def prefetch(self, start_date, end_date):
+        """Makes sure every day in [start_date, end_date] (ISO strings) is cached"""
+        with self._lock:
+            self._load(start_date, end_date)
+            first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+            wanted = [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+            missing = [day for day in wanted if day not in self._days]
+            if not missing:
+                return 0
+
+            try:
+                fetched = self.source.fetch(self.lat, self.lon, missing[0], missing[-1])
+            except Exception:
+                # Remember the failure for this run only, so callers fall back instead of retrying every hour
+                for day in missing:
+                    self._days[day] = ([], [])
+                raise
+            self._store(missing, fetched)
+            print(f"[OK] Cached temperatures for {len(missing)} days ({missing[0]}..{missing[-1]})")
+            return len(missing)
+
+    def get_day(self, day):
+        """Returns (hours, temps) for an ISO date, fetching it if needed"""
+        if day not in self._days:
+            self.prefetch(day, day)
+        return self._days[day]